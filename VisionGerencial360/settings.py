@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'accounts.middleware.QueryProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -133,6 +135,72 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # semester performance falls below this value. Can be overridden in prod.
 SEMESTER_TARGET = 70
 
+# Caché de resultados del dashboard administrativo. Las entradas se invalidan por
+# señales cuando cambian indicadores, evaluaciones o negociadores: la versión de
+# datos vive en la base de datos (DashboardDataVersion), así que la invalidación
+# alcanza a todos los procesos aunque cada uno tenga su propia caché local. Los
+# contadores de hits/misses son por proceso.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'vg360',
+    }
+}
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+# Exportaciones en segundo plano (accounts.jobs): directorio de los archivos
+# generados, horas que se conservan, hilos del comando procesar_exportaciones,
+# minutos sin latido tras los cuales un trabajo "en proceso" se considera
+# abandonado y segundos entre latidos del worker.
+EXPORT_JOBS_DIR = BASE_DIR / 'exports'
+EXPORT_JOBS_TTL_HORAS = 24
+EXPORT_JOBS_WORKERS = 2
+EXPORT_JOBS_TIMEOUT_MINUTOS = 30
+EXPORT_JOBS_LATIDO_SEGUNDOS = 30
+# Procesos para renderizar los PDFs de evaluación en lote (None = núcleos disponibles)
+PDF_WORKERS = None
+
+# Presupuesto de consultas SQL por vista (nombre de URL -> máximo de consultas),
+# aplicado por accounts.middleware.QueryProfilerMiddleware. Al excederlo se
+# registra un warning; durante los tests se lanza QueryBudgetExceeded.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+QUERY_BUDGETS = {
+    'administrativo_dashboard': 10,
+    'lider_negociadores_api': 8,
+    'exportar_resultados_excel': 8,
+    'historico_evaluaciones': 12,
+    'lider_dashboard': 5,
+    'pending_evaluations': 5,
+    'evaluacion_equipo': 14,
+    'exportar_historico_excel': 8,
+    'exportar_historico_pdf': 8,
+    'negotiator_indicators_api': 6,
+    'lider_equipo_indicadores_api': 4,
+    'exportar_evaluacion_pdf': 8,
+    'exportar_evaluaciones_equipo_pdf': 5,
+    'exportar_evaluaciones_pdf': 5,
+}
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_RAISE = TESTING
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'accounts.perf': {
+            'handlers': ['console'],
+            # Una línea por request: en los tests solo los avisos de presupuesto
+            'level': 'WARNING' if TESTING else 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Email Configuration (for allauth and password reset)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_HOST = 'smtp.your-email-provider.com'  # e.g., smtp.gmail.com
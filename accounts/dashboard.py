@@ -0,0 +1,372 @@
+"""
+Motor de consolidación del dashboard administrativo.
+
+Calcula los promedios por líder y por negociador, el desempeño, la bandera de
+evaluación en el rango y las métricas de diligenciamiento (HU20) con un número
+constante de consultas agrupadas, y arma ``leaders_data`` en memoria. El
+detalle de negociadores de cada líder se sirve por separado (drill-down JSON).
+
+Los semestres cerrados (``SemesterSnapshot``) se sirven directamente desde su
+foto congelada; solo los periodos abiertos se calculan en vivo.
+"""
+import json
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import rollups, scoring
+from .fechas import rango_datetime
+from .models import DashboardDataVersion, Negotiator, Evaluation, SemesterSnapshot
+
+
+# Alias del promedio -> campo de NegotiatorIndicator
+KPI_PROMEDIOS = (
+    ('avg_conversion', 'conversion_de_ventas'),
+    ('avg_recaudo', 'recaudacion_mensual'),
+    ('avg_tiempo', 'tiempo_hablando'),
+    ('avg_cump_recaudo', 'porcentajes_cumplimiento_recaudo'),
+    ('avg_cump_conv', 'porcentaje_cumplimiento_conversion'),
+    ('avg_caidas', 'porcentaje_caidas_acuerdos'),
+)
+
+
+def _promedios(fila):
+    return {alias: rollups.promedio(fila, campo) for alias, campo in KPI_PROMEDIOS}
+
+
+def consolidado_por_lider(start_date, end_date):
+    """
+    Promedios de KPIs, negociadores con datos (equipos) y desempeño por líder en el
+    rango, leídos de las tablas de rollup (dos consultas agrupadas por líder).
+    """
+    equipos = rollups.negociadores_con_datos_por_lider(start_date, end_date)
+
+    filas = []
+    for row in rollups.sumas_por_lider(start_date, end_date):
+        filas.append({
+            'cedula': row['leader__cedula'],
+            'nombre': f"{row['leader__first_name']} {row['leader__last_name']}",
+            'email': row['leader__email'],
+            'equipos': equipos.get(row['leader__cedula'], 0),
+            **_promedios(row),
+        })
+    for fila, valor in zip(filas, scoring.desempeno_de_filas(filas)):
+        fila['desempeno'] = valor
+    return filas
+
+
+def construir_leaders_data(start_date, end_date, semester_target):
+    """
+    Retorna la lista de líderes con indicadores en el rango y sus métricas HU20.
+    Usa un número constante de consultas agrupadas por líder: el costo depende
+    del número de líderes, no del de negociadores (el detalle por negociador se
+    consulta aparte con ``negociadores_por_lider``).
+    """
+    leaders_data = consolidado_por_lider(start_date, end_date)
+    if not leaders_data:
+        return leaders_data
+
+    # --- Métricas de diligenciamiento por líder (HU20) ---
+    total_by_leader = dict(
+        Negotiator.objects.values_list('leader_id').annotate(total=Count('id')).order_by()
+    )
+    evaluations_by_leader = {
+        row['negotiator__leader_id']: row
+        for row in (
+            Evaluation.objects
+            .filter(**rango_datetime(start_date, end_date))
+            .values('negotiator__leader_id')
+            .annotate(evaluated=Count('negotiator', distinct=True), done=Count('id'))
+            .order_by()
+        )
+    }
+
+    for leader in leaders_data:
+        total_negotiators = total_by_leader.get(leader['cedula'], 0)
+        evaluations = evaluations_by_leader.get(leader['cedula'], {})
+        evaluated_negotiators = evaluations.get('evaluated', 0)
+        pct = round((evaluated_negotiators / total_negotiators) * 100, 2) if total_negotiators > 0 else 0
+
+        leader['total_negotiators'] = total_negotiators
+        leader['evaluated_negotiators'] = evaluated_negotiators
+        leader['evaluations_done'] = evaluations.get('done', 0)
+        leader['pending_negotiators'] = total_negotiators - evaluated_negotiators
+        leader['pct_cumplimiento'] = pct
+        # Flag para alerta visual (por debajo del objetivo semestral)
+        leader['alert'] = pct < semester_target if total_negotiators > 0 else False
+
+    return leaders_data
+
+
+def negociadores_por_lider(start_date, end_date, leader_id=None):
+    """
+    {leader_id: [negociadores]} con promedios, desempeño y si fueron evaluados en
+    el rango. Con ``leader_id`` solo se consultan los negociadores de ese líder.
+    """
+    por_lider = {} if leader_id is None else {'negotiator__leader_id': leader_id}
+    negotiator_sums = rollups.sumas_por_negociador(start_date, end_date, leader_id=leader_id)
+    evaluated = set(
+        Evaluation.objects
+        .filter(**rango_datetime(start_date, end_date), **por_lider)
+        .values_list('negotiator_id', flat=True)
+        .distinct()
+    )
+    negotiators = Negotiator.objects.order_by('pk')
+    if leader_id is not None:
+        negotiators = negotiators.filter(leader_id=leader_id)
+
+    filas = []
+    leader_ids = []
+    for n in negotiators.values('pk', 'cedula', 'name', 'leader_id'):
+        # Los negociadores sin datos en el rango quedan en 0.0
+        promedios = {alias: valor or 0.0 for alias, valor in _promedios(negotiator_sums.get(n['pk'], {})).items()}
+        filas.append({
+            'cedula': n['cedula'],
+            'nombre': n['name'],
+            **promedios,
+            # Indica si este negociador tuvo al menos una evaluación en el rango seleccionado
+            'evaluated_in_range': n['pk'] in evaluated,
+        })
+        leader_ids.append(n['leader_id'])
+
+    resultado = {}
+    for leader_id, fila, valor in zip(leader_ids, filas, scoring.desempeno_de_filas(filas)):
+        fila['desempeno'] = valor
+        resultado.setdefault(leader_id, []).append(fila)
+    return resultado
+
+
+# Criterios de orden aceptados en el dashboard y en el detalle de negociadores
+ORDENAR_POR_OPCIONES = ('desempeno', 'avg_conversion', 'avg_cump_recaudo', 'avg_cump_conv', 'avg_caidas')
+ORDENAR_NEGOCIADORES_OPCIONES = ORDENAR_POR_OPCIONES + ('nombre', 'cedula', 'avg_recaudo', 'avg_tiempo')
+
+
+def ordenar_leaders_data(leaders_data, ordenar_por, direccion):
+    reverse = True if direccion == 'desc' else False
+    leaders_data.sort(key=lambda x: (x[ordenar_por] is None, x[ordenar_por]), reverse=reverse)
+    return leaders_data
+
+
+def datos_graficos(leaders_data):
+    """Arreglos alineados con los líderes para los gráficos (ya serializados a JSON)."""
+    labels = [l['nombre'] for l in leaders_data]
+    counts = [int(l.get('equipos') or 0) for l in leaders_data]
+    total_counts = sum(counts)
+    shares = [round((c / total_counts) * 100, 2) if total_counts > 0 else 0 for c in counts]
+    avg_desempeno = [round(l['desempeno'], 2) if l.get('desempeno') is not None else 0 for l in leaders_data]
+
+    # Desempeño global (promedio de líderes con valor definido)
+    non_null_desempenos = [l['desempeno'] for l in leaders_data if l.get('desempeno') is not None]
+    overall_desempeno = round(sum(non_null_desempenos) / len(non_null_desempenos), 2) if non_null_desempenos else None
+
+    return {
+        'chart_labels': json.dumps(labels),
+        'chart_counts': json.dumps(counts),
+        'chart_shares': json.dumps(shares),
+        'chart_avg_desempeno': json.dumps(avg_desempeno),
+        'chart_avg_recaudo': json.dumps([round(l.get('avg_recaudo') or 0, 2) for l in leaders_data]),
+        'chart_avg_tiempo': json.dumps([round(l.get('avg_tiempo') or 0, 2) for l in leaders_data]),
+        'chart_avg_conversion': json.dumps([round(l.get('avg_conversion') or 0, 2) for l in leaders_data]),
+        'chart_avg_cump_recaudo': json.dumps([round(l.get('avg_cump_recaudo') or 0, 2) for l in leaders_data]),
+        'chart_avg_cump_conv': json.dumps([round(l.get('avg_cump_conv') or 0, 2) for l in leaders_data]),
+        'chart_avg_caidas': json.dumps([round(l.get('avg_caidas') or 0, 2) for l in leaders_data]),
+        'overall_desempeno': overall_desempeno,
+    }
+
+
+# ----------------------------
+# Caché de resultados
+# ----------------------------
+# La versión de datos forma parte de la llave: las señales de NegotiatorIndicator,
+# Evaluation y Negotiator la incrementan y así invalidan todas las entradas. La
+# versión se guarda en la base de datos (``DashboardDataVersion``) porque la
+# caché es local a cada proceso: así una escritura hecha desde otro proceso web,
+# el worker de exportaciones o un comando también invalida este proceso. Los
+# contadores de hits/misses sí son del proceso actual.
+
+HITS_KEY = 'dashboard:hits'
+MISSES_KEY = 'dashboard:misses'
+
+
+def _incrementar(key):
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # La llave expiró o fue desalojada entre el add y el incr
+        cache.set(key, 1, None)
+        return 1
+
+
+def version_datos():
+    version = DashboardDataVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+    return version or 1
+
+
+def invalidar_dashboard():
+    """Descarta los resultados cacheados del dashboard en todos los procesos (nueva versión de datos)."""
+    if not DashboardDataVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        DashboardDataVersion.objects.get_or_create(pk=1, defaults={'version': 2})
+
+
+def estadisticas_cache():
+    return {
+        'hits': cache.get(HITS_KEY) or 0,
+        'misses': cache.get(MISSES_KEY) or 0,
+        'version': version_datos(),
+    }
+
+
+def _cacheado(key, calcular):
+    data = cache.get(key)
+    if data is not None:
+        _incrementar(HITS_KEY)
+        return data
+    _incrementar(MISSES_KEY)
+    data = calcular()
+    cache.set(key, data, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60 * 60))
+    return data
+
+
+def obtener_dashboard(start_date, end_date, ordenar_por, direccion, semester_target):
+    """
+    Retorna ``(leaders_data, graficos)`` para el rango ya normalizado. Los semestres
+    cerrados salen de su snapshot; el resto usa la caché mientras no cambie la
+    versión de datos.
+    """
+    snapshot = obtener_snapshot(start_date, end_date)
+    if snapshot is not None:
+        leaders_data = ordenar_leaders_data(snapshot.leaders_data, ordenar_por, direccion)
+        return leaders_data, datos_graficos(leaders_data)
+
+    def calcular():
+        leaders_data = construir_leaders_data(start_date, end_date, semester_target)
+        ordenar_leaders_data(leaders_data, ordenar_por, direccion)
+        return {'leaders_data': leaders_data, 'graficos': datos_graficos(leaders_data)}
+
+    key = (
+        f'dashboard:v{version_datos()}:{start_date:%Y%m%d}-{end_date:%Y%m%d}'
+        f':{ordenar_por}:{direccion}:{semester_target}'
+    )
+    data = _cacheado(key, calcular)
+    return data['leaders_data'], data['graficos']
+
+
+def obtener_negociadores_lider(leader_id, start_date, end_date):
+    """Negociadores de un líder en el rango (sin ordenar ni paginar), cacheados como el dashboard."""
+    snapshot = obtener_snapshot(start_date, end_date)
+    if snapshot is not None:
+        return snapshot.negociadores.get(leader_id, [])
+    key = f'dashboard:v{version_datos()}:{start_date:%Y%m%d}-{end_date:%Y%m%d}:lider:{leader_id}'
+    return _cacheado(key, lambda: negociadores_por_lider(start_date, end_date, leader_id=leader_id).get(leader_id, []))
+
+
+def obtener_consolidado(start_date, end_date):
+    """Consolidado por líder para exportaciones: snapshot si el semestre está cerrado, si no en vivo."""
+    snapshot = obtener_snapshot(start_date, end_date)
+    if snapshot is not None:
+        return snapshot.leaders_data
+    return consolidado_por_lider(start_date, end_date)
+
+
+# ----------------------------
+# Semestres cerrados
+# ----------------------------
+
+def rango_dashboard(params):
+    """
+    Rango del dashboard administrativo: fechas explícitas (desde/hasta) o año/semestre.
+    ``params`` es ``request.GET`` o un dict equivalente. Retorna (start_date,
+    end_date, year, semestre).
+    """
+    desde_str = params.get('desde')
+    hasta_str = params.get('hasta')
+    start_date = None
+    end_date = None
+
+    # Si vienen fechas explícitas, tienen prioridad
+    if desde_str or hasta_str:
+        try:
+            if desde_str:
+                start_date = datetime.strptime(desde_str, '%Y-%m-%d').date()
+            if hasta_str:
+                end_date = datetime.strptime(hasta_str, '%Y-%m-%d').date()
+        except ValueError:
+            start_date = None
+            end_date = None
+
+        # Defaults si falta alguno
+        if start_date is None:
+            start_date = timezone.now().date() - timedelta(days=180)
+        if end_date is None:
+            end_date = timezone.now().date()
+
+        # Asegurar orden correcto
+        if end_date < start_date:
+            start_date, end_date = end_date, start_date
+
+        # Set valores mostrados en formulario auxiliar
+        year = start_date.year
+        semestre = '1' if start_date.month <= 6 else '2'
+    else:
+        # Filtro por año/semestre (por defecto)
+        try:
+            year = int(params.get('anio') or timezone.now().year)
+        except ValueError:
+            year = timezone.now().year
+        semestre = params.get('semestre') or '1'
+        if semestre not in ['1', '2']:
+            semestre = '1'
+
+        if semestre == '1':
+            start_date = datetime(year, 1, 1).date()
+            end_date = datetime(year, 6, 30).date()
+        else:
+            start_date = datetime(year, 7, 1).date()
+            end_date = datetime(year, 12, 31).date()
+
+    return start_date, end_date, year, semestre
+
+
+def rango_semestre(anio, semestre):
+    if semestre == '1':
+        return date(anio, 1, 1), date(anio, 6, 30)
+    return date(anio, 7, 1), date(anio, 12, 31)
+
+
+def semestre_de_rango(start_date, end_date):
+    """(anio, semestre) si el rango coincide exactamente con un semestre; si no, None."""
+    for semestre in ('1', '2'):
+        if (start_date, end_date) == rango_semestre(start_date.year, semestre):
+            return start_date.year, semestre
+    return None
+
+
+def obtener_snapshot(start_date, end_date):
+    semestre = semestre_de_rango(start_date, end_date)
+    if semestre is None:
+        return None
+    return SemesterSnapshot.objects.filter(anio=semestre[0], semestre=semestre[1]).first()
+
+
+def cerrar_semestre(anio, semestre, semester_target):
+    """Calcula y guarda el snapshot inmutable del semestre. Retorna el SemesterSnapshot creado."""
+    start_date, end_date = rango_semestre(anio, semestre)
+    with transaction.atomic():
+        leaders_data = construir_leaders_data(start_date, end_date, semester_target)
+        negociadores = negociadores_por_lider(start_date, end_date)
+        return SemesterSnapshot.objects.create(
+            anio=anio,
+            semestre=semestre,
+            start_date=start_date,
+            end_date=end_date,
+            semester_target=semester_target,
+            leaders_data=leaders_data,
+            negociadores={
+                leader['cedula']: negociadores.get(leader['cedula'], []) for leader in leaders_data
+            },
+        )
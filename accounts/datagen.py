@@ -0,0 +1,264 @@
+"""
+Generador reproducible de datos sintéticos a escala de producción.
+
+Crea líderes, negociadores, indicadores diarios y evaluaciones (Hacer con sus
+KPIs y Ser) con ``bulk_create`` por lotes. La misma semilla y los mismos
+parámetros producen siempre el mismo dataset, de modo que los benchmarks son
+comparables entre commits.
+"""
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import rollups
+from .dashboard import invalidar_dashboard
+from .models import (
+    KPI,
+    AllowedEmail,
+    Evaluation,
+    EvaluationKPI,
+    Negotiator,
+    NegotiatorIndicator,
+    SerEvaluation,
+    User,
+)
+from .services import KPIS_EVALUACION
+
+# Prefijos de cédula reservados para datos sintéticos (User.cedula admite 5-12 dígitos)
+PREFIJO_LIDER = '7'
+PREFIJO_NEGOCIADOR = '8'
+
+
+def asegurar_kpis():
+    """Crea (si faltan) los KPIs de porcentaje y retorna {nombre: KPI}."""
+    kpis = {}
+    for name in KPIS_EVALUACION:
+        kpis[name], _ = KPI.objects.get_or_create(
+            name=name,
+            defaults=dict(description=name, kpi_type='percentage', min_value=0.0, max_value=100.0, unit='%'),
+        )
+    return kpis
+
+
+def _valores(rng):
+    """Valores de KPIs de un indicador, en el orden de ``rollups.KPI_FIELDS``."""
+    return (
+        round(rng.uniform(20, 85), 2),
+        rng.randint(800_000, 8_000_000),
+        round(rng.uniform(20, 160), 1),
+        round(rng.uniform(60, 100), 2),
+        round(rng.uniform(60, 100), 2),
+        round(rng.uniform(5, 25), 2),
+    )
+
+
+def _en_lotes(model, objs, batch_size, **kwargs):
+    model.objects.bulk_create(objs, batch_size=batch_size, **kwargs)
+    objs.clear()
+
+
+def fechas_historia(hoy, granularidad='diaria', meses=12):
+    """
+    Fechas de indicadores hacia atrás desde ``hoy``: un punto por día, o uno
+    cada 30 días (``granularidad='mensual'``), cubriendo ``meses`` meses.
+    """
+    if granularidad == 'mensual':
+        return [hoy - timedelta(days=30 * i) for i in range(meses)]
+    return [hoy - timedelta(days=d) for d in range(meses * 30)]
+
+
+def _sql_insert_indicadores(upsert):
+    qn = connection.ops.quote_name
+    columnas = ['negotiator_id', 'date', *rollups.KPI_FIELDS, 'created_at', 'updated_at']
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        qn(NegotiatorIndicator._meta.db_table),
+        ', '.join(qn(c) for c in columnas),
+        ', '.join(['%s'] * len(columnas)),
+    )
+    if upsert:
+        sql += ' ON CONFLICT ({}, {}) DO UPDATE SET {}'.format(
+            qn('negotiator_id'), qn('date'),
+            ', '.join(f'{qn(c)} = EXCLUDED.{qn(c)}' for c in [*rollups.KPI_FIELDS, 'updated_at']),
+        )
+    return sql
+
+
+def insertar_indicadores(rng, negotiator_ids, fechas, batch_size=5000, upsert=False):
+    """
+    Inserta un indicador por negociador y fecha en lotes, sin mantenimiento
+    incremental de rollups (reconstruir al final). Con ``upsert=True`` los
+    pares (negociador, fecha) existentes se actualizan en lugar de fallar.
+
+    En bases con ``INSERT ... ON CONFLICT`` (SQLite, PostgreSQL) las filas van
+    como tuplas por ``executemany``, sin instanciar modelos ni compilar SQL por
+    lote; en el resto se usa ``bulk_create``.
+
+    Retorna (total de filas, {negotiator_id: indicador de la fecha más reciente}).
+    """
+    mas_reciente = max(fechas) if fechas else None
+    ultimos = {}
+    total = 0
+
+    if connection.features.supports_update_conflicts_with_target:
+        sql = _sql_insert_indicadores(upsert)
+        ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+        fechas_db = [(fecha, connection.ops.adapt_datefield_value(fecha)) for fecha in fechas]
+        filas = []
+        with connection.cursor() as cursor:
+            for negotiator_id in negotiator_ids:
+                for fecha, fecha_db in fechas_db:
+                    valores = _valores(rng)
+                    if fecha == mas_reciente:
+                        ultimos[negotiator_id] = NegotiatorIndicator(
+                            negotiator_id=negotiator_id, date=fecha, **dict(zip(rollups.KPI_FIELDS, valores))
+                        )
+                    filas.append((negotiator_id, fecha_db, *valores, ahora, ahora))
+                if len(filas) >= batch_size:
+                    total += len(filas)
+                    cursor.executemany(sql, filas)
+                    filas.clear()
+            total += len(filas)
+            if filas:
+                cursor.executemany(sql, filas)
+        # El SQL directo no pasa por NegotiatorIndicatorQuerySet.bulk_create
+        invalidar_dashboard()
+        return total, ultimos
+
+    kwargs = {'actualizar_rollups': False}
+    if upsert:
+        kwargs.update(
+            update_conflicts=True,
+            unique_fields=['negotiator', 'date'],
+            update_fields=[*rollups.KPI_FIELDS, 'updated_at'],
+        )
+    pendientes = []
+    for negotiator_id in negotiator_ids:
+        for fecha in fechas:
+            indicador = NegotiatorIndicator(
+                negotiator_id=negotiator_id, date=fecha, **dict(zip(rollups.KPI_FIELDS, _valores(rng)))
+            )
+            if fecha == mas_reciente:
+                ultimos[negotiator_id] = indicador
+            pendientes.append(indicador)
+        if len(pendientes) >= batch_size:
+            total += len(pendientes)
+            _en_lotes(NegotiatorIndicator, pendientes, batch_size, **kwargs)
+    total += len(pendientes)
+    _en_lotes(NegotiatorIndicator, pendientes, batch_size, **kwargs)
+    return total, ultimos
+
+
+def generar_dataset(
+    lideres=10,
+    negociadores_por_lider=20,
+    dias=365,
+    evaluaciones_por_negociador=4,
+    seed=42,
+    batch_size=5000,
+    password=None,
+    hoy=None,
+    stdout=None,
+):
+    """
+    Genera el dataset sintético y retorna un resumen con los conteos y las
+    cédulas de líderes y negociadores creados.
+
+    ``password=None`` deja a los usuarios con contraseña inutilizable; en ambos
+    casos el hash se calcula una sola vez y se comparte entre todos.
+    """
+    rng = random.Random(seed)
+    hoy = hoy or timezone.localdate()
+    password_hash = make_password(password)
+
+    def log(mensaje):
+        if stdout is not None:
+            stdout.write(mensaje)
+
+    with transaction.atomic():
+        kpis = asegurar_kpis()
+
+        leaders = [
+            User(
+                cedula=f'{PREFIJO_LIDER}{i:07d}',
+                email=f'lider{i}@bench.vg360.local',
+                first_name=f'Lider{i}',
+                last_name='Bench',
+                role='lider',
+                password=password_hash,
+            )
+            for i in range(1, lideres + 1)
+        ]
+        User.objects.bulk_create(leaders, batch_size=batch_size)
+        AllowedEmail.objects.bulk_create(
+            [AllowedEmail(email=u.email) for u in leaders], batch_size=batch_size, ignore_conflicts=True
+        )
+
+        negotiators = []
+        consecutivo = 1
+        for leader in leaders:
+            for j in range(1, negociadores_por_lider + 1):
+                negotiators.append(Negotiator(
+                    leader_id=leader.cedula,
+                    name=f'Negociador {j} de {leader.first_name}',
+                    cedula=f'{PREFIJO_NEGOCIADOR}{consecutivo:09d}',
+                ))
+                consecutivo += 1
+        # bulk_create no pasa por Negotiator.save: no hay rollups que mover todavía
+        negotiators = Negotiator.objects.bulk_create(negotiators, batch_size=batch_size)
+        log(f'{len(leaders)} líderes y {len(negotiators)} negociadores')
+
+        fechas = [hoy - timedelta(days=d) for d in range(dias)]
+        total_indicadores, _ = insertar_indicadores(rng, [n.pk for n in negotiators], fechas, batch_size)
+        log(f'{total_indicadores} indicadores')
+
+        # auto_now_add ignora la fecha asignada en bulk_create: se corrige después con bulk_update
+        evaluaciones, ser_evaluaciones = [], []
+        for negotiator in negotiators:
+            for _ in range(evaluaciones_por_negociador):
+                evaluaciones.append(Evaluation(
+                    negotiator_id=negotiator.pk,
+                    evaluator_id=negotiator.leader_id,
+                    overall_score=round(rng.uniform(40, 100), 2),
+                    feedback='Evaluación sintética.',
+                ))
+                ser_evaluaciones.append(SerEvaluation(
+                    negotiator_id=negotiator.pk,
+                    evaluator_id=negotiator.leader_id,
+                    actitud=rng.randint(1, 5),
+                    trabajo_en_equipo=rng.randint(1, 5),
+                    sentido_pertenencia=rng.randint(1, 5),
+                    relacionamiento=rng.randint(1, 5),
+                    compromiso=rng.randint(1, 5),
+                ))
+        evaluaciones = Evaluation.objects.bulk_create(evaluaciones, batch_size=batch_size)
+        ser_evaluaciones = SerEvaluation.objects.bulk_create(ser_evaluaciones, batch_size=batch_size)
+
+        tz = timezone.get_current_timezone()
+        for ev in (*evaluaciones, *ser_evaluaciones):
+            fecha = hoy - timedelta(days=rng.randrange(max(dias, 1)))
+            ev.date = timezone.make_aware(datetime.combine(fecha, time(rng.randint(8, 17))), tz)
+        Evaluation.objects.bulk_update(evaluaciones, ['date'], batch_size=batch_size)
+        SerEvaluation.objects.bulk_update(ser_evaluaciones, ['date'], batch_size=batch_size)
+
+        evaluation_kpis = []
+        for ev in evaluaciones:
+            for kpi in kpis.values():
+                evaluation_kpis.append(EvaluationKPI(evaluation_id=ev.pk, kpi=kpi, score=round(rng.uniform(0, 100), 2)))
+            if len(evaluation_kpis) >= batch_size:
+                _en_lotes(EvaluationKPI, evaluation_kpis, batch_size)
+        _en_lotes(EvaluationKPI, evaluation_kpis, batch_size)
+        log(f'{len(evaluaciones)} evaluaciones de Hacer y {len(ser_evaluaciones)} del Ser')
+
+        rollups.reconstruir_rollups(batch_size=batch_size)
+        invalidar_dashboard()
+
+    return {
+        'lideres': [u.cedula for u in leaders],
+        'negociadores': [n.cedula for n in negotiators],
+        'indicadores': total_indicadores,
+        'evaluaciones': len(evaluaciones),
+        'ser_evaluaciones': len(ser_evaluaciones),
+    }
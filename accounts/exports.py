@@ -0,0 +1,487 @@
+"""
+Exportaciones del histórico de evaluaciones, de los resultados por líder y de
+los indicadores crudos.
+
+Cada ``exportar_*(params, destino)`` recibe los parámetros de la URL
+(``request.GET`` o el dict guardado en un ``ExportJob``), escribe el archivo en
+``destino`` y retorna el nombre de descarga; las vistas las ejecutan en el
+request y ``accounts.jobs`` en segundo plano (ver ``EXPORTACIONES``).
+
+Las filas se leen con ``values_list(...).iterator(chunk_size=...)`` (sin
+instanciar modelos ni cargar todo el queryset) y el Excel se escribe con
+openpyxl en modo write-only, que vuelca cada hoja a disco a medida que se
+agregan filas. El archivo final va a un ``SpooledTemporaryFile`` (en memoria
+hasta ``SPOOL_MAX_BYTES``, luego en disco) y se entrega con ``FileResponse``,
+así que el pico de memoria no crece con el número de evaluaciones.
+
+El PDF del histórico incluye todas las filas: se arma como tablas de
+``PDF_FILAS_POR_TABLA`` filas que reportlab consume de un generador
+(``HistoriaPorBloques``) mientras dibuja las páginas.
+
+``evaluaciones_pdf_zip`` genera los PDFs de la última evaluación de varios
+negociadores en un pool de procesos (``reportes_pdf.pdf_evaluacion``) y los
+empaqueta en un ZIP que se emite a medida que llegan los resultados.
+
+Los indicadores se exportan en CSV o NDJSON por bloques con paginación por
+llave ``(date, negotiator_id)``: cada bloque es una consulta corta e
+independiente (índice ``indicator_date_negotiator``), en lugar de un cursor
+abierto durante toda la descarga.
+"""
+import csv
+import io
+import json
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from itertools import chain, islice
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.db.models import Prefetch, Q
+from django.http import FileResponse
+
+from .dashboard import obtener_consolidado, rango_dashboard
+from .fechas import rango_datetime
+from .models import Evaluation, EvaluationKPI, SerEvaluation
+from .reportes_pdf import pdf_evaluacion
+from .rollups import KPI_FIELDS
+from .scoring import ESCALA_SER, promedio_ser, puntaje_total
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PDF_CONTENT_TYPE = 'application/pdf'
+EXPORT_CHUNK_SIZE = 2000
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# Filas por tabla del PDF del histórico (cada una se parte en páginas con encabezado repetido)
+PDF_FILAS_POR_TABLA = 200
+
+ENCABEZADOS_HACER = [
+    'Fecha', 'Líder', 'Correo Líder', 'Negociador', 'Cédula Negociador', 'Puntaje Hacer (0-100)', 'Feedback',
+]
+ENCABEZADOS_SER = [
+    'Fecha', 'Líder', 'Correo Líder', 'Negociador', 'Cédula Negociador', 'Actitud', 'Trabajo en Equipo',
+    'Sentido de Pertenencia', 'Relacionamiento', 'Compromiso', 'Promedio (1-5)',
+]
+CAMPOS_PERSONAS = (
+    'date', 'evaluator__first_name', 'evaluator__last_name', 'evaluator__email', 'negotiator__name',
+    'negotiator__cedula',
+)
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson; charset=utf-8'
+ZIP_CONTENT_TYPE = 'application/zip'
+PDF_LOTE_NEGOCIADORES = 200
+PDF_VENTANA_POR_WORKER = 2
+INDICADORES_CHUNK_SIZE = 5000
+COLUMNAS_INDICADORES = ('fecha', 'cedula_negociador', 'negociador', 'cedula_lider', *KPI_FIELDS)
+
+ENCABEZADOS_RESULTADOS = [
+    'Cédula Líder', 'Nombre Líder', 'Email', 'Negociadores',
+    'Conv. Ventas (%)', 'Recaudo ($)', 'Tiempo Hablando (h)',
+    'Cumpl. Recaudo (%)', 'Cumpl. Conversión (%)', 'Caídas Acuerdos (%)', 'Desempeño'
+]
+ALIAS_RESULTADOS = (
+    'avg_conversion', 'avg_recaudo', 'avg_tiempo', 'avg_cump_recaudo', 'avg_cump_conv', 'avg_caidas', 'desempeno',
+)
+CRITERIOS_SER = ('actitud', 'trabajo_en_equipo', 'sentido_pertenencia', 'relacionamiento', 'compromiso')
+
+
+def _redondear(valor):
+    return None if valor is None else round(float(valor), 2)
+
+
+def filtros_historico(params):
+    """
+    Aplica los filtros del histórico (desde, hasta, lider, negociador) y retorna
+    (evaluaciones Hacer, evaluaciones Ser, filtros normalizados). Las fechas se
+    filtran como rango semiabierto para poder usar los índices por fecha.
+    """
+    desde_str = params.get('desde')
+    hasta_str = params.get('hasta')
+    lider_cedula = params.get('lider')
+    negociador_cedula = params.get('negociador')
+
+    try:
+        desde = datetime.strptime(desde_str, '%Y-%m-%d').date() if desde_str else None
+    except ValueError:
+        desde = None
+    try:
+        hasta = datetime.strptime(hasta_str, '%Y-%m-%d').date() if hasta_str else None
+    except ValueError:
+        hasta = None
+    if desde and hasta and hasta < desde:
+        desde, hasta = hasta, desde
+
+    rango = rango_datetime(desde, hasta)
+    evals = Evaluation.objects.select_related('negotiator', 'evaluator').filter(**rango)
+    ser_evals = SerEvaluation.objects.select_related('negotiator', 'evaluator').filter(**rango)
+
+    if lider_cedula:
+        evals = evals.filter(evaluator__cedula=lider_cedula)
+        ser_evals = ser_evals.filter(evaluator__cedula=lider_cedula)
+    if negociador_cedula:
+        evals = evals.filter(negotiator__cedula=negociador_cedula)
+        ser_evals = ser_evals.filter(negotiator__cedula=negociador_cedula)
+
+    filtros = {'desde': desde, 'hasta': hasta, 'lider': lider_cedula, 'negociador': negociador_cedula}
+    return evals, ser_evals, filtros
+
+
+def filas_hacer(evals, chunk_size=EXPORT_CHUNK_SIZE):
+    """Filas de la hoja Hacer (más recientes primero), leídas por bloques."""
+    filas = evals.order_by('-date').values_list(*CAMPOS_PERSONAS, 'overall_score', 'feedback')
+    for fecha, nombre, apellido, email, negociador, cedula, puntaje, feedback in filas.iterator(chunk_size=chunk_size):
+        yield [
+            fecha.strftime('%Y-%m-%d %H:%M'), f'{nombre} {apellido}', email, negociador, cedula,
+            _redondear(puntaje), feedback or '',
+        ]
+
+
+def filas_ser(ser_evals, chunk_size=EXPORT_CHUNK_SIZE):
+    """Filas de la hoja Ser con el promedio de ``scoring.promedio_ser`` (el de ``SerEvaluation.promedio``)."""
+    filas = ser_evals.order_by('-date').values_list(*CAMPOS_PERSONAS, *CRITERIOS_SER)
+    for fecha, nombre, apellido, email, negociador, cedula, *criterios in filas.iterator(chunk_size=chunk_size):
+        yield [
+            fecha.strftime('%Y-%m-%d %H:%M'), f'{nombre} {apellido}', email, negociador, cedula,
+            *criterios, promedio_ser(criterios),
+        ]
+
+
+def escribir_historico_excel(destino, evals, ser_evals, chunk_size=EXPORT_CHUNK_SIZE):
+    """Escribe el Excel del histórico (hojas Hacer y Ser) en ``destino`` (ruta o archivo)."""
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws_hacer = wb.create_sheet('Evaluaciones Hacer')
+    ws_hacer.append(ENCABEZADOS_HACER)
+    for fila in filas_hacer(evals, chunk_size):
+        ws_hacer.append(fila)
+
+    ws_ser = wb.create_sheet('Evaluaciones Ser')
+    ws_ser.append(ENCABEZADOS_SER)
+    for fila in filas_ser(ser_evals, chunk_size):
+        ws_ser.append(fila)
+    wb.save(destino)
+
+
+def exportar_resultados_excel(params, destino):
+    """Excel de resultados por líder del rango del dashboard (año/semestre o desde/hasta)."""
+    import openpyxl
+    from openpyxl.utils import get_column_letter
+
+    desde_str = params.get('desde')
+    hasta_str = params.get('hasta')
+    start_date, end_date, year, semestre = rango_dashboard(params)
+
+    # Datos consolidados (snapshot si el semestre está cerrado, si no desde las tablas de rollup)
+    filas = obtener_consolidado(start_date, end_date)
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = f'{start_date} a {end_date}' if desde_str or hasta_str else f'Semestre {semestre} {year}'
+    ws.append(ENCABEZADOS_RESULTADOS)
+    for row in filas:
+        ws.append([
+            row['cedula'],
+            row['nombre'],
+            row['email'],
+            row['equipos'],
+            *(_redondear(row[alias]) for alias in ALIAS_RESULTADOS),
+        ])
+
+    # Ajuste simple de ancho
+    for idx, _ in enumerate(ENCABEZADOS_RESULTADOS, start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = 20
+    wb.save(destino)
+
+    # Nombre de archivo sensible al filtro utilizado
+    if desde_str or hasta_str:
+        return f'resultados_{start_date}_{end_date}.xlsx'
+    return f'resultados_semestre_{semestre}_{year}.xlsx'
+
+
+def exportar_historico_excel(params, destino):
+    evals, ser_evals, _ = filtros_historico(params)
+    escribir_historico_excel(destino, evals, ser_evals)
+    return 'historico_evaluaciones.xlsx'
+
+
+class HistoriaPorBloques(list):
+    """
+    Story de reportlab que se llena desde un iterable de flowables a medida que
+    ``doc.build`` los consume (saca siempre el primero), en lugar de tenerlos
+    todos en memoria antes de empezar.
+    """
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._pendientes = iter(flowables)
+
+    def _llenar(self):
+        if not super().__len__():
+            siguiente = next(self._pendientes, None)
+            if siguiente is not None:
+                self.append(siguiente)
+
+    def __len__(self):
+        self._llenar()
+        return super().__len__()
+
+    def __getitem__(self, indice):
+        self._llenar()
+        return super().__getitem__(indice)
+
+
+def _tablas_pdf(encabezado, filas, anchos, estilo, filas_por_tabla=PDF_FILAS_POR_TABLA):
+    """
+    Una ``Table`` por bloque de ``filas_por_tabla`` filas, con anchos fijos para
+    que las columnas queden alineadas entre bloques y el encabezado repetido en
+    cada página (``repeatRows``). Tablas pequeñas evitan el costo de partir una
+    tabla gigante página a página.
+    """
+    from reportlab.platypus import Table
+
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) == filas_por_tabla:
+            yield Table([encabezado, *bloque], colWidths=anchos, repeatRows=1, style=estilo, hAlign='LEFT')
+            bloque = []
+    if bloque:
+        yield Table([encabezado, *bloque], colWidths=anchos, repeatRows=1, style=estilo, hAlign='LEFT')
+
+
+def exportar_historico_pdf(params, destino, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    PDF del histórico con todas las evaluaciones Hacer y Ser (sin tope de
+    filas), leídas por bloques y paginadas en tablas con encabezado repetido.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib import colors
+    from reportlab.lib.units import cm
+
+    evals, ser_evals, filtros = filtros_historico(params)
+    desde, hasta = filtros['desde'], filtros['hasta']
+
+    doc = SimpleDocTemplate(destino, pagesize=A4, leftMargin=1.5*cm, rightMargin=1.5*cm, topMargin=1.5*cm, bottomMargin=1.5*cm)
+    styles = getSampleStyleSheet()
+    estilo = TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ])
+    anchos = [3.2*cm, 5.5*cm, 5.5*cm, 3.8*cm]
+
+    def historia():
+        # Título
+        subt = []
+        if desde:
+            subt.append(f'Desde: {desde.strftime("%Y-%m-%d")}')
+        if hasta:
+            subt.append(f'Hasta: {hasta.strftime("%Y-%m-%d")}')
+        yield Paragraph('Histórico de Evaluaciones', styles['Title'])
+        if subt:
+            yield Paragraph(' | '.join(subt), styles['Normal'])
+        yield Spacer(1, 12)
+
+        # Tabla Hacer: fecha, líder, negociador, puntaje
+        yield Paragraph('Evaluaciones Hacer', styles['Heading2'])
+        yield from _tablas_pdf(
+            ['Fecha', 'Líder', 'Negociador', 'Hacer (0-100)'],
+            ([fila[0], fila[1], fila[3], fila[5]] for fila in filas_hacer(evals, chunk_size)),
+            anchos, estilo,
+        )
+        yield Spacer(1, 12)
+
+        # Tabla Ser: fecha, líder, negociador, promedio
+        yield Paragraph('Evaluaciones Ser', styles['Heading2'])
+        yield from _tablas_pdf(
+            ['Fecha', 'Líder', 'Negociador', 'Promedio SER (1-5)'],
+            ([fila[0], fila[1], fila[3], fila[-1]] for fila in filas_ser(ser_evals, chunk_size)),
+            anchos, estilo,
+        )
+
+    doc.build(HistoriaPorBloques(historia()))
+    return 'historico_evaluaciones.pdf'
+
+
+# tipo de ExportJob -> (función exportar_*, content type)
+EXPORTACIONES = {
+    'resultados_excel': (exportar_resultados_excel, XLSX_CONTENT_TYPE),
+    'historico_excel': (exportar_historico_excel, XLSX_CONTENT_TYPE),
+    'historico_pdf': (exportar_historico_pdf, PDF_CONTENT_TYPE),
+}
+
+
+def archivo_temporal():
+    return SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+
+def respuesta_archivo(archivo, filename, content_type):
+    """``FileResponse`` que envía ``archivo`` desde el inicio por bloques y lo cierra al terminar."""
+    archivo.seek(0)
+    return FileResponse(archivo, as_attachment=True, filename=filename, content_type=content_type)
+
+
+def bloques_indicadores(indicadores, chunk_size=INDICADORES_CHUNK_SIZE):
+    """
+    Bloques (listas) de filas de ``indicadores`` en el orden de
+    ``COLUMNAS_INDICADORES``, ordenados por fecha y negociador. Cada bloque se
+    pide después del último (date, negotiator_id) entregado.
+    """
+    columnas = ('date', 'negotiator_id', 'negotiator__cedula', 'negotiator__name', 'negotiator__leader_id', *KPI_FIELDS)
+    indicadores = indicadores.order_by('date', 'negotiator_id')
+    ultimo = None
+    while True:
+        bloque = indicadores
+        if ultimo is not None:
+            fecha, negotiator_id = ultimo
+            bloque = bloque.filter(Q(date__gt=fecha) | Q(date=fecha, negotiator_id__gt=negotiator_id))
+        filas = list(bloque.values_list(*columnas)[:chunk_size])
+        if not filas:
+            return
+        yield [(fila[0], *fila[2:]) for fila in filas]
+        if len(filas) < chunk_size:
+            return
+        ultimo = filas[-1][:2]
+
+
+def csv_de_bloques(bloques):
+    """Bytes UTF-8 del CSV (encabezado y luego un fragmento por bloque)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNAS_INDICADORES)
+    yield buffer.getvalue().encode()
+    for bloque in bloques:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(bloque)
+        yield buffer.getvalue().encode()
+
+
+def ndjson_de_bloques(bloques):
+    """Bytes UTF-8 de un objeto JSON por línea, un fragmento por bloque."""
+    for bloque in bloques:
+        yield ''.join(
+            json.dumps(dict(zip(COLUMNAS_INDICADORES, (fila[0].isoformat(), *fila[1:]))), ensure_ascii=False) + '\n'
+            for fila in bloque
+        ).encode()
+
+
+def negociadores_para_pdf(negotiators):
+    """``negotiators`` con lo que necesita ``datos_evaluacion_pdf``, en dos consultas en total."""
+    return negotiators.select_related('leader', 'last_evaluation', 'last_ser_evaluation').prefetch_related(
+        Prefetch('last_evaluation__kpis', queryset=EvaluationKPI.objects.select_related('kpi'))
+    )
+
+
+def datos_evaluacion_pdf(negotiator):
+    """Datos planos (serializables) del PDF de la última evaluación de ``negotiator``."""
+    evaluacion = negotiator.last_evaluation
+    ser = negotiator.last_ser_evaluation
+    lider = negotiator.leader
+    return {
+        'negociador': negotiator.name,
+        'cedula': negotiator.cedula,
+        'lider': f'{lider.first_name} {lider.last_name}',
+        'lider_cedula': lider.cedula,
+        'lider_email': lider.email,
+        'fecha': evaluacion.date.strftime('%d/%m/%Y %H:%M'),
+        'kpis': [(ek.kpi.name, _redondear(ek.score)) for ek in evaluacion.kpis.all()],
+        'hacer': _redondear(evaluacion.overall_score),
+        'ser': _redondear(ser.promedio * ESCALA_SER) if ser else None,
+        'total': puntaje_total([evaluacion.overall_score], [ser.promedio if ser else None])[0],
+        'feedback': evaluacion.feedback,
+    }
+
+
+class _SalidaZip:
+    """Archivo de solo escritura (sin seek) para ``ZipFile``: acumula lo escrito hasta ``vaciar``."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _renderizar(datos, workers):
+    """
+    (item, PDF) de cada item de ``datos`` en orden. Con más de un worker usa un
+    pool de procesos y consume ``datos`` de a ventanas: nunca hay más de
+    ``PDF_VENTANA_POR_WORKER * workers`` PDFs encargados sin entregar. Si el
+    generador se cierra antes de terminar (cliente desconectado), los PDFs en
+    cola se cancelan.
+    """
+    datos = iter(datos)
+    primeros = list(islice(datos, 2))
+    if workers <= 1 or len(primeros) <= 1:
+        for item in chain(primeros, datos):
+            yield item, pdf_evaluacion(item)
+        return
+    ventana = PDF_VENTANA_POR_WORKER * workers
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        encargados = deque()
+        for item in chain(primeros, datos):
+            encargados.append((item, pool.submit(pdf_evaluacion, item)))
+            if len(encargados) >= ventana:
+                item, futuro = encargados.popleft()
+                yield item, futuro.result()
+        while encargados:
+            item, futuro = encargados.popleft()
+            yield item, futuro.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def evaluaciones_pdf_zip(negotiators, workers=None, carpeta_por_lider=False):
+    """
+    Bytes de un ZIP con el PDF de la última evaluación de cada negociador de
+    ``negotiators``, emitidos a medida que se renderizan (``workers`` procesos,
+    por defecto ``settings.PDF_WORKERS`` o los núcleos disponibles). Los
+    negociadores se cargan por lotes de ``PDF_LOTE_NEGOCIADORES`` a medida que
+    el pool los pide; los que no tienen evaluación se listan en
+    ``sin_evaluacion.txt``.
+    """
+    ids = list(negotiators.order_by('leader_id', 'name', 'pk').values_list('pk', flat=True))
+    sin_evaluacion = []
+
+    def con_evaluacion():
+        for i in range(0, len(ids), PDF_LOTE_NEGOCIADORES):
+            lote = ids[i:i + PDF_LOTE_NEGOCIADORES]
+            cargados = negociadores_para_pdf(negotiators.model.objects.filter(pk__in=lote)).in_bulk()
+            for pk in lote:
+                negotiator = cargados.get(pk)
+                if negotiator is None:
+                    # Borrado después de leer los ids: se omite para no cortar el ZIP
+                    continue
+                if negotiator.last_evaluation_id:
+                    yield datos_evaluacion_pdf(negotiator)
+                else:
+                    sin_evaluacion.append(f'{negotiator.leader_id}\t{negotiator.cedula}\t{negotiator.name}\n')
+
+    workers = workers or getattr(settings, 'PDF_WORKERS', None) or os.cpu_count() or 1
+    salida = _SalidaZip()
+    # Los PDF ya vienen comprimidos: se guardan sin volver a comprimir
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as zip_, \
+            closing(_renderizar(con_evaluacion(), workers)) as pdfs:
+        for item, pdf in pdfs:
+            carpeta = f'{item["lider_cedula"]}/' if carpeta_por_lider else ''
+            zip_.writestr(f'{carpeta}evaluacion_{item["cedula"]}.pdf', pdf)
+            yield salida.vaciar()
+        if sin_evaluacion:
+            zip_.writestr('sin_evaluacion.txt', ''.join(sin_evaluacion))
+    yield salida.vaciar()
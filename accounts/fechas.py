@@ -0,0 +1,30 @@
+"""
+Filtros de rango de fechas sobre campos DateTimeField.
+
+``date__date__gte``/``date__date__lte`` envuelven la columna en una función
+(conversión de zona horaria + extracción de fecha), lo que impide usar índices.
+``rango_datetime`` produce el mismo filtro como un rango semiabierto
+``[desde 00:00, hasta + 1 día 00:00)`` en la zona horaria actual, comparando la
+columna directamente.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def inicio_del_dia(fecha):
+    """Datetime consciente de la medianoche de ``fecha`` en la zona horaria actual."""
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+def rango_datetime(desde=None, hasta=None, campo='date'):
+    """
+    Kwargs de filtro equivalentes a ``{campo}__date__gte=desde`` y
+    ``{campo}__date__lte=hasta``. Cualquiera de los extremos puede omitirse.
+    """
+    filtro = {}
+    if desde:
+        filtro[f'{campo}__gte'] = inicio_del_dia(desde)
+    if hasta:
+        filtro[f'{campo}__lt'] = inicio_del_dia(hasta + timedelta(days=1))
+    return filtro
@@ -60,6 +60,52 @@ class EvaluationForm(forms.Form):
     )
     
 
+class EvaluacionEquipoForm(forms.Form):
+    """
+    Evaluación del Hacer de varios negociadores en un solo envío: por cada
+    negociador pendiente, una casilla ``incluir_<cédula>`` y su feedback
+    ``feedback_<cédula>``.
+    """
+
+    def __init__(self, *args, negociadores=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.negociadores = list(negociadores)
+        for negotiator in self.negociadores:
+            self.fields[f'incluir_{negotiator.cedula}'] = forms.BooleanField(
+                label=negotiator.name, required=False, initial=True,
+                widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            )
+            self.fields[f'feedback_{negotiator.cedula}'] = forms.CharField(
+                label='Comentarios y Retroalimentación', required=False,
+                widget=forms.Textarea(attrs={
+                    'class': 'form-control',
+                    'rows': 2,
+                    'placeholder': 'Escribe tus comentarios sobre el desempeño del negociador...'
+                }),
+            )
+
+    def filas(self):
+        """(negociador, campo incluir, campo feedback) para la plantilla."""
+        return [
+            (negotiator, self[f'incluir_{negotiator.cedula}'], self[f'feedback_{negotiator.cedula}'])
+            for negotiator in self.negociadores
+        ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.negociadores and not self.seleccionados():
+            raise forms.ValidationError('Selecciona al menos un negociador para evaluar.')
+        return cleaned_data
+
+    def seleccionados(self):
+        """Lista de (negociador, feedback) marcados para evaluar."""
+        return [
+            (negotiator, self.cleaned_data.get(f'feedback_{negotiator.cedula}', ''))
+            for negotiator in self.negociadores
+            if self.cleaned_data.get(f'incluir_{negotiator.cedula}')
+        ]
+
+
 # Formulario para la Evaluación del Ser
 class SerEvaluationForm(forms.Form):
     actitud = forms.ChoiceField(
@@ -0,0 +1,178 @@
+"""
+Exportaciones en segundo plano.
+
+La vista crea un ``ExportJob`` con ``encolar`` y responde de inmediato; el
+comando ``procesar_exportaciones`` reclama los trabajos pendientes y los
+ejecuta en un pool de hilos con las mismas funciones ``exports.exportar_*`` de
+las descargas directas. El archivo queda en ``settings.EXPORT_JOBS_DIR`` hasta
+``expires_at``; ``purgar_vencidos`` borra archivo y fila.
+
+Cada reclamo genera un token de intento: el worker renueva ``heartbeat_at``
+mientras trabaja y solo el intento vigente puede cerrar el trabajo. Si un
+worker deja de latir, ``recuperar_abandonados`` reencola el trabajo y el
+intento viejo, si seguía vivo, descarta su archivo.
+
+Un pedido idéntico (mismo tipo y parámetros) a uno pendiente o en proceso
+reutiliza ese trabajo; la restricción única ``exportjob_clave_activa`` cubre
+la carrera entre dos requests simultáneos.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from . import exports
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de la URL que usa cada tipo; el resto se ignora para la clave
+PARAMETROS = {
+    'resultados_excel': ('anio', 'semestre', 'desde', 'hasta'),
+    'historico_excel': ('desde', 'hasta', 'lider', 'negociador'),
+    'historico_pdf': ('desde', 'hasta', 'lider', 'negociador'),
+}
+
+
+def directorio():
+    return Path(settings.EXPORT_JOBS_DIR)
+
+
+def ruta_archivo(job):
+    return directorio() / job.archivo
+
+
+def clave_exportacion(tipo, parametros):
+    return hashlib.sha256(json.dumps([tipo, parametros], sort_keys=True).encode()).hexdigest()
+
+
+def encolar(tipo, params, usuario=None):
+    """
+    Encola una exportación ``tipo`` con los parámetros relevantes de ``params``
+    (``request.GET``/``request.POST`` o dict). Retorna (job, creado); si ya hay
+    uno activo idéntico se retorna ese con ``creado=False``.
+    """
+    parametros = {nombre: params.get(nombre) for nombre in PARAMETROS[tipo] if params.get(nombre)}
+    clave = clave_exportacion(tipo, parametros)
+    activo = ExportJob.objects.filter(clave=clave, estado__in=ExportJob.ESTADOS_ACTIVOS).first()
+    if activo:
+        return activo, False
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(tipo=tipo, parametros=parametros, clave=clave, solicitado_por=usuario)
+    except IntegrityError:
+        # Otro request idéntico lo creó entre la consulta y el insert
+        return ExportJob.objects.filter(clave=clave).order_by('-created_at').first(), False
+    return job, True
+
+
+def pendientes(limite):
+    """Ids de los trabajos pendientes más antiguos."""
+    if limite <= 0:
+        return []
+    return list(
+        ExportJob.objects.filter(estado='pendiente').order_by('created_at').values_list('pk', flat=True)[:limite]
+    )
+
+
+def reclamar(job_id):
+    """
+    Pasa el trabajo a "en proceso" si sigue pendiente y retorna el token del
+    intento, o None si otro worker lo tomó.
+    """
+    intento = uuid.uuid4().hex
+    ahora = timezone.now()
+    reclamado = ExportJob.objects.filter(pk=job_id, estado='pendiente').update(
+        estado='en_proceso', started_at=ahora, heartbeat_at=ahora, intento=intento
+    )
+    return intento if reclamado else None
+
+
+def _del_intento(job_id, intento):
+    return ExportJob.objects.filter(pk=job_id, estado='en_proceso', intento=intento)
+
+
+@contextmanager
+def _latiendo(job_id, intento):
+    """Renueva ``heartbeat_at`` en un hilo mientras el intento sigue siendo el dueño del trabajo."""
+    detener = threading.Event()
+    intervalo = getattr(settings, 'EXPORT_JOBS_LATIDO_SEGUNDOS', 30)
+
+    def latir():
+        try:
+            while not detener.wait(intervalo):
+                if not _del_intento(job_id, intento).update(heartbeat_at=timezone.now()):
+                    break
+        finally:
+            connections.close_all()
+
+    hilo = threading.Thread(target=latir, name=f'latido-{job_id}', daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detener.set()
+        hilo.join()
+
+
+def ejecutar(job_id, intento):
+    """
+    Genera el archivo de un trabajo ya reclamado por ``intento``. Se escribe a
+    un temporal propio del intento y se renombra al terminar, así una descarga
+    nunca ve un archivo a medias. Si el trabajo se reencoló o se borró
+    mientras tanto, el resultado se descarta.
+    """
+    job = _del_intento(job_id, intento).first()
+    if job is None:
+        return
+    funcion, _ = exports.EXPORTACIONES[job.tipo]
+    directorio().mkdir(parents=True, exist_ok=True)
+    temporal = directorio() / f'{job.pk}-{intento}.tmp'
+    try:
+        with _latiendo(job_id, intento), open(temporal, 'wb') as destino:
+            nombre_archivo = funcion(job.parametros, destino)
+        final = temporal.with_suffix(Path(nombre_archivo).suffix)
+        os.replace(temporal, final)
+    except Exception as exc:
+        logger.exception('Falló la exportación %s', job.pk)
+        temporal.unlink(missing_ok=True)
+        _finalizar(job_id, intento, estado='error', error=str(exc) or exc.__class__.__name__)
+        return
+    if not _finalizar(job_id, intento, estado='terminado', archivo=final.name, nombre_archivo=nombre_archivo):
+        final.unlink(missing_ok=True)
+
+
+def _finalizar(job_id, intento, **campos):
+    """Cierra el trabajo solo si ``intento`` sigue siendo su dueño. Retorna si lo cerró."""
+    ahora = timezone.now()
+    expira = ahora + timedelta(hours=getattr(settings, 'EXPORT_JOBS_TTL_HORAS', 24))
+    return bool(_del_intento(job_id, intento).update(finished_at=ahora, expires_at=expira, **campos))
+
+
+def recuperar_abandonados():
+    """
+    Devuelve a la cola los trabajos "en proceso" cuyo worker dejó de latir
+    (murió sin terminarlos). Un intento reencolado ya no puede cerrar el trabajo.
+    """
+    limite = timezone.now() - timedelta(minutes=getattr(settings, 'EXPORT_JOBS_TIMEOUT_MINUTOS', 30))
+    return ExportJob.objects.filter(estado='en_proceso', heartbeat_at__lt=limite).update(
+        estado='pendiente', started_at=None, heartbeat_at=None, intento=''
+    )
+
+
+def purgar_vencidos():
+    """Borra los archivos y las filas de los trabajos vencidos. Retorna cuántos."""
+    vencidos = ExportJob.objects.filter(expires_at__lt=timezone.now())
+    for archivo in vencidos.exclude(archivo='').values_list('archivo', flat=True):
+        (directorio() / archivo).unlink(missing_ok=True)
+    borrados, _ = vencidos.delete()
+    return borrados
@@ -0,0 +1,40 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from accounts import scoring
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark del módulo de puntajes: throughput de desempeño y total Hacer/Ser para N entidades'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--n', type=int, default=100_000, help='Número de entidades (por defecto 100000).')
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        n = options['n']
+        rng = random.Random(options['seed'])
+
+        def columna(lo, hi, nulos=0.01):
+            return [None if rng.random() < nulos else rng.uniform(lo, hi) for _ in range(n)]
+
+        conversion, cump_recaudo, cump_conv, caidas = (columna(0, 100) for _ in range(4))
+        hacer, ser = columna(0, 100), columna(1, 5)
+
+        casos = [
+            ('desempeno', lambda: scoring.desempeno(conversion, cump_recaudo, cump_conv, caidas)),
+            ('puntaje_total', lambda: scoring.puntaje_total(hacer, ser)),
+        ]
+        for nombre, fn in casos:
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                inicio = time.perf_counter()
+                fn()
+                tiempos.append(time.perf_counter() - inicio)
+            mejor = min(tiempos)
+            self.stdout.write(self.style.SUCCESS(
+                f'{nombre}: {n} entidades en {mejor * 1000:.1f} ms (mejor de {len(tiempos)}) '
+                f'-> {n / mejor:,.0f} entidades/s'
+            ))
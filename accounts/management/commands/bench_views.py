@@ -0,0 +1,193 @@
+import json
+import logging
+import platform
+import subprocess
+import time
+import tracemalloc
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from accounts.datagen import generar_dataset
+from accounts.models import User
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano (sin interpolar) sobre una lista no vacía."""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def _commit_actual():
+    base_dir = Path(settings.BASE_DIR)
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=base_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        sucio = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=base_dir, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(sucio)
+
+
+def _consumir(response):
+    """Lee la respuesta completa (incluidas las de streaming) y retorna su tamaño en bytes."""
+    if getattr(response, 'streaming', False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark de vistas y exportaciones sobre un dataset sintético reproducible. '
+        'Crea una base de datos de prueba, la puebla con accounts.datagen y reporta '
+        'p50/p95 de latencia, número de consultas y pico de memoria en JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lideres', type=int, default=10)
+        parser.add_argument('--negociadores', type=int, default=20, help='Negociadores por líder.')
+        parser.add_argument('--dias', type=int, default=365, help='Días de indicadores diarios por negociador.')
+        parser.add_argument('--evaluaciones', type=int, default=4, help='Evaluaciones de Hacer y del Ser por negociador.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeticiones', type=int, default=10, help='Mediciones por vista (más una de calentamiento).')
+        parser.add_argument('--solo', nargs='*', default=None, help='Nombres de casos a medir (por defecto todos).')
+        parser.add_argument('--output', default=None, help='Archivo donde guardar el JSON (por defecto stdout).')
+        parser.add_argument('--keepdb', action='store_true', help='Conservar la base de prueba entre corridas.')
+
+    def handle(self, *args, **options):
+        params = {
+            key: options[key]
+            for key in ('lideres', 'negociadores', 'dias', 'evaluaciones', 'seed', 'repeticiones')
+        }
+        setup_test_environment()
+        # Las líneas por request del perfilador no aportan aquí: se miden las consultas directamente
+        logging.getLogger('accounts.perf').setLevel(logging.ERROR)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if options['keepdb'] and User.objects.filter(cedula__startswith='7', role='lider').exists():
+                self.stderr.write('Reutilizando el dataset existente en la base de prueba.')
+                resumen = None
+            else:
+                inicio = time.perf_counter()
+                resumen = generar_dataset(
+                    lideres=options['lideres'],
+                    negociadores_por_lider=options['negociadores'],
+                    dias=options['dias'],
+                    evaluaciones_por_negociador=options['evaluaciones'],
+                    seed=options['seed'],
+                    stdout=self.stderr,
+                )
+                self.stderr.write(f'Dataset generado en {time.perf_counter() - inicio:.1f} s')
+            resultados = self._medir(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        commit, sucio = _commit_actual()
+        reporte = {
+            'commit': commit,
+            'dirty': sucio,
+            'params': params,
+            'dataset': None if resumen is None else {
+                key: resumen[key] for key in ('indicadores', 'evaluaciones', 'ser_evaluaciones')
+            },
+            'entorno': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'db': connection.vendor,
+            },
+            'resultados': resultados,
+        }
+        salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+        if options['output']:
+            Path(options['output']).write_text(salida + '\n', encoding='utf-8')
+            self.stderr.write(f'Reporte escrito en {options["output"]}')
+        else:
+            self.stdout.write(salida)
+
+    def _casos(self):
+        admin = User.objects.filter(email='admin@bench.vg360.local').first() or User.objects.create_superuser(
+            email='admin@bench.vg360.local', password=None, cedula='79999999', role='administrativo'
+        )
+        lider = User.objects.filter(role='lider', cedula__startswith='7').order_by('cedula').first()
+        negociador = lider.negotiators.order_by('cedula').first()
+
+        cliente_admin = Client()
+        cliente_admin.force_login(admin)
+        cliente_lider = Client()
+        cliente_lider.force_login(lider)
+
+        # (nombre, cliente, url, limpiar caché antes de cada medición)
+        return [
+            ('administrativo_dashboard', cliente_admin, reverse('administrativo_dashboard'), True),
+            ('administrativo_dashboard_cache', cliente_admin, reverse('administrativo_dashboard'), False),
+            ('lider_negociadores_api', cliente_admin,
+             reverse('lider_negociadores_api', args=[lider.cedula]), True),
+            ('historico_evaluaciones', cliente_admin, reverse('historico_evaluaciones'), False),
+            ('exportar_resultados_excel', cliente_admin, reverse('exportar_resultados_excel'), True),
+            ('exportar_historico_excel', cliente_admin, reverse('exportar_historico_excel'), False),
+            ('exportar_historico_pdf', cliente_admin, reverse('exportar_historico_pdf'), False),
+            ('lider_dashboard', cliente_lider, reverse('lider_dashboard'), False),
+            ('negotiator_indicators_api', cliente_lider,
+             reverse('negotiator_indicators_api', args=[negociador.cedula]), False),
+            ('lider_equipo_indicadores_api', cliente_lider, reverse('lider_equipo_indicadores_api'), False),
+            ('exportar_evaluacion_pdf', cliente_lider,
+             reverse('exportar_evaluacion_pdf', args=[negociador.cedula]), False),
+        ]
+
+    def _medir(self, options):
+        resultados = {}
+        for nombre, cliente, url, limpiar_cache in self._casos():
+            if options['solo'] and nombre not in options['solo']:
+                continue
+            tiempos, consultas = [], []
+            status = tamano = None
+            for i in range(options['repeticiones'] + 1):
+                if limpiar_cache:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    inicio = time.perf_counter()
+                    response = cliente.get(url)
+                    tamano = _consumir(response)
+                    duracion = time.perf_counter() - inicio
+                status = response.status_code
+                if i == 0:
+                    continue  # calentamiento
+                tiempos.append(duracion * 1000)
+                consultas.append(len(ctx.captured_queries))
+
+            # La memoria se mide en una corrida aparte: tracemalloc distorsiona los tiempos
+            if limpiar_cache:
+                cache.clear()
+            tracemalloc.start()
+            _consumir(cliente.get(url))
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            resultados[nombre] = {
+                'url': url,
+                'status': status,
+                'bytes': tamano,
+                'p50_ms': round(_percentil(tiempos, 50), 2),
+                'p95_ms': round(_percentil(tiempos, 95), 2),
+                'min_ms': round(min(tiempos), 2),
+                'max_ms': round(max(tiempos), 2),
+                'queries': max(consultas),
+                'peak_kb': round(pico / 1024, 1),
+            }
+            self.stderr.write(
+                f'{nombre}: p50 {resultados[nombre]["p50_ms"]} ms, p95 {resultados[nombre]["p95_ms"]} ms, '
+                f'{resultados[nombre]["queries"]} consultas, pico {resultados[nombre]["peak_kb"]} KB'
+            )
+        return resultados
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from accounts.dashboard import cerrar_semestre, rango_semestre
+from accounts.models import SemesterSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Cierra un semestre: guarda un snapshot inmutable con las métricas por líder y negociador '
+        'que el dashboard y las exportaciones sirven en lugar de recalcular.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anio', type=int, required=True)
+        parser.add_argument('--semestre', choices=['1', '2'], required=True)
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Permite cerrar un semestre que aún no ha terminado.',
+        )
+        parser.add_argument(
+            '--reabrir',
+            action='store_true',
+            help='Elimina el snapshot del semestre (vuelve a calcularse en vivo).',
+        )
+
+    def handle(self, *args, **options):
+        anio, semestre = options['anio'], options['semestre']
+        existente = SemesterSnapshot.objects.filter(anio=anio, semestre=semestre)
+
+        if options['reabrir']:
+            if not existente.exists():
+                raise CommandError(f'El semestre {semestre} de {anio} no está cerrado.')
+            existente.delete()
+            self.stdout.write(self.style.SUCCESS(f'Semestre {semestre} de {anio} reabierto.'))
+            return
+
+        if existente.exists():
+            raise CommandError(f'El semestre {semestre} de {anio} ya está cerrado. Usa --reabrir para recalcularlo.')
+
+        _, end_date = rango_semestre(anio, semestre)
+        if end_date >= timezone.now().date() and not options['forzar']:
+            raise CommandError(f'El semestre {semestre} de {anio} no ha terminado (hasta {end_date}). Usa --forzar.')
+
+        snapshot = cerrar_semestre(anio, semestre, getattr(settings, 'SEMESTER_TARGET', 70))
+        total_negociadores = sum(len(lista) for lista in snapshot.negociadores.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Semestre {semestre} de {anio} cerrado: {len(snapshot.leaders_data)} líderes, '
+            f'{total_negociadores} negociadores.'
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.exports import evaluaciones_pdf_zip
+from accounts.models import Negotiator, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera un ZIP con el PDF de la última evaluación de cada negociador de un líder o de toda '
+        'la organización, renderizando en paralelo en un pool de procesos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', help='Ruta del archivo ZIP a generar.')
+        parser.add_argument('--lider', help='Cédula de un líder para limitar la exportación.')
+        parser.add_argument('--workers', type=int, help='Procesos de renderizado (por defecto, PDF_WORKERS o los núcleos).')
+
+    def handle(self, *args, **options):
+        negotiators = Negotiator.objects.all()
+        if options['lider']:
+            if not User.objects.filter(cedula=options['lider'], role='lider').exists():
+                raise CommandError(f'No existe un líder con cédula {options["lider"]}.')
+            negotiators = negotiators.filter(leader_id=options['lider'])
+
+        inicio = time.perf_counter()
+        with open(options['salida'], 'wb') as salida:
+            for bloque in evaluaciones_pdf_zip(
+                negotiators, workers=options['workers'], carpeta_por_lider=not options['lider']
+            ):
+                salida.write(bloque)
+            tamano = salida.tell()
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["salida"]}: {tamano / 1024:.0f} KB en {time.perf_counter() - inicio:.1f} s'
+        ))
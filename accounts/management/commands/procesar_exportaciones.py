@@ -0,0 +1,67 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from accounts import jobs
+
+logger = logging.getLogger(__name__)
+
+
+def _ejecutar(job_id, intento):
+    try:
+        jobs.ejecutar(job_id, intento)
+    finally:
+        # Cada hilo abre su propia conexión
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker de exportaciones en segundo plano: toma los ExportJob pendientes, los genera en un pool '
+        'de hilos y purga los archivos vencidos. Se pueden correr varias instancias a la vez.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'EXPORT_JOBS_WORKERS', 2),
+            help='Exportaciones simultáneas.',
+        )
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos entre revisiones de la cola.')
+        parser.add_argument('--una-vez', action='store_true', help='Procesa la cola actual y termina.')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        en_curso = {}
+        procesados = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='exportacion') as pool:
+            while True:
+                purgados = jobs.purgar_vencidos()
+                recuperados = jobs.recuperar_abandonados()
+                if purgados or recuperados:
+                    self.stdout.write(f'Vencidos purgados: {purgados}. Abandonados reencolados: {recuperados}.')
+
+                for job_id in jobs.pendientes(workers - len(en_curso)):
+                    intento = jobs.reclamar(job_id)
+                    if intento:
+                        en_curso[pool.submit(_ejecutar, job_id, intento)] = job_id
+
+                if not en_curso:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                terminados, _ = wait(en_curso, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    job_id = en_curso.pop(futuro)
+                    try:
+                        futuro.result()
+                    except Exception:
+                        # Un trabajo que falla fuera de jobs.ejecutar no detiene al worker
+                        logger.exception('Falló la exportación %s', job_id)
+                        self.stderr.write(f'Falló la exportación {job_id}.')
+                procesados += len(terminados)
+
+        self.stdout.write(self.style.SUCCESS(f'Exportaciones procesadas: {procesados}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.dashboard import invalidar_dashboard
+from accounts.rollups import reconstruir_rollups, verificar_rollups
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero las tablas de rollup de indicadores y las verifica contra los datos crudos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-verificar',
+            action='store_true',
+            help='No reconstruye; solo compara los rollups actuales con NegotiatorIndicator.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not options['solo_verificar']:
+            self.stdout.write('Reconstruyendo rollups de indicadores...')
+            reconstruir_rollups(batch_size=options['batch_size'])
+            invalidar_dashboard()
+
+        diferencias = verificar_rollups()
+        if diferencias:
+            for diferencia in diferencias[:50]:
+                self.stdout.write(self.style.ERROR(f'  - {diferencia}'))
+            raise CommandError(f'Los rollups no cuadran con los datos crudos ({len(diferencias)} diferencias).')
+        self.stdout.write(self.style.SUCCESS('Rollups verificados: coinciden con los datos crudos.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.dashboard import invalidar_dashboard
+from accounts.models import Negotiator
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula en Negotiator la última evaluación (Hacer y Ser), sus fechas y el conteo de '
+        'evaluaciones, y los verifica contra las tablas de evaluaciones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-verificar',
+            action='store_true',
+            help='No repara; solo compara los campos actuales con las evaluaciones.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['solo_verificar']:
+            self.stdout.write('Recalculando últimas evaluaciones de los negociadores...')
+            actualizados = Negotiator.objects.refrescar_ultimas_evaluaciones()
+            invalidar_dashboard()
+            self.stdout.write(f'{actualizados} negociadores actualizados.')
+
+        diferencias = Negotiator.objects.verificar_ultimas_evaluaciones()
+        if diferencias:
+            for diferencia in diferencias[:50]:
+                self.stdout.write(self.style.ERROR(f'  - {diferencia}'))
+            raise CommandError(f'Los campos de última evaluación no cuadran ({len(diferencias)} diferencias).')
+        self.stdout.write(self.style.SUCCESS('Últimas evaluaciones verificadas: coinciden con las evaluaciones.'))
@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from accounts.models import PLAZO_EVALUACION_DIAS, Negotiator, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Reporte de evaluaciones pendientes de toda la organización, por líder '
+        f'(nunca evaluados o con la última evaluación de hace más de {PLAZO_EVALUACION_DIAS} días).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lider', help='Cédula de un líder para limitar el reporte.')
+        parser.add_argument('--detalle', action='store_true', help='Lista los negociadores pendientes de cada líder.')
+        parser.add_argument('--json', action='store_true', help='Salida en JSON (para trabajos de recordatorio).')
+
+    def handle(self, *args, **options):
+        negotiators = Negotiator.objects.all()
+        lideres = User.objects.filter(role='lider').order_by('first_name', 'last_name')
+        if options['lider']:
+            negotiators = negotiators.filter(leader_id=options['lider'])
+            lideres = lideres.filter(cedula=options['lider'])
+        pendientes = negotiators.resumen_pendientes_por_lider()
+        totales = dict(
+            negotiators.values_list('leader_id').annotate(total=Count('id')).order_by()
+        )
+
+        reporte = []
+        for lider in lideres:
+            items = pendientes.get(lider.cedula, [])
+            reporte.append({
+                'cedula': lider.cedula,
+                'nombre': f'{lider.first_name} {lider.last_name}'.strip(),
+                'email': lider.email,
+                'negociadores': totales.get(lider.cedula, 0),
+                'pendientes': len(items),
+                'detalle': [
+                    {
+                        'cedula': item['negotiator'].cedula,
+                        'nombre': item['negotiator'].name,
+                        'ultima_evaluacion': item['last_evaluation_date'].isoformat() if item['last_evaluation_date'] else None,
+                        'dias_desde_ultima': item['days_since_last'],
+                    }
+                    for item in items
+                ],
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(reporte, indent=2, ensure_ascii=False))
+            return
+
+        for fila in reporte:
+            estilo = self.style.WARNING if fila['pendientes'] else self.style.SUCCESS
+            self.stdout.write(estilo(
+                f"{fila['nombre'] or fila['email']} ({fila['cedula']}): "
+                f"{fila['pendientes']} de {fila['negociadores']} negociadores pendientes"
+            ))
+            if options['detalle']:
+                for item in fila['detalle']:
+                    ultima = item['ultima_evaluacion'] or 'nunca evaluado'
+                    self.stdout.write(f"    - {item['nombre']} ({item['cedula']}): {ultima}")
+        total = sum(fila['pendientes'] for fila in reporte)
+        self.stdout.write(self.style.SUCCESS(f'Total pendientes: {total}'))
@@ -1,228 +1,198 @@
-from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from django.utils import timezone
-from accounts.models import AllowedEmail, Negotiator, NegotiatorIndicator, KPI, Evaluation, EvaluationKPI, SerEvaluation
+import random
+import time
 from datetime import timedelta
-from random import randint, uniform
 from pathlib import Path
 
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Avg
+from django.utils import timezone
+
+from accounts import rollups
+from accounts.dashboard import invalidar_dashboard
+from accounts.datagen import KPIS_EVALUACION, asegurar_kpis, fechas_historia, insertar_indicadores
+from accounts.models import (
+    CAMPOS_PUNTUACION_HACER, AllowedEmail, Evaluation, EvaluationKPI, Negotiator, NegotiatorIndicator,
+    SerEvaluation, User,
+)
+
+# (email, contraseña, cédula, rol, nombre, apellido, superusuario)
+CUENTAS_FIJAS = [
+    ('admin@admin.com', 'admin123', '900000', 'administrativo', 'Admin', 'Principal', True),
+    ('admin@admin', 'admin123', '900001', 'administrativo', 'Admin', 'Control', True),
+    ('administrativo@vg360.local', '123456', '100001', 'administrativo', 'Ana', 'Admin', False),
+    ('analista1@vg360.local', '123456', '100002', 'administrativo', 'Alex', 'Analista', False),
+    ('reportes@vg360.local', '123456', '100003', 'administrativo', 'Rebe', 'Reportes', False),
+    ('soporte@vg360.local', '123456', '100004', 'administrativo', 'Sam', 'Soporte', False),
+]
+PASSWORD_LIDERES = '123456'
+
 
 class Command(BaseCommand):
-    help = 'Siembra usuarios de roles, negociadores y datos simulados. Crea archivo usuarios_credenciales.txt con accesos.'
+    help = (
+        'Siembra usuarios de roles, negociadores y datos simulados con inserciones por lotes. '
+        'Crea archivo usuarios_credenciales.txt con accesos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lideres', type=int, default=6)
+        parser.add_argument('--negociadores-por-lider', type=int, default=3)
+        parser.add_argument(
+            '--granularidad', choices=['mensual', 'diaria'], default='mensual',
+            help='Un indicador cada 30 días (mensual) o uno por día (diaria).',
+        )
+        parser.add_argument('--meses', type=int, default=12, help='Meses de historia de indicadores.')
+        parser.add_argument('--seed', type=int, default=None, help='Semilla para datos reproducibles.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--credenciales', default=None,
+            help='Ruta del archivo de credenciales (por defecto usuarios_credenciales.txt en la raíz del proyecto).',
+        )
 
     def handle(self, *args, **options):
-        User = get_user_model()
+        if options['lideres'] < 0 or options['negociadores_por_lider'] < 0 or options['meses'] < 0:
+            raise CommandError('Los parámetros de escala no pueden ser negativos.')
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        hoy = timezone.now().date()
+        inicio = time.perf_counter()
 
-        created_accounts = []
+        with transaction.atomic():
+            created_accounts = self._usuarios(options['lideres'], batch_size)
+            lideres = [email for email, role, _, _ in created_accounts if role == 'lider']
+            negociadores = self._negociadores(lideres, options['negociadores_por_lider'], batch_size)
+            self.stdout.write(f'{len(created_accounts)} usuarios y {len(negociadores)} negociadores')
 
-        # Asegurar KPIs base para Evaluations (porcentaje)
-        kpis_conf = [
-            ('Conversión de Ventas', 'percentage', '%'),
-            ('Porcentajes de Cumplimiento de Recaudo', 'percentage', '%'),
-            ('Porcentaje de Cumplimiento de Conversión', 'percentage', '%'),
-            ('Porcentaje de Caídas de Acuerdos', 'percentage', '%'),
-        ]
-        for name, ktype, unit in kpis_conf:
-            KPI.objects.get_or_create(
-                name=name,
-                defaults=dict(description=name, kpi_type=ktype, min_value=0.0, max_value=100.0, unit=unit)
+            # 5) Indicadores históricos (upsert por negociador y fecha)
+            fechas = fechas_historia(hoy, options['granularidad'], options['meses'])
+            total, ultimos = insertar_indicadores(
+                rng, [n.pk for n in negociadores], fechas, batch_size, upsert=True
             )
+            self.stdout.write(f'{total} indicadores ({time.perf_counter() - inicio:.1f} s)')
 
-        # Utilidad para crear usuarios respetando AllowedEmail
-        def ensure_allowed(email: str):
-            AllowedEmail.objects.get_or_create(email=email)
-
-        def create_user(email: str, password: str, cedula: str, role: str, first_name: str, last_name: str, is_staff=False, is_superuser=False):
-            ensure_allowed(email)
-            if is_superuser:
-                if not User.objects.filter(email=email).exists():
-                    u = User.objects.create_superuser(
-                        email=email,
-                        password=password,
-                        cedula=cedula,
-                        first_name=first_name,
-                        last_name=last_name,
-                        is_staff=True,
-                        is_superuser=True,
-                        role=role,
-                    )
-                else:
-                    u = User.objects.get(email=email)
-                    u.is_staff = True
-                    u.is_superuser = True
-                    u.role = role
-                    u.set_password(password)
-                    u.save()
-            else:
-                if not User.objects.filter(email=email).exists():
-                    u = User.objects.create_user(
-                        email=email,
-                        password=password,
-                        cedula=cedula,
-                        role=role,
-                        first_name=first_name,
-                        last_name=last_name,
-                    )
-                else:
-                    u = User.objects.get(email=email)
-                    u.role = role
-                    u.set_password(password)
-                    u.save()
-            created_accounts.append((email, role, password, cedula))
-            return u
-
-        # 1) Admin principal (superusuario)
-        admin = create_user(
-            email='admin@admin.com',
-            password='admin123',
-            cedula='900000',
-            role='administrativo',
-            first_name='Admin',
-            last_name='Principal',
-            is_staff=True,
-            is_superuser=True,
-        )
+            # 6) Una evaluación de Hacer y del Ser reciente por negociador
+            self._evaluaciones(rng, negociadores, ultimos, hoy, batch_size)
 
-        # 1b) Admin adicional solicitado: "admin@admin" (control total)
-        admin2 = create_user(
-            email='admin@admin',
-            password='admin123',
-            cedula='900001',
-            role='administrativo',
-            first_name='Admin',
-            last_name='Control',
-            is_staff=True,
-            is_superuser=True,
-        )
+            rollups.reconstruir_rollups(batch_size=batch_size)
+            invalidar_dashboard()
 
-        # 2) Usuarios administrativos
-        administrativo = create_user(
-            email='administrativo@vg360.local',
-            password='123456',
-            cedula='100001',
-            role='administrativo',
-            first_name='Ana',
-            last_name='Admin',
-        )
-        analista1 = create_user(
-            email='analista1@vg360.local',
-            password='123456',
-            cedula='100002',
-            role='administrativo',
-            first_name='Alex',
-            last_name='Analista',
-        )
-        reportes = create_user(
-            email='reportes@vg360.local',
-            password='123456',
-            cedula='100003',
-            role='administrativo',
-            first_name='Rebe',
-            last_name='Reportes',
+        # 7) Escribir archivo de credenciales
+        out = Path(options['credenciales'] or Path(__file__).resolve().parents[3] / 'usuarios_credenciales.txt')
+        with out.open('w', encoding='utf-8') as f:
+            f.write('USUARIOS DE DEMO - Vision Gerencial 360\n')
+            f.write('IMPORTANTE: Ambiente de desarrollo. Contraseñas simples.\n\n')
+            f.write('Correo; Rol; Cédula; Contraseña\n')
+            for email, role, password, cedula in created_accounts:
+                f.write(f'{email}; {role}; {cedula}; {password}\n')
+        self.stdout.write(self.style.SUCCESS(
+            f'Usuarios y datos de demo creados en {time.perf_counter() - inicio:.1f} s. Credenciales en {out}'
+        ))
+
+    def _usuarios(self, num_lideres, batch_size):
+        """Upsert por email de las cuentas fijas y los líderes; cada contraseña se hashea una sola vez."""
+        cuentas = list(CUENTAS_FIJAS) + [
+            (f'lider{i}@vg360.local', PASSWORD_LIDERES, f'20000{i}', 'lider', f'Lider{i}', 'Equipo', False)
+            for i in range(1, num_lideres + 1)
+        ]
+        hashes = {password: make_password(password) for password in {c[1] for c in cuentas}}
+
+        AllowedEmail.objects.bulk_create(
+            [AllowedEmail(email=c[0]) for c in cuentas],
+            batch_size=batch_size, ignore_conflicts=True,
         )
-        soporte = create_user(
-            email='soporte@vg360.local',
-            password='123456',
-            cedula='100004',
-            role='administrativo',
-            first_name='Sam',
-            last_name='Soporte',
+        User.objects.bulk_create(
+            [
+                User(
+                    email=email, password=hashes[password], cedula=cedula, role=role,
+                    first_name=first_name, last_name=last_name,
+                    is_staff=superusuario, is_superuser=superusuario,
+                )
+                for email, password, cedula, role, first_name, last_name, superusuario in cuentas
+            ],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['email'],
+            update_fields=['password', 'role', 'is_staff', 'is_superuser'],
         )
+        return [(c[0], c[3], c[1], c[2]) for c in cuentas]
 
-        # 3) Líderes (6 en total)
-        lideres = []
-        for i in range(1, 7):
-            lider = create_user(
-                email=f'lider{i}@vg360.local',
-                password='123456',
-                cedula=f'20000{i}',
-                role='lider',
-                first_name=f'Lider{i}',
-                last_name='Equipo',
-            )
-            lideres.append(lider)
-
-        # 4) Negociadores por líder (3 cada uno)
+    def _negociadores(self, lider_emails, por_lider, batch_size):
+        """Upsert por cédula de los negociadores de cada líder; retorna las instancias con pk."""
+        # Los líderes se buscan por email, la llave del upsert: en una re-ejecución la cédula
+        # guardada puede no ser la de la cuenta fija
+        por_email = User.objects.in_bulk(lider_emails, field_name='email')
+        lideres = [por_email[email] for email in lider_emails]
         nego_counter = 300001
-        all_negociadores = []
+        negociadores = []
         for lider in lideres:
-            for suf in ['A', 'B', 'C']:
-                n, _ = Negotiator.objects.get_or_create(
-                    leader=lider,
-                    name=f'Negociador {suf} de {lider.first_name}',
-                    defaults={'cedula': str(nego_counter)}
-                )
-                # si ya existe, asegurar cédula consistente
-                if not n.cedula:
-                    n.cedula = str(nego_counter)
-                    n.save()
-                all_negociadores.append(n)
+            for j in range(por_lider):
+                # Sufijos A, B, C... como en los datos de demo originales
+                suf = chr(ord('A') + j) if j < 26 else str(j + 1)
+                negociadores.append(Negotiator(
+                    leader=lider, name=f'Negociador {suf} de {lider.first_name}', cedula=str(nego_counter)
+                ))
                 nego_counter += 1
+        # bulk_create no pasa por Negotiator.save: los rollups por líder se reconstruyen al final
+        Negotiator.objects.bulk_create(
+            negociadores,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['cedula'],
+            update_fields=['leader', 'name'],
+        )
+        for i in range(0, len(negociadores), batch_size):
+            lote = negociadores[i:i + batch_size]
+            pks = dict(Negotiator.objects.filter(cedula__in=[n.cedula for n in lote]).values_list('cedula', 'pk'))
+            for n in lote:
+                n.pk = pks[n.cedula]
+        return negociadores
 
-        # 5) Indicadores históricos (últimos 12 meses, 1 punto por mes)
-        for n in all_negociadores:
-            for i in range(12):
-                date = (timezone.now().date() - timedelta(days=30 * i))
-                NegotiatorIndicator.objects.update_or_create(
-                    negotiator=n,
-                    date=date,
-                    defaults={
-                        'conversion_de_ventas': round(uniform(20, 85), 2),
-                        'recaudacion_mensual': randint(800_000, 8_000_000),
-                        'tiempo_hablando': round(uniform(20, 160), 1),
-                        'porcentajes_cumplimiento_recaudo': round(uniform(60, 100), 2),
-                        'porcentaje_cumplimiento_conversion': round(uniform(60, 100), 2),
-                        'porcentaje_caidas_acuerdos': round(uniform(5, 25), 2),
-                    }
-                )
+    def _evaluaciones(self, rng, negociadores, ultimos, hoy, batch_size):
+        kpis = asegurar_kpis()
 
-        # 6) Crear una evaluación de Hacer y del Ser reciente por negociador
-        kpi_map = {
-            'Conversión de Ventas': 'conversion_de_ventas',
-            'Porcentajes de Cumplimiento de Recaudo': 'porcentajes_cumplimiento_recaudo',
-            'Porcentaje de Cumplimiento de Conversión': 'porcentaje_cumplimiento_conversion',
-            'Porcentaje de Caídas de Acuerdos': 'porcentaje_caidas_acuerdos',
+        # Puntuación del Hacer de los últimos 30 días, como Negotiator.calcular_puntuacion_hacer, en una consulta
+        promedios = {
+            row.pop('negotiator_id'): row
+            for row in (
+                NegotiatorIndicator.objects
+                .filter(date__gte=hoy - timedelta(days=30))
+                .values('negotiator_id')
+                .annotate(**{field: Avg(field) for field in CAMPOS_PUNTUACION_HACER})
+                .order_by()
+            )
         }
-        percentage_kpis = {k.name: k for k in KPI.objects.filter(name__in=list(kpi_map.keys()))}
-        for n in all_negociadores:
-            latest = n.indicators.order_by('-date').first()
-            if latest:
-                overall = n.calcular_puntuacion_hacer() or 0.0
-                ev = Evaluation.objects.create(
-                    negotiator=n,
-                    evaluator=n.leader,
-                    overall_score=overall,
-                    feedback='Buen avance general. Seguir fortaleciendo conversión y recaudo.'
-                )
-                for kpi_name, field in kpi_map.items():
-                    if field and hasattr(latest, field):
-                        EvaluationKPI.objects.create(
-                            evaluation=ev,
-                            kpi=percentage_kpis[kpi_name],
-                            score=getattr(latest, field)
-                        )
-                # Evaluación del Ser
-                SerEvaluation.objects.create(
-                    negotiator=n,
-                    evaluator=n.leader,
-                    actitud=randint(3, 5),
-                    trabajo_en_equipo=randint(3, 5),
-                    sentido_pertenencia=randint(3, 5),
-                    relacionamiento=randint(3, 5),
-                    compromiso=randint(3, 5),
-                )
 
-        # 7) Escribir archivo de credenciales
-        base_dir = Path(__file__).resolve().parents[3]
-        out = base_dir / 'usuarios_credenciales.txt'
-        # Quitar duplicados por email si el comando corre varias veces
-        uniq = {}
-        for email, role, password, cedula in created_accounts:
-            uniq[email] = (email, role, password, cedula)
-        with out.open('w', encoding='utf-8') as f:
-            f.write('USUARIOS DE DEMO - Vision Gerencial 360\n')
-            f.write('IMPORTANTE: Ambiente de desarrollo. Contraseñas simples.\n\n')
-            f.write('Correo; Rol; Cédula; Contraseña\n')
-            for email, role, password, cedula in uniq.values():
-                f.write(f'{email}; {role}; {cedula}; {password}\n')
-        self.stdout.write(self.style.SUCCESS(f'Usuarios y datos de demo creados. Credenciales en {out}'))
+        evaluaciones, ser_evaluaciones = [], []
+        for n in negociadores:
+            latest = ultimos.get(n.pk)
+            if latest is None:
+                continue
+            valores = [v for v in promedios.get(n.pk, {}).values() if v is not None]
+            overall = round(sum(valores) / len(valores), 2) if valores else 0.0
+            evaluaciones.append(Evaluation(
+                negotiator=n,
+                evaluator_id=n.leader_id,
+                overall_score=overall,
+                feedback='Buen avance general. Seguir fortaleciendo conversión y recaudo.',
+            ))
+            ser_evaluaciones.append(SerEvaluation(
+                negotiator=n,
+                evaluator_id=n.leader_id,
+                actitud=rng.randint(3, 5),
+                trabajo_en_equipo=rng.randint(3, 5),
+                sentido_pertenencia=rng.randint(3, 5),
+                relacionamiento=rng.randint(3, 5),
+                compromiso=rng.randint(3, 5),
+            ))
+        evaluaciones = Evaluation.objects.bulk_create(evaluaciones, batch_size=batch_size)
+        SerEvaluation.objects.bulk_create(ser_evaluaciones, batch_size=batch_size)
+        EvaluationKPI.objects.bulk_create(
+            [
+                EvaluationKPI(evaluation=ev, kpi=kpis[kpi_name], score=getattr(ultimos[ev.negotiator_id], field))
+                for ev in evaluaciones
+                for kpi_name, field in KPIS_EVALUACION.items()
+            ],
+            batch_size=batch_size,
+        )
+        self.stdout.write(f'{len(evaluaciones)} evaluaciones de Hacer y del Ser')
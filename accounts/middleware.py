@@ -0,0 +1,133 @@
+"""
+Perfilado de consultas SQL por request.
+
+Registra el número de consultas, el tiempo total en SQL y las formas de consulta
+más repetidas (síntoma típico de N+1) de cada request, etiquetadas con el nombre
+de la URL. Agrega el header ``Server-Timing``, escribe una línea de log JSON en
+``accounts.perf`` y compara el conteo con el presupuesto configurado en
+``settings.QUERY_BUDGETS``.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse
+
+logger = logging.getLogger('accounts.perf')
+
+# Literales y listas de parámetros que no cambian la forma de la consulta
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_FIN = object()
+
+
+class QueryBudgetExceeded(Exception):
+    """Un request ejecutó más consultas que el presupuesto de su vista."""
+
+
+def forma_consulta(sql):
+    """Normaliza una consulta a su forma: sin literales y con listas IN colapsadas."""
+    sql = _LITERALES.sub('%s', sql)
+    return _LISTAS.sub('(%s, ...)', sql)
+
+
+class _RegistroConsultas:
+    """execute_wrapper que acumula conteo, tiempo y formas de las consultas."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.formas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - inicio
+            self.count += 1
+            self.formas[forma_consulta(sql)] += 1
+
+
+class QueryProfilerMiddleware:
+    """
+    En las respuestas en streaming (salvo ``FileResponse``, que solo lee un
+    archivo) las consultas ocurren mientras se consume el cuerpo: se siguen
+    contando hasta el último bloque y el log y el presupuesto se evalúan al
+    terminar. ``Server-Timing`` solo cubre lo ejecutado antes del cuerpo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @staticmethod
+    def _contando(registro):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(registro))
+        return stack
+
+    def __call__(self, request):
+        registro = _RegistroConsultas()
+        inicio = time.perf_counter()
+        with self._contando(registro):
+            response = self.get_response(request)
+        total = time.perf_counter() - inicio
+
+        response['Server-Timing'] = (
+            f'db;dur={registro.duration * 1000:.1f};desc="{registro.count} queries", '
+            f'app;dur={total * 1000:.1f}'
+        )
+        if response.streaming and not response.is_async and not isinstance(response, FileResponse):
+            response.streaming_content = self._cuerpo_contado(response.streaming_content, request, response, registro, inicio)
+        else:
+            self._reportar(request, response, registro, total)
+        return response
+
+    def _cuerpo_contado(self, contenido, request, response, registro, inicio):
+        completo = False
+        try:
+            while True:
+                with self._contando(registro):
+                    bloque = next(contenido, _FIN)
+                if bloque is _FIN:
+                    break
+                yield bloque
+            completo = True
+        finally:
+            # Si el cliente corta la descarga solo se registra; no se lanza durante el cierre
+            self._reportar(request, response, registro, time.perf_counter() - inicio, lanzar=completo)
+
+    def _reportar(self, request, response, registro, total, lanzar=True):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        top = getattr(settings, 'QUERY_PROFILE_TOP', 5)
+        repetidas = [
+            {'sql': sql[:300], 'count': count}
+            for sql, count in registro.formas.most_common(top) if count > 1
+        ]
+        logger.info(json.dumps({
+            'url_name': url_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': registro.count,
+            'db_ms': round(registro.duration * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'repeated': repetidas,
+        }))
+
+        budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        budget = budgets.get(url_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+        if budget is not None and registro.count > budget:
+            mensaje = (
+                f'{url_name or request.path} ejecutó {registro.count} consultas '
+                f'(presupuesto {budget}). Más repetidas: {repetidas}'
+            )
+            if lanzar and getattr(settings, 'QUERY_BUDGET_RAISE', False):
+                raise QueryBudgetExceeded(mensaje)
+            logger.warning(mensaje)
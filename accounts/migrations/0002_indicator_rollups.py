@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+KPI_FIELDS = (
+    'conversion_de_ventas',
+    'recaudacion_mensual',
+    'tiempo_hablando',
+    'porcentajes_cumplimiento_recaudo',
+    'porcentaje_cumplimiento_conversion',
+    'porcentaje_caidas_acuerdos',
+)
+
+
+def poblar_rollups(apps, schema_editor):
+    NegotiatorIndicator = apps.get_model('accounts', 'NegotiatorIndicator')
+    NegotiatorIndicatorRollup = apps.get_model('accounts', 'NegotiatorIndicatorRollup')
+    LeaderIndicatorRollup = apps.get_model('accounts', 'LeaderIndicatorRollup')
+    sumas = {'count': Count('id'), **{f'sum_{field}': Sum(field) for field in KPI_FIELDS}}
+    indicadores = NegotiatorIndicator.objects.annotate(month=TruncMonth('date'))
+
+    NegotiatorIndicatorRollup.objects.bulk_create(
+        [NegotiatorIndicatorRollup(**row) for row in indicadores.values('negotiator_id', 'month').annotate(**sumas).order_by()],
+        batch_size=2000,
+    )
+    filas = []
+    for row in indicadores.values('negotiator__leader_id', 'date').annotate(**sumas).order_by():
+        filas.append(LeaderIndicatorRollup(
+            leader_id=row.pop('negotiator__leader_id'), granularity='day', period=row.pop('date'), **row
+        ))
+    for row in indicadores.values('negotiator__leader_id', 'month').annotate(**sumas).order_by():
+        filas.append(LeaderIndicatorRollup(
+            leader_id=row.pop('negotiator__leader_id'), granularity='month', period=row.pop('month'), **row
+        ))
+    LeaderIndicatorRollup.objects.bulk_create(filas, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderIndicatorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('sum_conversion_de_ventas', models.FloatField(default=0.0)),
+                ('sum_recaudacion_mensual', models.FloatField(default=0.0)),
+                ('sum_tiempo_hablando', models.FloatField(default=0.0)),
+                ('sum_porcentajes_cumplimiento_recaudo', models.FloatField(default=0.0)),
+                ('sum_porcentaje_cumplimiento_conversion', models.FloatField(default=0.0)),
+                ('sum_porcentaje_caidas_acuerdos', models.FloatField(default=0.0)),
+                ('granularity', models.CharField(choices=[('day', 'Día'), ('month', 'Mes')], max_length=5)),
+                ('period', models.DateField(help_text='Día, o primer día del mes')),
+                ('leader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('leader', 'granularity', 'period')},
+            },
+        ),
+        migrations.CreateModel(
+            name='NegotiatorIndicatorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('sum_conversion_de_ventas', models.FloatField(default=0.0)),
+                ('sum_recaudacion_mensual', models.FloatField(default=0.0)),
+                ('sum_tiempo_hablando', models.FloatField(default=0.0)),
+                ('sum_porcentajes_cumplimiento_recaudo', models.FloatField(default=0.0)),
+                ('sum_porcentaje_cumplimiento_conversion', models.FloatField(default=0.0)),
+                ('sum_porcentaje_caidas_acuerdos', models.FloatField(default=0.0)),
+                ('month', models.DateField(help_text='Primer día del mes')),
+                ('negotiator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indicator_rollups', to='accounts.negotiator')),
+            ],
+            options={
+                'unique_together': {('negotiator', 'month')},
+            },
+        ),
+        migrations.RunPython(poblar_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_indicator_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SemesterSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('semestre', models.CharField(choices=[('1', '1 (Ene-Jun)'), ('2', '2 (Jul-Dic)')], max_length=1)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('semester_target', models.FloatField()),
+                ('leaders_data', models.JSONField(help_text='Métricas por líder (sin negociadores)')),
+                ('negociadores', models.JSONField(help_text='Negociadores por cédula de líder')),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('anio', 'semestre')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_semester_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['negotiator', 'date'], name='evaluation_negotiator_date'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluation',
+            index=models.Index(fields=['date'], name='evaluation_date'),
+        ),
+        migrations.AddIndex(
+            model_name='negotiatorindicator',
+            index=models.Index(fields=['date', 'negotiator'], name='indicator_date_negotiator'),
+        ),
+        migrations.AddIndex(
+            model_name='serevaluation',
+            index=models.Index(fields=['negotiator', 'date'], name='serevaluation_negotiator_date'),
+        ),
+        migrations.AddIndex(
+            model_name='serevaluation',
+            index=models.Index(fields=['date'], name='serevaluation_date'),
+        ),
+    ]
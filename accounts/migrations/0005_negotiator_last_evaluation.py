@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def poblar_ultimas_evaluaciones(apps, schema_editor):
+    Negotiator = apps.get_model('accounts', 'Negotiator')
+    Evaluation = apps.get_model('accounts', 'Evaluation')
+    SerEvaluation = apps.get_model('accounts', 'SerEvaluation')
+
+    def ultima(model, campo):
+        return Subquery(model.objects.filter(negotiator=OuterRef('pk')).order_by('-date', '-pk').values(campo)[:1])
+
+    conteo = (
+        Evaluation.objects.filter(negotiator=OuterRef('pk'))
+        .order_by().values('negotiator').annotate(total=Count('pk')).values('total')
+    )
+    Negotiator.objects.update(
+        last_evaluation=ultima(Evaluation, 'pk'),
+        last_evaluation_date=ultima(Evaluation, 'date'),
+        last_ser_evaluation=ultima(SerEvaluation, 'pk'),
+        last_ser_evaluation_date=ultima(SerEvaluation, 'date'),
+        evaluation_count=Coalesce(Subquery(conteo), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='negotiator',
+            name='evaluation_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='negotiator',
+            name='last_evaluation',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.evaluation'),
+        ),
+        migrations.AddField(
+            model_name='negotiator',
+            name='last_evaluation_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='negotiator',
+            name='last_ser_evaluation',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.serevaluation'),
+        ),
+        migrations.AddField(
+            model_name='negotiator',
+            name='last_ser_evaluation_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(poblar_ultimas_evaluaciones, migrations.RunPython.noop),
+    ]
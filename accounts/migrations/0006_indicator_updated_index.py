@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_negotiator_last_evaluation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='negotiatorindicator',
+            index=models.Index(fields=['negotiator', 'updated_at'], name='indicator_negotiator_updated'),
+        ),
+    ]
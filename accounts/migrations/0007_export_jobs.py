@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_indicator_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('resultados_excel', 'Resultados por líder (Excel)'), ('historico_excel', 'Histórico de evaluaciones (Excel)'), ('historico_pdf', 'Histórico de evaluaciones (PDF)')], max_length=20)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('clave', models.CharField(help_text='Hash de tipo y parámetros', max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('terminado', 'Terminado'), ('error', 'Error')], default='pendiente', max_length=10)),
+                ('archivo', models.CharField(blank=True, help_text='Nombre dentro de EXPORT_JOBS_DIR', max_length=255)),
+                ('nombre_archivo', models.CharField(blank=True, help_text='Nombre de descarga', max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'created_at'], name='exportjob_estado_created'), models.Index(fields=['expires_at'], name='exportjob_expires')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('estado__in', ('pendiente', 'en_proceso'))), fields=('clave',), name='exportjob_clave_activa')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+def crear_version(apps, schema_editor):
+    apps.get_model('accounts', 'DashboardDataVersion').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_export_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+        migrations.RunPython(crear_version, migrations.RunPython.noop),
+    ]
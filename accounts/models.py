@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import RegexValidator
+from django.db.models.functions import Cast, Coalesce
+from django.utils.functional import cached_property
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -80,29 +82,7 @@ class User(AbstractBaseUser, PermissionsMixin):
         """
         Retorna los negociadores de este líder que tienen evaluaciones pendientes y cuántas pendientes tienen
         """
-        negotiators = self.negotiators.all()
-        pending_negotiators = []
-        for negotiator in negotiators:
-            # Definir la lógica de "pendiente": si nunca ha sido evaluado o si la última evaluación fue hace más de 6 meses
-            last_evaluation = negotiator.evaluations.order_by('-date').first()
-            days_since_last = None
-            pending_count = 0
-            if not last_evaluation:
-                # Nunca ha sido evaluado, cuenta como 1 pendiente
-                pending_count = 1
-            else:
-                days_since_last = (timezone.now() - last_evaluation.date).days
-                # Si han pasado más de 180 días desde la última evaluación, cuenta como 1 pendiente
-                if days_since_last > 180:
-                    pending_count = 1
-            if pending_count > 0:
-                pending_negotiators.append({
-                    'negotiator': negotiator,
-                    'last_evaluation_date': last_evaluation.date if last_evaluation else None,
-                    'days_since_last': days_since_last,
-                    'pending_count': pending_count
-                })
-        return pending_negotiators
+        return Negotiator.objects.filter(leader=self).resumen_pendientes()
 
 class AllowedEmail(models.Model):
     email = models.EmailField(max_length=255, unique=True)
@@ -113,6 +93,181 @@ class AllowedEmail(models.Model):
 from django.utils import timezone
 from datetime import timedelta
 
+# Un negociador queda pendiente si nunca fue evaluado o si su última evaluación tiene más de estos días
+PLAZO_EVALUACION_DIAS = 180
+
+# KPIs porcentuales (sin recaudo ni tiempo) que promedia la puntuación del Hacer
+CAMPOS_PUNTUACION_HACER = [
+    'conversion_de_ventas',
+    'porcentajes_cumplimiento_recaudo',
+    'porcentaje_cumplimiento_conversion',
+    'porcentaje_caidas_acuerdos',
+]
+
+
+class NegotiatorQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # Reasignar líderes en lote mueve sus rollups, como ``Negotiator.save``
+        if 'leader' not in kwargs and 'leader_id' not in kwargs:
+            return super().update(**kwargs)
+        from . import rollups
+        with transaction.atomic():
+            anteriores = dict(self.values_list('pk', 'leader_id'))
+            rows = super().update(**kwargs)
+            nuevos = Negotiator.objects.filter(pk__in=anteriores).values_list('leader_id', flat=True)
+            rollups.reconstruir_rollups_lideres(set(anteriores.values()) | set(nuevos))
+        return rows
+
+    def delete(self):
+        from . import rollups
+        with transaction.atomic():
+            leader_ids = set(self.values_list('leader_id', flat=True).distinct())
+            result = super().delete()
+            rollups.reconstruir_rollups_lideres(leader_ids)
+        return result
+
+    def con_ultima_evaluacion(self):
+        """Anota ``fecha_ultima_evaluacion`` (None si nunca fue evaluado) desde la columna mantenida."""
+        return self.annotate(fecha_ultima_evaluacion=models.F('last_evaluation_date'))
+
+    @staticmethod
+    def _valores_ultimas_evaluaciones():
+        """Expresiones que calculan desde las evaluaciones los campos mantenidos de Negotiator."""
+        def ultima(model, campo):
+            return models.Subquery(
+                model.objects.filter(negotiator=models.OuterRef('pk')).order_by('-date', '-pk').values(campo)[:1]
+            )
+
+        conteo = (
+            Evaluation.objects.filter(negotiator=models.OuterRef('pk'))
+            .order_by().values('negotiator').annotate(total=models.Count('pk')).values('total')
+        )
+        return {
+            'last_evaluation': ultima(Evaluation, 'pk'),
+            'last_evaluation_date': ultima(Evaluation, 'date'),
+            'last_ser_evaluation': ultima(SerEvaluation, 'pk'),
+            'last_ser_evaluation_date': ultima(SerEvaluation, 'date'),
+            'evaluation_count': Coalesce(models.Subquery(conteo), 0),
+        }
+
+    def refrescar_ultimas_evaluaciones(self):
+        """
+        Recalcula los campos mantenidos de última evaluación (Hacer y Ser) y el
+        conteo de evaluaciones de estos negociadores con un solo UPDATE. Cada
+        subconsulta usa los índices (negotiator, date).
+        """
+        return self.update(**self._valores_ultimas_evaluaciones())
+
+    def verificar_ultimas_evaluaciones(self):
+        """Lista de diferencias entre los campos mantenidos y las evaluaciones (vacía si cuadran)."""
+        esperados = {f'esperado_{campo}': expr for campo, expr in self._valores_ultimas_evaluaciones().items()}
+        diferencias = []
+        for fila in self.order_by('pk').values('cedula', *Negotiator.CAMPOS_ULTIMA_EVALUACION).annotate(**esperados):
+            for campo in Negotiator.CAMPOS_ULTIMA_EVALUACION:
+                if fila[campo] != fila[f'esperado_{campo}']:
+                    diferencias.append(
+                        f"negociador {fila['cedula']}: {campo} {fila[campo]!r} != {fila[f'esperado_{campo}']!r}"
+                    )
+        return diferencias
+
+    def with_scores(self, periodo_dias=30, fecha_fin=None):
+        """
+        Anota ``puntaje_hacer``, ``puntaje_ser`` y ``puntaje_total`` con las mismas
+        fórmulas que ``calcular_puntuacion_hacer``, ``SerEvaluation.promedio`` y
+        ``scoring.puntaje_total``, en la misma consulta del queryset.
+
+        El Hacer es una subconsulta agrupada sobre los indicadores de la ventana
+        (índice negotiator+date); el Ser se lee de la última evaluación del Ser
+        mantenida en ``last_ser_evaluation``.
+        """
+        from .scoring import ESCALA_SER, PESO_HACER, PESO_SER, RedondeoPython
+        fecha_inicio = (fecha_fin or timezone.now().date()) - timedelta(days=periodo_dias)
+        indicadores = NegotiatorIndicator.objects.filter(negotiator=models.OuterRef('pk'), date__gte=fecha_inicio)
+        if fecha_fin is not None:
+            indicadores = indicadores.filter(date__lte=fecha_fin)
+        # Los KPIs no admiten NULL: sin indicadores todos los promedios son NULL y el Hacer también
+        suma_promedios = sum(
+            (models.Avg(campo) for campo in CAMPOS_PUNTUACION_HACER[1:]),
+            models.Avg(CAMPOS_PUNTUACION_HACER[0]),
+        )
+        hacer = (
+            indicadores.order_by().values('negotiator')
+            .annotate(hacer=RedondeoPython(suma_promedios / models.Value(float(len(CAMPOS_PUNTUACION_HACER))), 2))
+            .values('hacer')
+        )
+        suma_ser = sum(
+            (models.F(f'last_ser_evaluation__{campo}') for campo in SerEvaluation.CAMPOS_SER[1:]),
+            models.F(f'last_ser_evaluation__{SerEvaluation.CAMPOS_SER[0]}'),
+        )
+        return self.annotate(
+            puntaje_hacer=models.Subquery(hacer, output_field=models.FloatField()),
+            puntaje_ser=RedondeoPython(Cast(suma_ser, models.FloatField()) / models.Value(float(len(SerEvaluation.CAMPOS_SER))), 2),
+        ).annotate(
+            puntaje_total=RedondeoPython(
+                models.F('puntaje_hacer') * models.Value(PESO_HACER)
+                + models.F('puntaje_ser') * models.Value(float(ESCALA_SER)) * models.Value(PESO_SER),
+                2,
+            ),
+        )
+
+    def pendientes_de_evaluacion(self, ahora=None):
+        """
+        Negociadores con evaluación pendiente, en una sola consulta.
+        ``(ahora - fecha).days > PLAZO_EVALUACION_DIAS`` equivale a que la
+        última evaluación sea anterior o igual a ``ahora - (PLAZO + 1) días``.
+        """
+        ahora = ahora or timezone.now()
+        limite = ahora - timedelta(days=PLAZO_EVALUACION_DIAS + 1)
+        return self.con_ultima_evaluacion().filter(
+            models.Q(fecha_ultima_evaluacion__isnull=True) | models.Q(fecha_ultima_evaluacion__lte=limite)
+        )
+
+    def con_estado_evaluacion(self, ahora=None):
+        """
+        Lista de negociadores (por id) con ``fecha_ultima_evaluacion``,
+        ``days_since_last``, ``pending_count`` (criterio de ``resumen_pendientes``)
+        y ``evaluation_status`` (criterio de ``get_evaluation_status``) ya
+        calculados, en una sola consulta.
+        """
+        ahora = ahora or timezone.now()
+        seis_meses = ahora - timedelta(days=PLAZO_EVALUACION_DIAS)
+        negotiators = list(self.con_ultima_evaluacion().order_by('pk'))
+        for negotiator in negotiators:
+            last_date = negotiator.fecha_ultima_evaluacion
+            negotiator.days_since_last = (ahora - last_date).days if last_date else None
+            negotiator.pending_count = int(last_date is None or negotiator.days_since_last > PLAZO_EVALUACION_DIAS)
+            negotiator.evaluation_status = 'Pendiente' if last_date is None or last_date < seis_meses else 'Al día'
+        return negotiators
+
+    def resumen_pendientes(self, ahora=None):
+        """
+        Lista de dicts ``negotiator``, ``last_evaluation_date``, ``days_since_last``
+        y ``pending_count`` de los negociadores pendientes, ordenada por id.
+        """
+        ahora = ahora or timezone.now()
+        pendientes = []
+        for negotiator in self.pendientes_de_evaluacion(ahora).order_by('pk'):
+            last_date = negotiator.fecha_ultima_evaluacion
+            pendientes.append({
+                'negotiator': negotiator,
+                'last_evaluation_date': last_date,
+                'days_since_last': (ahora - last_date).days if last_date else None,
+                # Nunca evaluado o evaluación vencida: cuenta como 1 pendiente
+                'pending_count': 1,
+            })
+        return pendientes
+
+    def resumen_pendientes_por_lider(self, ahora=None):
+        """
+        ``resumen_pendientes`` de toda la organización agrupado por cédula del
+        líder, para reportes administrativos y recordatorios.
+        """
+        por_lider = {}
+        for item in self.select_related('leader').resumen_pendientes(ahora):
+            por_lider.setdefault(item['negotiator'].leader_id, []).append(item)
+        return por_lider
+
+
 class Negotiator(models.Model):
     leader = models.ForeignKey(
         User, 
@@ -123,28 +278,89 @@ class Negotiator(models.Model):
     name = models.CharField(max_length=255)
     cedula = models.CharField(max_length=12, unique=True)
 
+    # Última evaluación y conteo, mantenidos al guardar/eliminar evaluaciones
+    # (ver NegotiatorQuerySet.refrescar_ultimas_evaluaciones y el comando reparar_ultimas_evaluaciones)
+    last_evaluation = models.ForeignKey(
+        'Evaluation', null=True, blank=True, editable=False, on_delete=models.SET_NULL, related_name='+'
+    )
+    last_evaluation_date = models.DateTimeField(null=True, blank=True, editable=False)
+    last_ser_evaluation = models.ForeignKey(
+        'SerEvaluation', null=True, blank=True, editable=False, on_delete=models.SET_NULL, related_name='+'
+    )
+    last_ser_evaluation_date = models.DateTimeField(null=True, blank=True, editable=False)
+    evaluation_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = NegotiatorQuerySet.as_manager()
+
+    CAMPOS_ULTIMA_EVALUACION = (
+        'last_evaluation', 'last_evaluation_date', 'last_ser_evaluation', 'last_ser_evaluation_date', 'evaluation_count',
+    )
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Los campos de última evaluación los escriben las evaluaciones: una instancia
+        # cargada antes de evaluar no debe sobrescribirlos con valores viejos
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.CAMPOS_ULTIMA_EVALUACION
+            ]
+        # Si cambia el líder, los rollups por líder deben moverse con el negociador
+        previous_leader_id = None
+        if self.pk:
+            previous_leader_id = Negotiator.objects.filter(pk=self.pk).values_list('leader_id', flat=True).first()
+        super().save(*args, **kwargs)
+        if previous_leader_id is not None and previous_leader_id != self.leader_id:
+            from . import rollups
+            rollups.reconstruir_rollups_lideres([previous_leader_id, self.leader_id])
+
+    def delete(self, *args, **kwargs):
+        leader_id = self.leader_id
+        result = super().delete(*args, **kwargs)
+        from . import rollups
+        rollups.reconstruir_rollups_lideres([leader_id])
+        return result
+
     def get_ultima_evaluacion_ser(self):
-        return self.ser_evaluations.order_by('-date').first()
+        return self.last_ser_evaluation
 
-    def calcular_puntaje_total(self):
+    def refrescar_ultimas_evaluaciones(self):
+        """Recalcula los campos mantenidos de este negociador y los recarga en la instancia."""
+        Negotiator.objects.filter(pk=self.pk).refrescar_ultimas_evaluaciones()
+        self.refresh_from_db(fields=self.CAMPOS_ULTIMA_EVALUACION)
+
+    @cached_property
+    def puntajes(self):
+        """
+        Hacer, Ser (promedio 1-5 de la última evaluación del Ser), total 70/30 y
+        momento del cálculo. Se calcula una vez por instancia: las vistas y
+        plantillas leen este objeto en lugar de recalcular en cada uso. Si la
+        instancia viene de ``Negotiator.objects.with_scores()`` usa sus anotaciones.
+        """
+        from .scoring import PuntajeNegociador, puntaje_total
+        if hasattr(self, 'puntaje_total'):
+            return PuntajeNegociador(
+                hacer=self.puntaje_hacer, ser=self.puntaje_ser, total=self.puntaje_total, computed_at=timezone.now()
+            )
         hacer = self.calcular_puntuacion_hacer()
         ser_eval = self.get_ultima_evaluacion_ser()
         ser = ser_eval.promedio if ser_eval else None
-        if hacer is not None and ser is not None:
-            return round(hacer * 0.7 + ser * 20 * 0.3, 2)  # ser (1-5) se escala a 100
-        return None
+        return PuntajeNegociador(
+            hacer=hacer, ser=ser, total=puntaje_total([hacer], [ser])[0], computed_at=timezone.now()
+        )
+
+    def calcular_puntaje_total(self):
+        return self.puntajes.total  # ser (1-5) se escala a 100
 
     @property
     def get_evaluation_status(self):
-        last_evaluation = self.evaluations.order_by('-date').first()
-        if not last_evaluation:
+        if not self.last_evaluation_date:
             return "Pendiente"
         
-        six_months_ago = timezone.now() - timedelta(days=180)
-        if last_evaluation.date < six_months_ago:
+        six_months_ago = timezone.now() - timedelta(days=PLAZO_EVALUACION_DIAS)
+        if self.last_evaluation_date < six_months_ago:
             return "Pendiente"
         
         return "Al día"
@@ -153,43 +369,35 @@ class Negotiator(models.Model):
         """
         Retorna la última evaluación del negociador
         """
-        return self.evaluations.order_by('-date').first()
+        return self.last_evaluation
 
     def has_evaluations(self):
         """
         Retorna True si el negociador tiene al menos una evaluación
         """
-        return self.evaluations.exists()
+        return self.evaluation_count > 0
 
     def get_evaluation_count(self):
         """
         Retorna el número total de evaluaciones del negociador
         """
-        return self.evaluations.count()
+        return self.evaluation_count
 
-    def calcular_puntuacion_hacer(self, periodo_dias=30):
+    def calcular_puntuacion_hacer(self, periodo_dias=30, fecha_fin=None):
         """
         Calcula la puntuación general del hacer (0-100) como el promedio de los KPIs porcentuales
         (excluyendo recaudo) del último periodo_dias días. Cada KPI tiene el mismo peso.
+
+        Con fecha_fin la ventana es [fecha_fin - periodo_dias, fecha_fin], lo que permite
+        recalcular la puntuación de una evaluación histórica. Los promedios se obtienen en
+        una sola consulta; AVG ignora los NULL igual que el cálculo anterior en Python.
         """
-        from datetime import timedelta
-        from django.utils import timezone
-        kpi_fields = [
-            'conversion_de_ventas',
-            'porcentajes_cumplimiento_recaudo',
-            'porcentaje_cumplimiento_conversion',
-            'porcentaje_caidas_acuerdos',
-        ]
-        fecha_inicio = timezone.now().date() - timedelta(days=periodo_dias)
+        fecha_inicio = (fecha_fin or timezone.now().date()) - timedelta(days=periodo_dias)
         indicadores = self.indicators.filter(date__gte=fecha_inicio)
-        if not indicadores.exists():
-            return None
-        promedios = []
-        for kpi in kpi_fields:
-            valores = indicadores.values_list(kpi, flat=True)
-            valores = [v for v in valores if v is not None]
-            if valores:
-                promedios.append(sum(valores) / len(valores))
+        if fecha_fin is not None:
+            indicadores = indicadores.filter(date__lte=fecha_fin)
+        promedios = indicadores.aggregate(**{campo: models.Avg(campo) for campo in CAMPOS_PUNTUACION_HACER})
+        promedios = [valor for valor in promedios.values() if valor is not None]
         if not promedios:
             return None
         puntuacion_hacer = sum(promedios) / len(promedios)
@@ -229,13 +437,102 @@ class KPI(models.Model):
         else:  # score
             return f"{value:.1f}/10"
 
-class Evaluation(models.Model):
+class EvaluacionQuerySet(models.QuerySet):
+    """
+    Mantiene los campos de última evaluación de Negotiator cuando las
+    evaluaciones (Hacer o Ser) se escriben en lote. Las escrituras en lote no
+    envían señales: el dashboard se invalida al confirmar la transacción.
+    """
+
+    def _refrescar(self, negotiator_ids, lote=500):
+        from .dashboard import invalidar_dashboard
+        negotiator_ids = sorted(negotiator_ids)
+        for i in range(0, len(negotiator_ids), lote):
+            Negotiator.objects.filter(pk__in=negotiator_ids[i:i + lote]).refrescar_ultimas_evaluaciones()
+        transaction.on_commit(invalidar_dashboard)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            self._refrescar({obj.negotiator_id for obj in objs})
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic():
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+            self._refrescar({obj.negotiator_id for obj in objs})
+        return rows
+
+    def update(self, **kwargs):
+        with transaction.atomic():
+            anteriores = dict(self.values_list('pk', 'negotiator_id'))
+            rows = super().update(**kwargs)
+            negotiator_ids = set(anteriores.values())
+            if 'negotiator' in kwargs or 'negotiator_id' in kwargs:
+                # El valor nuevo puede ser una expresión (el Case de bulk_update): se relee
+                negotiator_ids.update(
+                    self.model.objects.filter(pk__in=anteriores).values_list('negotiator_id', flat=True)
+                )
+            self._refrescar(negotiator_ids)
+        return rows
+
+    def delete(self):
+        with transaction.atomic():
+            negotiator_ids = set(self.values_list('negotiator_id', flat=True).distinct())
+            result = super().delete()
+            self._refrescar(negotiator_ids)
+        return result
+
+
+class EvaluacionMantenidaMixin:
+    """save/delete que actualizan en la misma transacción los campos de última evaluación del negociador."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous_negotiator_id = None
+            if not self._state.adding:
+                previous_negotiator_id = (
+                    type(self).objects.filter(pk=self.pk).values_list('negotiator_id', flat=True).first()
+                )
+            super().save(*args, **kwargs)
+            if previous_negotiator_id not in (None, self.negotiator_id):
+                Negotiator.objects.filter(pk=previous_negotiator_id).refrescar_ultimas_evaluaciones()
+            self._refrescar_negociador()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._refrescar_negociador()
+        return result
+
+    def _refrescar_negociador(self):
+        from .dashboard import invalidar_dashboard
+        transaction.on_commit(invalidar_dashboard)
+        # Si la instancia del negociador ya está cargada, se recarga para que lea los valores nuevos
+        if type(self).negotiator.is_cached(self):
+            self.negotiator.refrescar_ultimas_evaluaciones()
+        else:
+            Negotiator.objects.filter(pk=self.negotiator_id).refrescar_ultimas_evaluaciones()
+
+
+class Evaluation(EvaluacionMantenidaMixin, models.Model):
     negotiator = models.ForeignKey(Negotiator, on_delete=models.CASCADE, related_name='evaluations')
     evaluator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='evaluations_made')
     date = models.DateTimeField(auto_now_add=True)
     overall_score = models.FloatField(default=0.0)
     feedback = models.TextField(blank=True)
 
+    objects = EvaluacionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Última evaluación por negociador (order_by('-date') filtrado por negociador)
+            models.Index(fields=['negotiator', 'date'], name='evaluation_negotiator_date'),
+            # Rangos de fecha del histórico y del dashboard
+            models.Index(fields=['date'], name='evaluation_date'),
+        ]
+
     def __str__(self):
         return f'Evaluación de {self.negotiator.name} en {self.date.strftime("%Y-%m-%d")}'
 
@@ -250,6 +547,60 @@ class EvaluationKPI(models.Model):
     def __str__(self):
         return f'{self.kpi.name} - {self.score}'
 
+class NegotiatorIndicatorQuerySet(models.QuerySet):
+    """
+    Mantiene las tablas de rollup cuando los indicadores se escriben en lote.
+    """
+
+    def bulk_create(self, objs, *args, actualizar_rollups=True, **kwargs):
+        """
+        ``actualizar_rollups=False`` omite el mantenimiento incremental para
+        cargas masivas; quien llama debe ejecutar ``rollups.reconstruir_rollups``
+        al terminar.
+        """
+        from . import rollups
+        from .dashboard import invalidar_dashboard
+        with transaction.atomic():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if not actualizar_rollups:
+                pass
+            elif kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # No sabemos qué filas se insertaron o cambiaron: recalcular los negociadores afectados
+                rollups.reconstruir_rollups({obj.negotiator_id for obj in objs})
+            else:
+                rollups.registrar_indicadores(objs)
+            # bulk_create no emite post_save; se invalida al confirmar para no cachear datos sin confirmar
+            transaction.on_commit(invalidar_dashboard)
+        return objs
+
+    def update(self, **kwargs):
+        from . import rollups
+        from .dashboard import invalidar_dashboard
+        with transaction.atomic():
+            anteriores = dict(self.values_list('pk', 'negotiator_id'))
+            rows = super().update(**kwargs)
+            if rows:
+                negotiator_ids = set(anteriores.values())
+                if 'negotiator' in kwargs or 'negotiator_id' in kwargs:
+                    # El valor nuevo puede ser una instancia o el Case de bulk_update: se relee
+                    negotiator_ids.update(
+                        self.model.objects.filter(pk__in=anteriores).values_list('negotiator_id', flat=True)
+                    )
+                rollups.reconstruir_rollups(negotiator_ids)
+                transaction.on_commit(invalidar_dashboard)
+        return rows
+
+    def delete(self):
+        from . import rollups
+        from .dashboard import invalidar_dashboard
+        with transaction.atomic():
+            negotiator_ids = set(self.values_list('negotiator_id', flat=True).distinct())
+            result = super().delete()
+            rollups.reconstruir_rollups(negotiator_ids)
+            transaction.on_commit(invalidar_dashboard)
+        return result
+
+
 class NegotiatorIndicator(models.Model):
     """
     Historical indicators for a negotiator (real-time in production from Databricks).
@@ -270,13 +621,40 @@ class NegotiatorIndicator(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = NegotiatorIndicatorQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date']
         unique_together = ('negotiator', 'date')
+        indexes = [
+            # unique_together ya indexa (negotiator, date); este cubre rangos de fecha sobre todos los negociadores
+            models.Index(fields=['date', 'negotiator'], name='indicator_date_negotiator'),
+            # Cursor ``since`` de la API de indicadores: filas cambiadas de un negociador desde un instante
+            models.Index(fields=['negotiator', 'updated_at'], name='indicator_negotiator_updated'),
+        ]
 
     def __str__(self):
         return f'{self.negotiator.name} - {self.date}'
 
+    def save(self, *args, **kwargs):
+        from . import rollups
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = NegotiatorIndicator.objects.select_related('negotiator').filter(pk=self.pk).first()
+            super().save(*args, **kwargs)
+            # Restar la versión anterior y sumar la nueva en las tablas de rollup
+            if previous is not None:
+                rollups.registrar_indicadores([previous], signo=-1)
+            rollups.registrar_indicadores([self])
+
+    def delete(self, *args, **kwargs):
+        from . import rollups
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            rollups.registrar_indicadores([self], signo=-1)
+        return result
+
     # Optional helper properties (keep if useful; they use the above KPIs)
     @property
     def success_rate(self):
@@ -294,7 +672,7 @@ class NegotiatorIndicator(models.Model):
         return self.recaudacion_mensual / self.tiempo_hablando
     
     # === Evaluación del Ser ===
-class SerEvaluation(models.Model):
+class SerEvaluation(EvaluacionMantenidaMixin, models.Model):
     negotiator = models.ForeignKey('Negotiator', on_delete=models.CASCADE, related_name='ser_evaluations')
     evaluator = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateTimeField(auto_now_add=True)
@@ -304,12 +682,164 @@ class SerEvaluation(models.Model):
     relacionamiento = models.PositiveSmallIntegerField()
     compromiso = models.PositiveSmallIntegerField()
 
+    objects = EvaluacionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['negotiator', 'date'], name='serevaluation_negotiator_date'),
+            models.Index(fields=['date'], name='serevaluation_date'),
+        ]
+
+    # Criterios que promedia ``promedio`` (y ``Negotiator.objects.with_scores`` en SQL)
+    CAMPOS_SER = ['actitud', 'trabajo_en_equipo', 'sentido_pertenencia', 'relacionamiento', 'compromiso']
+
     @property
     def promedio(self):
-        return round((
-            self.actitud +
-            self.trabajo_en_equipo +
-            self.sentido_pertenencia +
-            self.relacionamiento +
-            self.compromiso
-        ) / 5.0, 2)
\ No newline at end of file
+        from .scoring import promedio_ser
+        return promedio_ser([getattr(self, campo) for campo in self.CAMPOS_SER])
+
+
+class IndicatorSums(models.Model):
+    """Conteo y sumas de los KPIs de NegotiatorIndicator para un periodo."""
+    count = models.PositiveIntegerField(default=0)
+    sum_conversion_de_ventas = models.FloatField(default=0.0)
+    sum_recaudacion_mensual = models.FloatField(default=0.0)
+    sum_tiempo_hablando = models.FloatField(default=0.0)
+    sum_porcentajes_cumplimiento_recaudo = models.FloatField(default=0.0)
+    sum_porcentaje_cumplimiento_conversion = models.FloatField(default=0.0)
+    sum_porcentaje_caidas_acuerdos = models.FloatField(default=0.0)
+
+    class Meta:
+        abstract = True
+
+
+class NegotiatorIndicatorRollup(IndicatorSums):
+    """
+    Rollup mensual de indicadores por negociador. El rollup diario por negociador
+    es la propia tabla NegotiatorIndicator (una fila por negociador y día).
+    """
+    negotiator = models.ForeignKey('Negotiator', on_delete=models.CASCADE, related_name='indicator_rollups')
+    month = models.DateField(help_text='Primer día del mes')
+
+    class Meta:
+        unique_together = ('negotiator', 'month')
+
+    def __str__(self):
+        return f'{self.negotiator_id} - {self.month:%Y-%m}'
+
+
+class LeaderIndicatorRollup(IndicatorSums):
+    """Rollup diario y mensual de los indicadores de todos los negociadores de un líder."""
+    GRANULARITY_CHOICES = (
+        ('day', 'Día'),
+        ('month', 'Mes'),
+    )
+    leader = models.ForeignKey(User, on_delete=models.CASCADE, related_name='indicator_rollups')
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period = models.DateField(help_text='Día, o primer día del mes')
+
+    class Meta:
+        unique_together = ('leader', 'granularity', 'period')
+
+    def __str__(self):
+        return f'{self.leader_id} - {self.granularity} {self.period}'
+
+
+class DashboardDataVersion(models.Model):
+    """
+    Contador de una sola fila con la versión de datos del dashboard. Vive en la
+    base de datos (no en la caché local de cada proceso) para que una escritura
+    hecha por cualquier proceso web, worker o comando invalide las entradas
+    cacheadas de todos los demás.
+    """
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f'Versión de datos {self.version}'
+
+
+class SemesterSnapshot(models.Model):
+    """
+    Resultados congelados de un semestre cerrado: métricas por líder (incluye HU20)
+    y detalle por negociador, tal como los calcula el dashboard administrativo.
+    Es inmutable; para recalcular hay que reabrir (eliminar) el semestre.
+    """
+    SEMESTRE_CHOICES = (
+        ('1', '1 (Ene-Jun)'),
+        ('2', '2 (Jul-Dic)'),
+    )
+    anio = models.PositiveSmallIntegerField()
+    semestre = models.CharField(max_length=1, choices=SEMESTRE_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    semester_target = models.FloatField()
+    leaders_data = models.JSONField(help_text='Métricas por líder (sin negociadores)')
+    negociadores = models.JSONField(help_text='Negociadores por cédula de líder')
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('anio', 'semestre')
+
+    def __str__(self):
+        return f'Semestre {self.semestre} {self.anio} (cerrado)'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Un semestre cerrado es inmutable; reábrelo para recalcularlo.')
+        super().save(*args, **kwargs)
+
+
+class ExportJob(models.Model):
+    """
+    Exportación generada en segundo plano por el comando
+    ``procesar_exportaciones`` (ver ``accounts.jobs``). ``clave`` identifica el
+    tipo y los parámetros: mientras un trabajo está activo (pendiente o en
+    proceso), los pedidos idénticos lo reutilizan en lugar de encolar otro.
+    """
+    TIPO_CHOICES = (
+        ('resultados_excel', 'Resultados por líder (Excel)'),
+        ('historico_excel', 'Histórico de evaluaciones (Excel)'),
+        ('historico_pdf', 'Histórico de evaluaciones (PDF)'),
+    )
+    ESTADO_CHOICES = (
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('terminado', 'Terminado'),
+        ('error', 'Error'),
+    )
+    ESTADOS_ACTIVOS = ('pendiente', 'en_proceso')
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    parametros = models.JSONField(default=dict, blank=True)
+    clave = models.CharField(max_length=64, help_text='Hash de tipo y parámetros')
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente')
+    solicitado_por = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs'
+    )
+    archivo = models.CharField(max_length=255, blank=True, help_text='Nombre dentro de EXPORT_JOBS_DIR')
+    nombre_archivo = models.CharField(max_length=255, blank=True, help_text='Nombre de descarga')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Latido del worker y token del intento que tiene el trabajo (ver ``jobs.reclamar``)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    intento = models.CharField(max_length=32, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Un solo trabajo activo por clave (deduplicación de pedidos concurrentes)
+            models.UniqueConstraint(
+                fields=['clave'], condition=models.Q(estado__in=('pendiente', 'en_proceso')),
+                name='exportjob_clave_activa',
+            ),
+        ]
+        indexes = [
+            # Cola del worker y purga de vencidos
+            models.Index(fields=['estado', 'created_at'], name='exportjob_estado_created'),
+            models.Index(fields=['expires_at'], name='exportjob_expires'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_tipo_display()} #{self.pk} ({self.estado})'
@@ -0,0 +1,65 @@
+"""
+PDF de la evaluación final con retroalimentación de un negociador.
+
+``pdf_evaluacion`` recibe solo datos planos (ver
+``exports.datos_evaluacion_pdf``) y no toca la base de datos ni importa
+modelos: así puede ejecutarse en los procesos de un ``ProcessPoolExecutor``
+para generar en paralelo los PDFs de todo un equipo.
+"""
+from io import BytesIO
+
+
+def pdf_evaluacion(datos):
+    """Bytes del PDF de una evaluación."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=2*cm, rightMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
+    styles = getSampleStyleSheet()
+
+    story = []
+    story.append(Paragraph('Evaluación Final con Retroalimentación', styles['Title']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(f'Negociador: <b>{datos["negociador"]}</b> (Cédula: {datos["cedula"]})', styles['Normal']))
+    story.append(Paragraph(f'Líder: <b>{datos["lider"]}</b> ({datos["lider_email"]})', styles['Normal']))
+    story.append(Paragraph(f'Fecha: {datos["fecha"]}', styles['Normal']))
+    story.append(Spacer(1, 12))
+
+    # Tabla KPIs
+    data = [['Indicador', 'Valor (%)']]
+    for nombre, valor in datos['kpis']:
+        data.append([nombre, f'{valor}'])
+    t = Table(data, hAlign='LEFT')
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('ALIGN', (1,1), (-1,-1), 'RIGHT'),
+    ]))
+    story.append(t)
+    story.append(Spacer(1, 12))
+
+    # Porcentajes generales
+    resumen = [['Hacer (0-100)', datos['hacer']], ['Ser (x20 → 0-100)', datos['ser']], ['Total (70/30)', datos['total']]]
+    t2 = Table(resumen, hAlign='LEFT')
+    t2.setStyle(TableStyle([
+        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+        ('BACKGROUND', (0,0), (-1,0), colors.whitesmoke),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
+    ]))
+    story.append(t2)
+    story.append(Spacer(1, 12))
+
+    # Retroalimentación
+    if datos['feedback']:
+        story.append(Paragraph('Retroalimentación', styles['Heading3']))
+        story.append(Paragraph(datos['feedback'], styles['BodyText']))
+
+    doc.build(story)
+    return buffer.getvalue()
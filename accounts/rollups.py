@@ -0,0 +1,325 @@
+"""
+Tablas de rollup de indicadores.
+
+``NegotiatorIndicatorRollup`` guarda sumas y conteos mensuales por negociador y
+``LeaderIndicatorRollup`` sumas y conteos diarios y mensuales por líder. Se
+mantienen de forma incremental desde los hooks de ``NegotiatorIndicator``
+(``save``/``delete``/``bulk_create``) y se pueden reconstruir desde cero con el
+comando ``rebuild_rollups``.
+
+Los promedios de un rango se obtienen como suma/conteo combinando los meses
+completos del rango (filas mensuales) con los días sueltos de los bordes.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import LeaderIndicatorRollup, Negotiator, NegotiatorIndicator, NegotiatorIndicatorRollup
+
+
+KPI_FIELDS = (
+    'conversion_de_ventas',
+    'recaudacion_mensual',
+    'tiempo_hablando',
+    'porcentajes_cumplimiento_recaudo',
+    'porcentaje_cumplimiento_conversion',
+    'porcentaje_caidas_acuerdos',
+)
+SUM_FIELDS = tuple(f'sum_{field}' for field in KPI_FIELDS)
+
+
+def _inicio_mes(d):
+    return d.replace(day=1)
+
+
+def _fin_mes(d):
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+# ----------------------------
+# Mantenimiento incremental
+# ----------------------------
+
+def _aplicar(model, deltas, crear=True):
+    """Suma los deltas {lookup: [count, *sums]} a las filas del modelo (creándolas si faltan)."""
+    for key, valores in deltas.items():
+        lookup = dict(key)
+        count, sums = valores[0], valores[1:]
+        updates = {'count': F('count') + count}
+        updates.update({field: F(field) + value for field, value in zip(SUM_FIELDS, sums)})
+        if model.objects.filter(**lookup).update(**updates) or not crear:
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(count=count, **dict(zip(SUM_FIELDS, sums)), **lookup)
+        except IntegrityError:
+            # Otra escritura creó la fila entre el update y el create
+            model.objects.filter(**lookup).update(**updates)
+
+
+def registrar_indicadores(indicadores, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) un lote de indicadores en las tablas de rollup.
+    """
+    indicadores = list(indicadores)
+    if not indicadores:
+        return
+    leader_by_negotiator = dict(
+        Negotiator.objects
+        .filter(pk__in={ind.negotiator_id for ind in indicadores})
+        .values_list('pk', 'leader_id')
+    )
+
+    negotiator_deltas = defaultdict(lambda: [0] + [0.0] * len(KPI_FIELDS))
+    leader_deltas = defaultdict(lambda: [0] + [0.0] * len(KPI_FIELDS))
+    for ind in indicadores:
+        leader_id = leader_by_negotiator.get(ind.negotiator_id)
+        month = _inicio_mes(ind.date)
+        keys = [(negotiator_deltas, (('negotiator_id', ind.negotiator_id), ('month', month)))]
+        if leader_id is not None:
+            keys.append((leader_deltas, (('leader_id', leader_id), ('granularity', 'day'), ('period', ind.date))))
+            keys.append((leader_deltas, (('leader_id', leader_id), ('granularity', 'month'), ('period', month))))
+        for deltas, key in keys:
+            acumulado = deltas[key]
+            acumulado[0] += signo
+            for i, field in enumerate(KPI_FIELDS, start=1):
+                acumulado[i] += signo * (getattr(ind, field) or 0.0)
+
+    with transaction.atomic():
+        # Al restar no se crean filas nuevas (p. ej. si el negociador ya fue eliminado)
+        _aplicar(NegotiatorIndicatorRollup, negotiator_deltas, crear=signo > 0)
+        _aplicar(LeaderIndicatorRollup, leader_deltas, crear=signo > 0)
+
+
+# ----------------------------
+# Reconstrucción desde cero
+# ----------------------------
+
+def _sumas():
+    return {'count': Count('id'), **{sum_field: Sum(field) for sum_field, field in zip(SUM_FIELDS, KPI_FIELDS)}}
+
+
+def _filas_negociador(indicadores):
+    return [
+        NegotiatorIndicatorRollup(**row)
+        for row in (
+            indicadores
+            .annotate(month=TruncMonth('date'))
+            .values('negotiator_id', 'month')
+            .annotate(**_sumas())
+            .order_by()
+        )
+    ]
+
+
+def _filas_lider(indicadores):
+    filas = []
+    for row in indicadores.values('negotiator__leader_id', 'date').annotate(**_sumas()).order_by():
+        leader_id = row.pop('negotiator__leader_id')
+        period = row.pop('date')
+        filas.append(LeaderIndicatorRollup(leader_id=leader_id, granularity='day', period=period, **row))
+    por_mes = (
+        indicadores
+        .annotate(month=TruncMonth('date'))
+        .values('negotiator__leader_id', 'month')
+        .annotate(**_sumas())
+        .order_by()
+    )
+    for row in por_mes:
+        leader_id = row.pop('negotiator__leader_id')
+        period = row.pop('month')
+        filas.append(LeaderIndicatorRollup(leader_id=leader_id, granularity='month', period=period, **row))
+    return filas
+
+
+def reconstruir_rollups_lideres(leader_ids, batch_size=2000):
+    """Recalcula desde los datos crudos los rollups de los líderes indicados."""
+    leader_ids = {leader_id for leader_id in leader_ids if leader_id is not None}
+    if not leader_ids:
+        return
+    with transaction.atomic():
+        LeaderIndicatorRollup.objects.filter(leader_id__in=leader_ids).delete()
+        indicadores = NegotiatorIndicator.objects.filter(negotiator__leader_id__in=leader_ids)
+        LeaderIndicatorRollup.objects.bulk_create(_filas_lider(indicadores), batch_size=batch_size)
+
+
+def reconstruir_rollups(negotiator_ids=None, batch_size=2000):
+    """
+    Recalcula los rollups desde NegotiatorIndicator. Sin argumentos reconstruye
+    todo; con ``negotiator_ids`` solo esos negociadores y sus líderes.
+    """
+    with transaction.atomic():
+        if negotiator_ids is None:
+            NegotiatorIndicatorRollup.objects.all().delete()
+            LeaderIndicatorRollup.objects.all().delete()
+            indicadores = NegotiatorIndicator.objects.all()
+            NegotiatorIndicatorRollup.objects.bulk_create(_filas_negociador(indicadores), batch_size=batch_size)
+            LeaderIndicatorRollup.objects.bulk_create(_filas_lider(indicadores), batch_size=batch_size)
+            return
+
+        negotiator_ids = set(negotiator_ids)
+        if not negotiator_ids:
+            return
+        NegotiatorIndicatorRollup.objects.filter(negotiator_id__in=negotiator_ids).delete()
+        NegotiatorIndicatorRollup.objects.bulk_create(
+            _filas_negociador(NegotiatorIndicator.objects.filter(negotiator_id__in=negotiator_ids)),
+            batch_size=batch_size,
+        )
+        reconstruir_rollups_lideres(
+            Negotiator.objects.filter(pk__in=negotiator_ids).values_list('leader_id', flat=True),
+            batch_size=batch_size,
+        )
+
+
+def verificar_rollups(tolerancia=1e-6):
+    """
+    Compara los rollups con los datos crudos. Retorna una lista de diferencias
+    (vacía si todo cuadra).
+    """
+    diferencias = []
+    indicadores = NegotiatorIndicator.objects.all()
+    esperados = [
+        ('negociador', NegotiatorIndicatorRollup, ('negotiator_id', 'month'), _filas_negociador(indicadores)),
+        ('lider', LeaderIndicatorRollup, ('leader_id', 'granularity', 'period'), _filas_lider(indicadores)),
+    ]
+    for nombre, model, key_fields, filas in esperados:
+        esperado = {tuple(getattr(f, k) for k in key_fields): f for f in filas}
+        actual = {
+            tuple(getattr(f, k) for k in key_fields): f
+            for f in model.objects.filter(count__gt=0)
+        }
+        for key in esperado.keys() | actual.keys():
+            e, a = esperado.get(key), actual.get(key)
+            if e is None or a is None:
+                diferencias.append(f'{nombre} {key}: {"sobra" if e is None else "falta"} en rollup')
+                continue
+            if e.count != a.count:
+                diferencias.append(f'{nombre} {key}: count {a.count} != {e.count}')
+            for field in SUM_FIELDS:
+                esperado_val, actual_val = getattr(e, field) or 0.0, getattr(a, field) or 0.0
+                if abs(esperado_val - actual_val) > tolerancia * max(1.0, abs(esperado_val)):
+                    diferencias.append(f'{nombre} {key}: {field} {actual_val} != {esperado_val}')
+    return diferencias
+
+
+# ----------------------------
+# Lectura por rango
+# ----------------------------
+
+def dividir_rango(start_date, end_date):
+    """
+    Parte [start_date, end_date] en meses completos ``(primer_mes, ultimo_mes)`` (o None)
+    y una lista de tramos de días sueltos en los bordes.
+    """
+    first_full = start_date if start_date.day == 1 else _fin_mes(start_date) + timedelta(days=1)
+    last_full_end = end_date if end_date == _fin_mes(end_date) else _inicio_mes(end_date) - timedelta(days=1)
+    if first_full > last_full_end:
+        return None, [(start_date, end_date)]
+    tramos = []
+    if start_date < first_full:
+        tramos.append((start_date, first_full - timedelta(days=1)))
+    if last_full_end < end_date:
+        tramos.append((last_full_end + timedelta(days=1), end_date))
+    return (first_full, _inicio_mes(last_full_end)), tramos
+
+
+def _acumular_filas(destino, filas, key):
+    for row in filas:
+        acumulado = destino.setdefault(row[key], {'count': 0, **{f: 0.0 for f in SUM_FIELDS}})
+        for extra in row:
+            if extra not in acumulado and extra != key:
+                acumulado[extra] = row[extra]
+        acumulado['count'] += row['count'] or 0
+        for field in SUM_FIELDS:
+            acumulado[field] += row[field] or 0.0
+    return destino
+
+
+def _filtro_rango_crudo(tramos):
+    rango = Q()
+    for desde, hasta in tramos:
+        rango |= Q(date__gte=desde, date__lte=hasta)
+    return rango
+
+
+def sumas_por_negociador(start_date, end_date, leader_id=None):
+    """
+    {negotiator_id: {'leader_id', 'count', sum_*}} para el rango, usando los
+    rollups mensuales y los indicadores diarios solo en los bordes del rango.
+    Con ``leader_id`` se limita a los negociadores de ese líder.
+    """
+    meses, tramos = dividir_rango(start_date, end_date)
+    por_lider = {} if leader_id is None else {'negotiator__leader_id': leader_id}
+    resultado = {}
+    if meses:
+        filas = (
+            NegotiatorIndicatorRollup.objects
+            .filter(month__gte=meses[0], month__lte=meses[1], count__gt=0, **por_lider)
+            .values('negotiator_id', leader_id=F('negotiator__leader_id'))
+            .annotate(count=Sum('count'), **{field: Sum(field) for field in SUM_FIELDS})
+            .order_by()
+        )
+        _acumular_filas(resultado, filas, 'negotiator_id')
+    if tramos:
+        filas = (
+            NegotiatorIndicator.objects
+            .filter(_filtro_rango_crudo(tramos), **por_lider)
+            .values('negotiator_id', leader_id=F('negotiator__leader_id'))
+            .annotate(**_sumas())
+            .order_by()
+        )
+        _acumular_filas(resultado, filas, 'negotiator_id')
+    return resultado
+
+
+def negociadores_con_datos_por_lider(start_date, end_date):
+    """
+    {leader_id: número de negociadores con al menos un indicador en el rango},
+    resuelto en una consulta agrupada por líder.
+    """
+    meses, tramos = dividir_rango(start_date, end_date)
+    con_datos = Q()
+    if meses:
+        con_datos |= Exists(NegotiatorIndicatorRollup.objects.filter(
+            negotiator=OuterRef('pk'), month__gte=meses[0], month__lte=meses[1], count__gt=0
+        ))
+    if tramos:
+        con_datos |= Exists(NegotiatorIndicator.objects.filter(_filtro_rango_crudo(tramos), negotiator=OuterRef('pk')))
+    return dict(
+        Negotiator.objects
+        .filter(con_datos)
+        .values_list('leader_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+
+def sumas_por_lider(start_date, end_date):
+    """
+    Filas por líder con datos de contacto, ``count`` y ``sum_*`` para el rango,
+    leídas de LeaderIndicatorRollup en una sola consulta.
+    """
+    meses, tramos = dividir_rango(start_date, end_date)
+    rango = Q()
+    if meses:
+        rango |= Q(granularity='month', period__gte=meses[0], period__lte=meses[1])
+    for desde, hasta in tramos:
+        rango |= Q(granularity='day', period__gte=desde, period__lte=hasta)
+    return list(
+        LeaderIndicatorRollup.objects
+        .filter(rango, count__gt=0)
+        .values('leader__cedula', 'leader__first_name', 'leader__last_name', 'leader__email')
+        .annotate(count=Sum('count'), **{field: Sum(field) for field in SUM_FIELDS})
+        .order_by()
+    )
+
+
+def promedio(fila, field):
+    """Promedio de un KPI a partir de una fila con ``count`` y ``sum_<field>``; None sin datos."""
+    count = fila.get('count') or 0
+    if not count:
+        return None
+    return fila[f'sum_{field}'] / count
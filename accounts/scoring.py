@@ -0,0 +1,108 @@
+"""
+Fórmulas de puntaje compartidas por vistas, exportaciones y modelos.
+
+Las funciones reciben columnas (secuencias alineadas, una posición por entidad)
+y devuelven la columna de resultados en una sola pasada, para puntuar N líderes
+o negociadores sin repetir la fórmula en cada bucle. Los valores None se tratan
+igual que en los cálculos originales.
+"""
+from typing import NamedTuple
+
+from django.db.models.functions import Round
+
+# Peso del Hacer y del Ser en el puntaje total; el Ser (1-5) se escala a 0-100
+PESO_HACER = 0.7
+PESO_SER = 0.3
+ESCALA_SER = 20
+
+
+class PuntajeNegociador(NamedTuple):
+    """Puntajes de un negociador calculados una sola vez (ver ``Negotiator.puntajes``)."""
+    hacer: float | None
+    ser: float | None
+    total: float | None
+    computed_at: object
+
+
+class RedondeoPython(Round):
+    """
+    ``Round`` que en SQLite redondea con ``round()`` de Python. El ROUND nativo
+    redondea los empates decimales (p. ej. 46.805) hacia arriba aunque el valor
+    binario quede por debajo, así que las anotaciones no coincidirían con los
+    puntajes calculados en Python. Requiere ``registrar_funciones_sqlite``.
+
+    Solo SQLite (la base del proyecto) está cubierto: en otros motores se usa
+    el ``ROUND`` nativo heredado de ``Round``, que puede diferir de ``round()``
+    de Python en los empates (medio hacia arriba contra medio al par sobre el
+    valor binario).
+    """
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sqlite(compiler, connection, function='PY_ROUND', **extra_context)
+
+
+def _py_round(valor, decimales):
+    return None if valor is None else round(valor, decimales)
+
+
+def registrar_funciones_sqlite(sender, connection, **kwargs):
+    """Receptor de ``connection_created``: registra ``PY_ROUND`` en las conexiones SQLite."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function('PY_ROUND', 2, _py_round, deterministic=True)
+
+
+def desempeno(conversion, cump_recaudo, cump_conv, caidas):
+    """
+    Desempeño (0-100) por entidad: promedio de conversión, cumplimiento de recaudo,
+    cumplimiento de conversión y (100 - caídas), omitiendo componentes None.
+    Retorna None para las entidades sin ningún componente.
+    """
+    resultado = []
+    append = resultado.append
+    for conv, recaudo, cump, caida in zip(conversion, cump_recaudo, cump_conv, caidas):
+        total = 0.0
+        n = 0
+        if conv is not None:
+            total += conv
+            n += 1
+        if recaudo is not None:
+            total += recaudo
+            n += 1
+        if cump is not None:
+            total += cump
+            n += 1
+        if caida is not None:
+            total += max(0.0, 100.0 - caida)
+            n += 1
+        append(round(total / n, 2) if n else None)
+    return resultado
+
+
+def promedio_ser(criterios):
+    """
+    Promedio (1-5) de los criterios de una evaluación del Ser, redondeado a 2
+    decimales. A diferencia del resto recibe una sola fila: las exportaciones
+    lo aplican mientras recorren las evaluaciones en streaming.
+    """
+    return round(sum(criterios) / float(len(criterios)), 2)
+
+
+def puntaje_total(hacer, ser_promedio):
+    """
+    Puntaje total (70% Hacer + 30% Ser) por entidad. ``hacer`` está en 0-100 y
+    ``ser_promedio`` en 1-5; si falta alguno de los dos el total es None.
+    """
+    return [
+        round(h * PESO_HACER + s * ESCALA_SER * PESO_SER, 2) if h is not None and s is not None else None
+        for h, s in zip(hacer, ser_promedio)
+    ]
+
+
+def desempeno_de_filas(filas):
+    """Aplica ``desempeno`` a una lista de dicts con las llaves avg_* del dashboard."""
+    return desempeno(
+        [f['avg_conversion'] for f in filas],
+        [f['avg_cump_recaudo'] for f in filas],
+        [f['avg_cump_conv'] for f in filas],
+        [f['avg_caidas'] for f in filas],
+    )
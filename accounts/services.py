@@ -0,0 +1,115 @@
+"""
+Creación de evaluaciones del Hacer.
+
+Una evaluación guarda la puntuación del Hacer del momento y una fila
+``EvaluationKPI`` por cada KPI de porcentaje con el valor del indicador más
+reciente del negociador. ``crear_evaluaciones`` lo hace para N negociadores en
+una transacción y con un número fijo de consultas (puntajes con
+``with_scores``, último indicador por fecha máxima agrupada y ``bulk_create``).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import rollups
+from .models import KPI, Evaluation, EvaluationKPI, Negotiator, NegotiatorIndicator
+
+# KPIs de porcentaje usados por las evaluaciones de Hacer: nombre -> campo del indicador
+KPIS_EVALUACION = {
+    'Conversión de Ventas': 'conversion_de_ventas',
+    'Porcentajes de Cumplimiento de Recaudo': 'porcentajes_cumplimiento_recaudo',
+    'Porcentaje de Cumplimiento de Conversión': 'porcentaje_cumplimiento_conversion',
+    'Porcentaje de Caídas de Acuerdos': 'porcentaje_caidas_acuerdos',
+}
+
+KPIS_CACHE_KEY = 'accounts:kpis_evaluacion'
+
+
+def kpis_evaluacion():
+    """
+    Lista de (id del KPI, campo del indicador) de los KPIs de porcentaje con
+    campo conocido. La llave es propia (no depende de la versión de datos del
+    dashboard): solo las señales de KPI la borran con ``invalidar_kpis``.
+    """
+    kpis = cache.get(KPIS_CACHE_KEY)
+    if kpis is None:
+        kpis = [
+            (pk, KPIS_EVALUACION[name])
+            for pk, name in KPI.objects.filter(kpi_type='percentage', name__in=KPIS_EVALUACION)
+            .order_by('pk').values_list('pk', 'name')
+        ]
+        cache.set(KPIS_CACHE_KEY, kpis, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60 * 60))
+    return kpis
+
+
+def invalidar_kpis():
+    """Borra el mapa de KPIs al confirmar, para no volver a cachear el estado sin confirmar."""
+    transaction.on_commit(lambda: cache.delete(KPIS_CACHE_KEY))
+
+
+def ultimos_indicadores(negotiator_ids):
+    """
+    {negotiator_id: {campo: valor}} del indicador más reciente de cada
+    negociador, en una consulta: la fecha máxima por negociador sale de un
+    ``GROUP BY`` que se une a la tabla por (negociador, fecha), en lugar de una
+    subconsulta correlacionada por fila.
+    """
+    negotiator_ids = list(negotiator_ids)
+    if not negotiator_ids:
+        return {}
+    ultimas = (
+        NegotiatorIndicator.objects.filter(negotiator_id__in=negotiator_ids)
+        .order_by().values('negotiator_id').annotate(ultima=Max('date'))
+    )
+    ultimas_sql, params = ultimas.query.sql_with_params()
+    qn = connection.ops.quote_name
+    sql = 'SELECT i.{}, {} FROM {} i INNER JOIN ({}) u ON u.{} = i.{} AND u.{} = i.{}'.format(
+        qn('negotiator_id'),
+        ', '.join(f'i.{qn(c)}' for c in rollups.KPI_FIELDS),
+        qn(NegotiatorIndicator._meta.db_table),
+        ultimas_sql,
+        qn('negotiator_id'), qn('negotiator_id'), qn('ultima'), qn('date'),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {fila[0]: dict(zip(rollups.KPI_FIELDS, fila[1:])) for fila in cursor.fetchall()}
+
+
+def crear_evaluaciones(evaluador, items):
+    """
+    Crea una evaluación del Hacer por cada (negociador, feedback) de ``items``
+    con sus ``EvaluationKPI``, todo o nada. La puntuación es la de
+    ``Negotiator.calcular_puntuacion_hacer`` (0.0 si no hay indicadores en el
+    periodo). Retorna las evaluaciones creadas, en el orden de ``items``.
+    """
+    items = list(items)
+    if not items:
+        return []
+    negotiator_ids = [negotiator.pk for negotiator, _ in items]
+    kpis = kpis_evaluacion()
+
+    with transaction.atomic():
+        hacer = dict(Negotiator.objects.filter(pk__in=negotiator_ids).with_scores().values_list('pk', 'puntaje_hacer'))
+        ultimos = ultimos_indicadores(negotiator_ids) if kpis else {}
+        evaluaciones = Evaluation.objects.bulk_create([
+            Evaluation(
+                negotiator=negotiator,
+                evaluator=evaluador,
+                overall_score=hacer[negotiator.pk] if hacer.get(negotiator.pk) is not None else 0.0,
+                feedback=feedback,
+            )
+            for negotiator, feedback in items
+        ])
+        EvaluationKPI.objects.bulk_create([
+            EvaluationKPI(evaluation=evaluacion, kpi_id=kpi_id, score=ultimos[evaluacion.negotiator_id][campo])
+            for evaluacion in evaluaciones
+            if evaluacion.negotiator_id in ultimos
+            for kpi_id, campo in kpis
+        ])
+    return evaluaciones
+
+
+def crear_evaluacion(negotiator, evaluador, feedback=''):
+    """Evaluación del Hacer de un solo negociador (ver ``crear_evaluaciones``)."""
+    return crear_evaluaciones(evaluador, [(negotiator, feedback)])[0]
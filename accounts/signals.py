@@ -0,0 +1,45 @@
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .dashboard import invalidar_dashboard
+from .models import KPI, Evaluation, Negotiator, NegotiatorIndicator, SerEvaluation
+from .scoring import registrar_funciones_sqlite
+from .services import invalidar_kpis
+
+connection_created.connect(registrar_funciones_sqlite, dispatch_uid='accounts.registrar_funciones_sqlite')
+
+
+@receiver(post_save, sender=NegotiatorIndicator)
+@receiver(post_delete, sender=NegotiatorIndicator)
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+@receiver(post_save, sender=Negotiator)
+@receiver(post_delete, sender=Negotiator)
+def invalidar_cache_dashboard(sender, **kwargs):
+    """Cualquier cambio en indicadores, evaluaciones o negociadores invalida el dashboard."""
+    invalidar_dashboard()
+
+
+@receiver(post_delete, sender=Evaluation)
+@receiver(post_delete, sender=SerEvaluation)
+def refrescar_ultimas_evaluaciones(sender, instance, origin=None, **kwargs):
+    """
+    Los borrados en cascada (p. ej. al borrar el usuario evaluador) no pasan por
+    ``EvaluacionQuerySet.delete`` ni por el mixin: se recalculan aquí los campos
+    de última evaluación del negociador. Si el borrado viene de las propias
+    evaluaciones ya se recalcularon en lote, y si viene del negociador, este
+    también se borra.
+    """
+    modelo_origen = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if modelo_origen in (sender, Negotiator):
+        return
+    Negotiator.objects.filter(pk=instance.negotiator_id).refrescar_ultimas_evaluaciones()
+
+
+@receiver(post_save, sender=KPI)
+@receiver(post_delete, sender=KPI)
+def invalidar_cache_kpis(sender, **kwargs):
+    """El mapa de KPIs de las evaluaciones se recalcula al crear, editar o borrar un KPI."""
+    invalidar_kpis()
@@ -1,3 +1,1269 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import unittest
+import zipfile
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from time import sleep
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Avg, Count, F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import datagen, exports, jobs, rollups, scoring
+from .fechas import rango_datetime
+from .middleware import QueryBudgetExceeded
+from .dashboard import (
+    ORDENAR_NEGOCIADORES_OPCIONES, ORDENAR_POR_OPCIONES, construir_leaders_data, negociadores_por_lider, ordenar_leaders_data,
+    version_datos,
+)
+from .exports import (
+    PDF_VENTANA_POR_WORKER, _renderizar, _tablas_pdf, bloques_indicadores, evaluaciones_pdf_zip, exportar_historico_pdf,
+)
+from .models import (
+    KPI, DashboardDataVersion, Evaluation, EvaluationKPI, ExportJob, LeaderIndicatorRollup, Negotiator, NegotiatorIndicator,
+    NegotiatorIndicatorRollup, SemesterSnapshot, SerEvaluation, User,
+)
+from .services import kpis_evaluacion, ultimos_indicadores
+from .timeseries import CURSOR_MARGEN, cursor_actual, leer_cursor, lttb
+
+
+def _crear_datos():
+    lider = User.objects.create(cedula='123456', email='lider@test.local', role='lider')
+    negociador = Negotiator.objects.create(leader=lider, name='Negociador', cedula='654321')
+    return lider, negociador
+
+
+class RangoDatetimeTests(TestCase):
+    """El rango semiabierto debe devolver lo mismo que date__date__gte/lte."""
+
+    def test_equivale_a_filtro_por_fecha(self):
+        lider, negociador = _crear_datos()
+        dia = date(2025, 3, 10)
+        momentos = [
+            datetime.combine(dia - timedelta(days=1), time(23, 59, 59)),
+            datetime.combine(dia, time.min),
+            datetime.combine(dia + timedelta(days=1), time(23, 59, 59, 999999)),
+            datetime.combine(dia + timedelta(days=2), time.min),
+        ]
+        for momento in momentos:
+            ev = Evaluation.objects.create(negotiator=negociador, evaluator=lider)
+            Evaluation.objects.filter(pk=ev.pk).update(date=timezone.make_aware(momento))
+
+        desde, hasta = dia, dia + timedelta(days=1)
+        esperado = set(
+            Evaluation.objects.filter(date__date__gte=desde, date__date__lte=hasta).values_list('pk', flat=True)
+        )
+        obtenido = set(Evaluation.objects.filter(**rango_datetime(desde, hasta)).values_list('pk', flat=True))
+        self.assertEqual(obtenido, esperado)
+        self.assertEqual(len(obtenido), 2)
+
+    def test_extremos_opcionales(self):
+        self.assertEqual(rango_datetime(), {})
+        self.assertEqual(list(rango_datetime(desde=date(2025, 1, 1))), ['date__gte'])
+        self.assertEqual(list(rango_datetime(hasta=date(2025, 1, 1), campo='created_at')), ['created_at__lt'])
+
+
+class PuntuacionHacerTests(TestCase):
+    """La puntuación del Hacer se calcula en una consulta y admite una ventana anclada."""
+
+    def test_ventana_anclada_en_una_consulta(self):
+        _, negociador = _crear_datos()
+        fin = date(2025, 3, 31)
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(
+                negotiator=negociador, date=fin - timedelta(days=dias),
+                conversion_de_ventas=valor, porcentajes_cumplimiento_recaudo=valor,
+                porcentaje_cumplimiento_conversion=valor, porcentaje_caidas_acuerdos=valor / 2,
+            )
+            # El de 31 días queda fuera de la ventana y el de -1 después de fecha_fin
+            for dias, valor in [(0, 80.0), (30, 40.0), (31, 10.0), (-1, 100.0)]
+        ])
+        with self.assertNumQueries(1):
+            puntuacion = negociador.calcular_puntuacion_hacer(fecha_fin=fin)
+        self.assertEqual(puntuacion, round((60.0 * 3 + 30.0) / 4, 2))
+        self.assertIsNone(negociador.calcular_puntuacion_hacer(fecha_fin=fin - timedelta(days=365)))
+
+
+class WithScoresTests(TestCase):
+    """``with_scores`` debe coincidir con los puntajes calculados por negociador."""
+
+    def test_anotaciones_igualan_puntajes_del_modelo(self):
+        lider = User.objects.create(cedula='123456', email='lider@test.local', role='lider')
+        hoy = timezone.now().date()
+        negociadores = Negotiator.objects.bulk_create(
+            [Negotiator(leader=lider, name=f'N{i}', cedula=f'65{i:04d}') for i in range(4)]
+        )
+        # 53.15 * 0.7 + 1.6 * 6 = 46.805: empate decimal que ROUND nativo redondea distinto
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(
+                negotiator=n, date=hoy - timedelta(days=dias),
+                conversion_de_ventas=53.15, porcentajes_cumplimiento_recaudo=53.15,
+                porcentaje_cumplimiento_conversion=53.15, porcentaje_caidas_acuerdos=53.15 if dias < 30 else 0.0,
+            )
+            for n in negociadores[:3]
+            for dias in (0, 10, 45)
+        ])
+        for n in negociadores[1:]:
+            SerEvaluation.objects.create(
+                negotiator=n, evaluator=lider,
+                actitud=1, trabajo_en_equipo=2, sentido_pertenencia=2, relacionamiento=2, compromiso=1,
+            )
+
+        with self.assertNumQueries(1):
+            anotados = list(Negotiator.objects.with_scores().order_by('pk'))
+        for anotado in anotados:
+            n = Negotiator.objects.get(pk=anotado.pk)
+            esperado = (n.calcular_puntuacion_hacer(), n.puntajes.ser, n.calcular_puntaje_total())
+            self.assertEqual((anotado.puntaje_hacer, anotado.puntaje_ser, anotado.puntaje_total), esperado)
+        self.assertEqual([a.puntaje_total is None for a in anotados], [True, False, False, True])
+
+
+class ScoringTests(SimpleTestCase):
+    """Fórmulas por columnas de ``scoring`` con entradas incompletas."""
+
+    def test_desempeno_omite_componentes_none(self):
+        self.assertEqual(
+            scoring.desempeno([80.0, None], [None, None], [60.0, None], [None, None]),
+            [70.0, None],
+        )
+
+    def test_desempeno_no_resta_por_debajo_de_cero_con_caidas_sobre_100(self):
+        self.assertEqual(scoring.desempeno([None], [None], [None], [130.0]), [0.0])
+        self.assertEqual(scoring.desempeno([60.0], [None], [None], [150.0]), [30.0])
+
+    def test_puntaje_total_requiere_hacer_y_ser(self):
+        self.assertEqual(
+            scoring.puntaje_total([80.0, None, 80.0], [4.0, 4.0, None]),
+            [round(80.0 * scoring.PESO_HACER + 4.0 * scoring.ESCALA_SER * scoring.PESO_SER, 2), None, None],
+        )
+
+    def test_columnas_vacias(self):
+        self.assertEqual(scoring.desempeno([], [], [], []), [])
+        self.assertEqual(scoring.puntaje_total([], []), [])
+        self.assertEqual(scoring.desempeno_de_filas([]), [])
+
+    def test_promedio_ser_coincide_con_el_modelo(self):
+        criterios = [5, 4, 4, 3, 5]
+        evaluacion = SerEvaluation(**dict(zip(SerEvaluation.CAMPOS_SER, criterios)))
+        self.assertEqual(scoring.promedio_ser(criterios), evaluacion.promedio)
+        self.assertEqual(scoring.promedio_ser(criterios), 4.2)
+
+
+class SerieIndicadoresTests(TestCase):
+    """API de series: submuestreo LTTB acotado y revalidación con ETag."""
+
+    def test_lttb_acota_y_conserva_extremos(self):
+        xs = list(range(1000))
+        ys = [50.0] * 1000
+        ys[437] = 100.0
+        indices = lttb(xs, ys, 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertIn(437, indices)
+        self.assertEqual(lttb(xs[:10], ys[:10], 50), list(range(10)))
+
+    def test_max_points_y_etag(self):
+        lider, negociador = _crear_datos()
+        hoy = timezone.now().date()
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(negotiator=negociador, date=hoy - timedelta(days=dias), conversion_de_ventas=dias % 7)
+            for dias in range(400)
+        ])
+        self.client.force_login(lider)
+        url = reverse('negotiator_indicators_api', args=[negociador.cedula])
+
+        response = self.client.get(url, {'from': (hoy - timedelta(days=399)).isoformat(), 'max_points': 40})
+        datos = response.json()
+        self.assertEqual(datos['total'], 400)
+        serie = datos['series']['conversion_de_ventas']
+        self.assertEqual(len(serie['t']), 40)
+        self.assertEqual((serie['t'][0], serie['t'][-1]), (0, 399))
+
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        indicador = negociador.indicators.get(date=hoy)
+        indicador.conversion_de_ventas = 99.0
+        indicador.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_cursor_since_retorna_solo_cambios(self):
+        lider, negociador = _crear_datos()
+        hoy = timezone.now().date()
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(negotiator=negociador, date=hoy - timedelta(days=dias)) for dias in range(30)
+        ])
+        # Filas escritas antes del margen del cursor
+        NegotiatorIndicator.objects.update(updated_at=timezone.now() - 2 * CURSOR_MARGEN)
+        self.client.force_login(lider)
+        url = reverse('negotiator_indicators_api', args=[negociador.cedula])
+        cursor = self.client.get(url).json()['cursor']
+        self.assertEqual(self.client.get(url, {'since': cursor}).json()['total'], 0)
+
+        indicador = negociador.indicators.get(date=hoy - timedelta(days=3))
+        indicador.tiempo_hablando = 8.5
+        indicador.save()
+        delta = self.client.get(url, {'since': cursor}).json()
+        self.assertTrue(delta['incremental'])
+        self.assertEqual(delta['series']['tiempo_hablando'], {'t': [177], 'v': [8.5]})
+
+        # Escrita antes de la respuesta anterior pero confirmada después: la trae el siguiente pedido
+        NegotiatorIndicator.objects.filter(negotiator=negociador, date=hoy - timedelta(days=5)).update(
+            tiempo_hablando=3.0, updated_at=leer_cursor(delta['cursor'])[0] + CURSOR_MARGEN - timedelta(seconds=1)
+        )
+        siguiente = self.client.get(url, {'since': delta['cursor']}).json()
+        self.assertEqual(siguiente['series']['tiempo_hablando'], {'t': [175, 177], 'v': [3.0, 8.5]})
+
+    def test_cursor_es_marca_de_agua(self):
+        ahora = timezone.now()
+        self.assertEqual(leer_cursor(cursor_actual(ahora)), (ahora - CURSOR_MARGEN, 0))
+
+
+class SerieEquipoTests(TestCase):
+    """Serie agregada del equipo: granularidad automática y distribución por negociador."""
+
+    def test_agregado_semanal_del_equipo(self):
+        lider = User.objects.create(cedula='123456', email='lider@test.local', role='lider')
+        negociadores = Negotiator.objects.bulk_create(
+            [Negotiator(leader=lider, name=f'N{i}', cedula=f'65{i:04d}') for i in range(4)]
+        )
+        lunes = date(2025, 3, 3)
+        # N0 con dos filas en la semana; el resto con una
+        NegotiatorIndicator.objects.bulk_create(
+            [NegotiatorIndicator(negotiator=negociadores[0], date=lunes, conversion_de_ventas=10.0),
+             NegotiatorIndicator(negotiator=negociadores[0], date=lunes + timedelta(days=1), conversion_de_ventas=30.0)]
+            + [NegotiatorIndicator(negotiator=n, date=lunes + timedelta(days=2), conversion_de_ventas=valor)
+               for n, valor in zip(negociadores[1:], (40.0, 60.0, 80.0))]
+        )
+        self.client.force_login(lider)
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.client.get(
+                reverse('lider_equipo_indicadores_api'), {'from': '2025-01-01', 'to': '2025-06-30'}
+            ).json()
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+        self.assertEqual(datos['granularidad'], 'week')
+        self.assertEqual(datos['periodos'], ['2025-03-03'])
+        self.assertEqual(datos['negociadores'], [4])
+        serie = datos['series']['conversion_de_ventas']
+        # avg sobre las 5 filas; la distribución sobre los promedios 20, 40, 60, 80
+        self.assertEqual(
+            {nombre: valores[0] for nombre, valores in serie.items()},
+            {'avg': 44.0, 'min': 20.0, 'p25': 35.0, 'p50': 50.0, 'p75': 65.0, 'max': 80.0},
+        )
+
+
+class EvaluacionEquipoTests(TestCase):
+    """La evaluación del equipo crea todo en un envío con consultas que no dependen del tamaño."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _evaluar_equipo(self, lider, cantidad):
+        negociadores = Negotiator.objects.bulk_create(
+            [Negotiator(leader=lider, name=f'N{i}', cedula=f'{lider.cedula}{i:03d}') for i in range(cantidad)]
+        )
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(negotiator=n, date=timezone.now().date(), conversion_de_ventas=50.0 + i)
+            for i, n in enumerate(negociadores)
+        ])
+        datos = {f'incluir_{n.cedula}': 'on' for n in negociadores}
+        datos[f'feedback_{negociadores[0].cedula}'] = 'Buen trabajo'
+        self.client.force_login(lider)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('evaluacion_equipo'), datos)
+        self.assertRedirects(response, reverse('pending_evaluations'), fetch_redirect_response=False)
+        return negociadores, len(ctx.captured_queries)
+
+    def test_crea_evaluaciones_y_kpis_en_lote(self):
+        KPI.objects.create(name='Conversión de Ventas', kpi_type='percentage')
+        KPI.objects.create(name='Porcentaje de Caídas de Acuerdos', kpi_type='percentage')
+        pequeno = User.objects.create(cedula='111111', email='pequeno@test.local', role='lider')
+        grande = User.objects.create(cedula='222222', email='grande@test.local', role='lider')
+        kpis_evaluacion()  # el mapa de KPIs queda en caché para ambas mediciones
+
+        _, consultas_pequeno = self._evaluar_equipo(pequeno, 2)
+        negociadores, consultas_grande = self._evaluar_equipo(grande, 30)
+        self.assertEqual(consultas_grande, consultas_pequeno)
+
+        evaluacion = Evaluation.objects.get(negotiator=negociadores[0])
+        self.assertEqual(evaluacion.feedback, 'Buen trabajo')
+        self.assertEqual(evaluacion.overall_score, negociadores[0].calcular_puntuacion_hacer())
+        self.assertEqual(EvaluationKPI.objects.filter(evaluation__negotiator__leader=grande).count(), 60)
+        self.assertFalse(grande.negotiators.pendientes_de_evaluacion().exists())
+
+    def test_ultimos_indicadores_toma_la_fecha_mas_reciente(self):
+        lider = User.objects.create(cedula='333333', email='ultimos@test.local', role='lider')
+        con_historia, sin_indicadores = Negotiator.objects.bulk_create(
+            [Negotiator(leader=lider, name='Con', cedula='3330001'), Negotiator(leader=lider, name='Sin', cedula='3330002')]
+        )
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(negotiator=con_historia, date=date(2025, 1, 1), conversion_de_ventas=10.0),
+            NegotiatorIndicator(negotiator=con_historia, date=date(2025, 3, 1), conversion_de_ventas=30.0),
+            NegotiatorIndicator(negotiator=con_historia, date=date(2025, 2, 1), conversion_de_ventas=20.0),
+        ])
+        with self.assertNumQueries(1):
+            ultimos = ultimos_indicadores([con_historia.pk, sin_indicadores.pk])
+        self.assertEqual(list(ultimos), [con_historia.pk])
+        self.assertEqual(ultimos[con_historia.pk]['conversion_de_ventas'], 30.0)
+
+
+class ExportarHistoricoExcelTests(TestCase):
+    """El Excel del histórico se escribe en modo write-only y se entrega como archivo en streaming."""
+
+    def test_hojas_y_filas(self):
+        import openpyxl
+
+        lider, negociador = _crear_datos()
+        admin = User.objects.create(cedula='999999', email='admin@test.local', role='administrativo')
+        Evaluation.objects.bulk_create([
+            Evaluation(negotiator=negociador, evaluator=lider, overall_score=70.123, feedback=f'F{i}') for i in range(3)
+        ])
+        SerEvaluation.objects.create(
+            negotiator=negociador, evaluator=lider,
+            actitud=4, trabajo_en_equipo=3, sentido_pertenencia=5, relacionamiento=3, compromiso=4,
+        )
+        self.client.force_login(admin)
+        response = self.client.get(reverse('exportar_historico_excel'))
+        self.assertTrue(response.streaming)
+        self.assertIn('historico_evaluaciones.xlsx', response['Content-Disposition'])
+
+        wb = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        hacer, ser = (list(ws.iter_rows(values_only=True)) for ws in wb.worksheets)
+        self.assertEqual(wb.sheetnames, ['Evaluaciones Hacer', 'Evaluaciones Ser'])
+        self.assertEqual(len(hacer), 4)
+        self.assertEqual(hacer[1][1:6], (' ', 'lider@test.local', 'Negociador', '654321', 70.12))
+        self.assertEqual(ser[1][5:], (4, 3, 5, 3, 4, 3.8))
+
+
+class ExportarHistoricoPdfTests(TestCase):
+    """El PDF del histórico incluye todas las filas, en tablas por bloques con encabezado."""
+
+    def test_tablas_por_bloques(self):
+        tablas = list(_tablas_pdf(['Fecha'], ([i] for i in range(450)), None, None))
+        self.assertEqual([tabla._nrows for tabla in tablas], [201, 201, 51])
+        self.assertTrue(all(tabla.repeatRows == 1 for tabla in tablas))
+
+    def test_sin_tope_de_filas(self):
+        lider, negociador = _crear_datos()
+        Evaluation.objects.bulk_create([
+            Evaluation(negotiator=negociador, evaluator=lider, overall_score=i % 100) for i in range(1200)
+        ])
+        destino = io.BytesIO()
+        self.assertEqual(exportar_historico_pdf({}, destino, chunk_size=100), 'historico_evaluaciones.pdf')
+        # El tope anterior de 500 filas cabía en menos de 15 páginas
+        paginas = len(re.findall(rb'/Type /Page\b', destino.getvalue()))
+        self.assertGreater(paginas, 1200 // 50)
+
+
+class ExportarEvaluacionesPdfTests(TestCase):
+    """El ZIP del equipo trae el PDF de la última evaluación de cada negociador evaluado."""
+
+    @override_settings(PDF_WORKERS=2)
+    def test_zip_del_equipo(self):
+        lider, negociador = _crear_datos()
+        otro = Negotiator.objects.create(leader=lider, name='Otro', cedula='777777')
+        Negotiator.objects.create(leader=lider, name='Sin evaluar', cedula='888888')
+        for n in (negociador, otro):
+            Evaluation.objects.create(negotiator=n, evaluator=lider, overall_score=75, feedback='Bien')
+        self.client.force_login(lider)
+        response = self.client.get(reverse('exportar_evaluaciones_equipo_pdf'))
+        self.assertTrue(response.streaming)
+        archivo = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archivo.namelist()), ['evaluacion_654321.pdf', 'evaluacion_777777.pdf', 'sin_evaluacion.txt']
+        )
+        self.assertTrue(archivo.read('evaluacion_777777.pdf').startswith(b'%PDF'))
+        self.assertIn('888888', archivo.read('sin_evaluacion.txt').decode())
+
+    def test_negociador_borrado_durante_la_descarga(self):
+        lider, negociador = _crear_datos()
+        otros = Negotiator.objects.bulk_create([
+            Negotiator(leader=lider, name=f'N{i}', cedula=f'77777{i}') for i in range(3)
+        ])
+        for n in [negociador, *otros]:
+            Evaluation.objects.create(negotiator=n, evaluator=lider, overall_score=75)
+        with mock.patch('accounts.exports.PDF_LOTE_NEGOCIADORES', 1):
+            bloques = evaluaciones_pdf_zip(Negotiator.objects.filter(leader=lider), workers=1)
+            primero = next(bloques)
+            # Los ids ya se leyeron (y los dos primeros lotes); el tercero desaparece antes de cargarse
+            otros[2].delete()
+            archivo = zipfile.ZipFile(io.BytesIO(primero + b''.join(bloques)))
+        self.assertIsNone(archivo.testzip())
+        self.assertEqual(sorted(archivo.namelist()), [
+            'evaluacion_654321.pdf', 'evaluacion_777770.pdf', 'evaluacion_777771.pdf',
+        ])
+
+    def test_pool_por_ventanas_y_cierre_anticipado(self):
+        leidos = []
+
+        def datos():
+            for i in range(20):
+                leidos.append(i)
+                yield {
+                    'negociador': f'N{i}', 'cedula': str(i), 'lider': 'L', 'lider_email': 'l@test.local',
+                    'fecha': '01/01/2025 00:00', 'kpis': [], 'hacer': 50, 'ser': None, 'total': 35, 'feedback': '',
+                }
+
+        pdfs = _renderizar(datos(), workers=2)
+        item, pdf = next(pdfs)
+        self.assertEqual(item['cedula'], '0')
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        # Solo se encargó la primera ventana; al cerrar, el resto ni se lee
+        self.assertEqual(len(leidos), PDF_VENTANA_POR_WORKER * 2)
+        pdfs.close()
+        self.assertEqual(len(leidos), PDF_VENTANA_POR_WORKER * 2)
+
+
+class ExportarIndicadoresTests(TestCase):
+    """Los indicadores crudos se exportan por bloques con paginación por llave."""
+
+    def setUp(self):
+        self.lider, negociador = _crear_datos()
+        otro = Negotiator.objects.create(leader=self.lider, name='Otro', cedula='777777')
+        inicio = date(2025, 1, 1)
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(negotiator=n, date=inicio + timedelta(days=dias), conversion_de_ventas=dias)
+            for dias in range(10) for n in (negociador, otro)
+        ])
+        self.admin = User.objects.create(cedula='999999', email='admin@test.local', role='administrativo')
+
+    def test_bloques_recorren_todas_las_filas_sin_repetir(self):
+        bloques = list(bloques_indicadores(NegotiatorIndicator.objects.all(), chunk_size=3))
+        filas = [fila for bloque in bloques for fila in bloque]
+        self.assertEqual(len(bloques), 7)
+        self.assertEqual(len(filas), 20)
+        self.assertEqual(len({(fila[0], fila[1]) for fila in filas}), 20)
+        self.assertEqual(filas, sorted(filas, key=lambda fila: (fila[0], fila[1] != '654321')))
+
+    def test_csv_filtrado_y_ndjson_comprimido(self):
+        self.client.force_login(self.admin)
+        url = reverse('exportar_indicadores')
+        response = self.client.get(url, {'desde': '2025-01-03', 'hasta': '2025-01-04', 'negociador': '777777'})
+        self.assertTrue(response.streaming)
+        filas = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(filas[0][:4], ['fecha', 'cedula_negociador', 'negociador', 'cedula_lider'])
+        self.assertEqual([fila[:4] for fila in filas[1:]], [
+            ['2025-01-03', '777777', 'Otro', '123456'], ['2025-01-04', '777777', 'Otro', '123456'],
+        ])
+
+        response = self.client.get(url, {'formato': 'ndjson', 'lider': '123456'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lineas = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lineas), 20)
+        self.assertEqual(json.loads(lineas[-1])['conversion_de_ventas'], 9)
+
+    def test_presupuesto_cuenta_las_consultas_del_cuerpo(self):
+        self.client.force_login(self.admin)
+        with override_settings(QUERY_BUDGETS={'exportar_indicadores': 2}, QUERY_BUDGET_RAISE=True):
+            response = self.client.get(reverse('exportar_indicadores'))
+            # La vista solo prepara el generador; las consultas de los bloques llegan al consumir el cuerpo
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+
+class ExportacionesSegundoPlanoTests(TransactionTestCase):
+    """
+    Los pedidos se encolan y deduplican; el worker genera el archivo y los
+    vencidos se purgan. Sin transacción envolvente: el worker usa sus propios hilos.
+    """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(EXPORT_JOBS_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        lider, negociador = _crear_datos()
+        Evaluation.objects.create(negotiator=negociador, evaluator=lider, overall_score=80)
+        self.admin = User.objects.create(cedula='999999', email='admin@test.local', role='administrativo')
+        self.client.force_login(self.admin)
+
+    def _encolar(self, **datos):
+        return self.client.post(
+            reverse('exportaciones'), {'tipo': 'historico_excel', **datos}, HTTP_ACCEPT='application/json'
+        )
+
+    def test_encolar_procesar_y_descargar(self):
+        import openpyxl
+
+        primero = self._encolar(desde='2020-01-01')
+        self.assertEqual(primero.status_code, 202)
+        job_id = primero.json()['id']
+        self.assertEqual(self._encolar(desde='2020-01-01', otro='x').json()['id'], job_id)
+        self.assertNotEqual(self._encolar(desde='2021-01-01').json()['id'], job_id)
+
+        call_command('procesar_exportaciones', una_vez=True, workers=2, stdout=io.StringIO())
+        estado = self.client.get(reverse('exportacion_estado', args=[job_id])).json()
+        self.assertEqual(estado['estado'], 'terminado')
+        response = self.client.get(estado['descarga_url'])
+        self.assertIn('historico_evaluaciones.xlsx', response['Content-Disposition'])
+        wb = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(wb.worksheets[0].max_row, 2)
+
+        # Terminado el trabajo, un pedido idéntico encola uno nuevo
+        self.assertNotEqual(self._encolar(desde='2020-01-01').json()['id'], job_id)
+
+    def test_vencidos_se_purgan(self):
+        job_id = self._encolar().json()['id']
+        call_command('procesar_exportaciones', una_vez=True, stdout=io.StringIO())
+        ExportJob.objects.filter(pk=job_id).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.client.get(reverse('exportacion_descargar', args=[job_id])).status_code, 404)
+        call_command('procesar_exportaciones', una_vez=True, stdout=io.StringIO())
+        self.assertFalse(ExportJob.objects.filter(pk=job_id).exists())
+
+    def test_intento_reencolado_no_cierra_el_trabajo(self):
+        job_id = self._encolar().json()['id']
+        viejo = jobs.reclamar(job_id)
+        self.assertIsNone(jobs.reclamar(job_id))
+        # El worker dejó de latir: el trabajo vuelve a la cola y otro lo reclama
+        ExportJob.objects.filter(pk=job_id).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.recuperar_abandonados(), 1)
+        nuevo = jobs.reclamar(job_id)
+        self.assertNotEqual(nuevo, viejo)
+
+        jobs.ejecutar(job_id, viejo)
+        self.assertEqual(ExportJob.objects.get(pk=job_id).estado, 'en_proceso')
+        jobs.ejecutar(job_id, nuevo)
+        self.assertFalse(jobs._finalizar(job_id, viejo, estado='error', error='tarde'))
+        job = ExportJob.objects.get(pk=job_id)
+        self.assertEqual((job.estado, job.error), ('terminado', ''))
+        self.assertEqual(os.listdir(jobs.directorio()), [job.archivo])
+        self.assertIn(nuevo, job.archivo)
+
+    @override_settings(EXPORT_JOBS_LATIDO_SEGUNDOS=0.01)
+    def test_latido_mientras_se_genera(self):
+        job_id = self._encolar().json()['id']
+        intento = jobs.reclamar(job_id)
+
+        def lenta(params, destino):
+            sleep(0.2)
+            destino.write(b'x')
+            return 'lenta.txt'
+
+        with mock.patch.dict(exports.EXPORTACIONES, {'historico_excel': (lenta, None)}):
+            jobs.ejecutar(job_id, intento)
+        job = ExportJob.objects.get(pk=job_id)
+        self.assertEqual(job.estado, 'terminado')
+        self.assertGreater(job.heartbeat_at, job.started_at)
+
+    def test_error_fuera_de_ejecutar_no_detiene_el_worker(self):
+        ids = [self._encolar(desde=desde).json()['id'] for desde in ('2020-01-01', '2021-01-01')]
+        ejecutar = jobs.ejecutar
+
+        def falla_el_primero(job_id, intento):
+            if job_id == ids[0]:
+                raise ExportJob.DoesNotExist
+            ejecutar(job_id, intento)
+
+        errores = io.StringIO()
+        with mock.patch('accounts.jobs.ejecutar', side_effect=falla_el_primero), self.assertLogs('accounts', 'ERROR'):
+            call_command('procesar_exportaciones', una_vez=True, workers=1, stdout=io.StringIO(), stderr=errores)
+        self.assertIn(f'Falló la exportación {ids[0]}', errores.getvalue())
+        self.assertEqual(ExportJob.objects.get(pk=ids[1]).estado, 'terminado')
+
+
+class RollupsTests(TestCase):
+    """Los rollups mantenidos en cada escritura coinciden con reconstruirlos desde los indicadores."""
+
+    def setUp(self):
+        self.lider, self.negociador = _crear_datos()
+        self.otro_lider = User.objects.create(cedula='555555', email='otro@test.local', role='lider')
+        self.otro = Negotiator.objects.create(leader=self.otro_lider, name='Otro', cedula='777777')
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(negotiator=negociador, date=date(2025, 1, 25) + timedelta(days=dia), conversion_de_ventas=dia * i)
+            for i, negociador in enumerate((self.negociador, self.otro), start=1)
+            for dia in range(10)
+        ])
+
+    def _tablas(self):
+        redondear = lambda fila: tuple(round(valor, 6) if isinstance(valor, float) else valor for valor in fila)
+        campos = ('count', *rollups.SUM_FIELDS)
+        return (
+            sorted(map(redondear, NegotiatorIndicatorRollup.objects.filter(count__gt=0).values_list('negotiator_id', 'month', *campos))),
+            sorted(map(redondear, LeaderIndicatorRollup.objects.filter(count__gt=0).values_list('leader_id', 'granularity', 'period', *campos))),
+        )
+
+    def _cuadran(self):
+        self.assertEqual(rollups.verificar_rollups(), [])
+        mantenidos = self._tablas()
+        rollups.reconstruir_rollups()
+        self.assertEqual(self._tablas(), mantenidos)
+
+    def test_escrituras_individuales(self):
+        self._cuadran()
+        indicador = NegotiatorIndicator.objects.create(negotiator=self.negociador, date=date(2025, 3, 1), conversion_de_ventas=42)
+        self._cuadran()
+        indicador.conversion_de_ventas = 7
+        indicador.date = date(2025, 4, 2)
+        indicador.save()
+        self._cuadran()
+        indicador.negotiator = self.otro
+        indicador.save()
+        self._cuadran()
+        indicador.delete()
+        self._cuadran()
+
+    def test_escrituras_en_lote(self):
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(negotiator=self.negociador, date=date(2025, 5, dia), recaudacion_mensual=100 * dia)
+            for dia in range(1, 4)
+        ])
+        self._cuadran()
+        NegotiatorIndicator.objects.bulk_create(
+            [NegotiatorIndicator(negotiator=self.otro, date=date(2025, 6, 1), tiempo_hablando=3)], ignore_conflicts=True,
+        )
+        self._cuadran()
+        NegotiatorIndicator.objects.filter(date__gte=date(2025, 2, 1)).update(conversion_de_ventas=1.5)
+        self._cuadran()
+        NegotiatorIndicator.objects.filter(negotiator=self.negociador, date__month=5).update(negotiator=self.otro)
+        self._cuadran()
+        indicadores = list(NegotiatorIndicator.objects.filter(negotiator=self.otro, date__month=5))
+        for indicador in indicadores:
+            indicador.negotiator = self.negociador
+            indicador.tiempo_hablando = 2
+        NegotiatorIndicator.objects.bulk_update(indicadores, ['negotiator', 'tiempo_hablando'])
+        self._cuadran()
+        NegotiatorIndicator.objects.filter(date__day__lt=28).delete()
+        self._cuadran()
+
+    def test_cambio_de_lider(self):
+        self.negociador.leader = self.otro_lider
+        self.negociador.save()
+        self._cuadran()
+        Negotiator.objects.filter(pk=self.otro.pk).update(leader=self.lider)
+        self._cuadran()
+        self.negociador.delete()
+        self._cuadran()
+        Negotiator.objects.filter(pk=self.otro.pk).delete()
+        self._cuadran()
+
+    def test_lote_atomico_e_invalidacion_al_confirmar(self):
+        antes = NegotiatorIndicator.objects.count()
+        nuevo = [NegotiatorIndicator(negotiator=self.negociador, date=date(2025, 7, 1))]
+        with mock.patch('accounts.rollups.registrar_indicadores', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                NegotiatorIndicator.objects.bulk_create(nuevo)
+        self.assertEqual(NegotiatorIndicator.objects.count(), antes)
+
+        version = version_datos()
+        with self.captureOnCommitCallbacks(execute=True):
+            NegotiatorIndicator.objects.bulk_create(nuevo)
+            NegotiatorIndicator.objects.filter(date=date(2025, 7, 1)).update(conversion_de_ventas=5)
+            self.assertEqual(version_datos(), version)
+        self.assertGreater(version_datos(), version)
+        self._cuadran()
+
+    def test_verificar_reporta_diferencias(self):
+        LeaderIndicatorRollup.objects.filter(leader=self.lider, granularity='month').update(count=F('count') + 1)
+        NegotiatorIndicatorRollup.objects.filter(negotiator=self.otro).delete()
+        diferencias = rollups.verificar_rollups()
+        self.assertTrue(any(d.startswith('lider') and 'count' in d for d in diferencias), diferencias)
+        self.assertTrue(any(d.startswith('negociador') and 'falta' in d for d in diferencias), diferencias)
+        rollups.reconstruir_rollups()
+        self.assertEqual(rollups.verificar_rollups(), [])
+
+
+class ConsolidadoDashboardTests(TestCase):
+    """``construir_leaders_data`` da lo mismo que el cálculo anterior fila por fila del dashboard."""
+
+    def setUp(self):
+        lideres = [
+            User.objects.create(cedula=f'10000{i}', email=f'lider{i}@test.local', first_name=f'L{i}', role='lider')
+            for i in range(4)
+        ]
+        # N2 (de L0) y el único negociador de L2 no tienen indicadores; L3 no tiene negociadores
+        negociadores = [
+            Negotiator.objects.create(leader=lider, name=f'N{i}', cedula=f'20000{i}')
+            for i, lider in enumerate([lideres[0], lideres[0], lideres[0], lideres[1], lideres[2]])
+        ]
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(
+                negotiator=negociador, date=date(2025, 2, 1) + timedelta(days=dia),
+                conversion_de_ventas=10 * i + dia, recaudacion_mensual=1000 * i + 7 * dia, tiempo_hablando=i + 0.5,
+                porcentajes_cumplimiento_recaudo=60 + 3 * i - dia, porcentaje_cumplimiento_conversion=40 + i * dia,
+                porcentaje_caidas_acuerdos=5 * i + dia % 3,
+            )
+            for i, negociador in enumerate([negociadores[0], negociadores[1], negociadores[3]], start=1)
+            for dia in range(0, 20, i)
+        ])
+        Evaluation.objects.create(negotiator=negociadores[0], evaluator=lideres[0], overall_score=70)
+        Evaluation.objects.create(negotiator=negociadores[0], evaluator=lideres[0], overall_score=75)
+        Evaluation.objects.create(negotiator=negociadores[4], evaluator=lideres[2], overall_score=60)
+        Evaluation.objects.filter(negotiator=negociadores[0]).update(date=datetime(2025, 2, 15, 23, 59, tzinfo=dt_timezone.utc))
+        Evaluation.objects.filter(negotiator=negociadores[4]).update(date=datetime(2025, 2, 10, tzinfo=dt_timezone.utc))
+
+    def _anterior(self, start_date, end_date, semester_target, ordenar_por, direccion):
+        # Lógica previa de administrativo_dashboard_view: promedios por líder y consultas por líder (HU20)
+        qs = (
+            NegotiatorIndicator.objects.filter(date__gte=start_date, date__lte=end_date)
+            .values('negotiator__leader__cedula', 'negotiator__leader__first_name', 'negotiator__leader__last_name',
+                    'negotiator__leader__email')
+            .annotate(
+                equipos=Count('negotiator', distinct=True), avg_conversion=Avg('conversion_de_ventas'),
+                avg_recaudo=Avg('recaudacion_mensual'), avg_tiempo=Avg('tiempo_hablando'),
+                avg_cump_recaudo=Avg('porcentajes_cumplimiento_recaudo'),
+                avg_cump_conv=Avg('porcentaje_cumplimiento_conversion'), avg_caidas=Avg('porcentaje_caidas_acuerdos'),
+            )
+        )
+        leaders_data = []
+        for row in qs:
+            componentes = [row[k] for k in ('avg_conversion', 'avg_cump_recaudo', 'avg_cump_conv') if row[k] is not None]
+            if row['avg_caidas'] is not None:
+                componentes.append(max(0.0, 100.0 - row['avg_caidas']))
+            leaders_data.append({
+                'cedula': row['negotiator__leader__cedula'],
+                'nombre': f"{row['negotiator__leader__first_name']} {row['negotiator__leader__last_name']}",
+                'email': row['negotiator__leader__email'],
+                'equipos': row['equipos'],
+                **{k: row[k] for k in ('avg_conversion', 'avg_recaudo', 'avg_tiempo', 'avg_cump_recaudo', 'avg_cump_conv', 'avg_caidas')},
+                'desempeno': round(sum(componentes) / len(componentes), 2) if componentes else None,
+            })
+        leaders_data.sort(key=lambda x: (x[ordenar_por] is None, x[ordenar_por]), reverse=direccion == 'desc')
+        for leader in leaders_data:
+            total = Negotiator.objects.filter(leader__cedula=leader['cedula']).count()
+            evaluados = Negotiator.objects.filter(
+                leader__cedula=leader['cedula'], evaluations__date__date__gte=start_date, evaluations__date__date__lte=end_date,
+            ).distinct().count()
+            pct = round((evaluados / total) * 100, 2) if total > 0 else 0
+            leader.update({
+                'total_negotiators': total,
+                'evaluated_negotiators': evaluados,
+                'evaluations_done': Evaluation.objects.filter(
+                    negotiator__leader__cedula=leader['cedula'], date__date__gte=start_date, date__date__lte=end_date,
+                ).count(),
+                'pending_negotiators': total - evaluados,
+                'pct_cumplimiento': pct,
+                'alert': pct < semester_target if total > 0 else False,
+            })
+        return leaders_data
+
+    def _redondeado(self, leaders_data):
+        # Sumas del rollup frente a AVG de SQL: solo difieren en el último bit
+        return [
+            {clave: round(valor, 9) if isinstance(valor, float) else valor for clave, valor in leader.items()}
+            for leader in leaders_data
+        ]
+
+    def test_igual_al_calculo_por_filas(self):
+        rangos = [
+            (date(2025, 2, 1), date(2025, 2, 28)),
+            (date(2025, 2, 5), date(2025, 2, 12)),
+            (date(2025, 2, 16), date(2025, 2, 16)),
+        ]
+        for desde, hasta in rangos:
+            for ordenar_por in ORDENAR_POR_OPCIONES:
+                for direccion in ('asc', 'desc'):
+                    with self.subTest(desde=desde, hasta=hasta, ordenar_por=ordenar_por, direccion=direccion):
+                        actual = ordenar_leaders_data(construir_leaders_data(desde, hasta, 70), ordenar_por, direccion)
+                        self.assertEqual(
+                            self._redondeado(actual), self._redondeado(self._anterior(desde, hasta, 70, ordenar_por, direccion))
+                        )
+
+        consolidado = construir_leaders_data(date(2025, 2, 1), date(2025, 2, 28), 70)
+        self.assertEqual(sorted(leader['cedula'] for leader in consolidado), ['100000', '100001'])
+        lider = next(leader for leader in consolidado if leader['cedula'] == '100000')
+        self.assertEqual(
+            (lider['equipos'], lider['total_negotiators'], lider['evaluated_negotiators'], lider['evaluations_done']),
+            (2, 3, 1, 2),
+        )
+
+    def test_rango_sin_indicadores(self):
+        self.assertEqual(construir_leaders_data(date(2024, 1, 1), date(2024, 6, 30), 70), [])
+        self.assertEqual(self._anterior(date(2024, 1, 1), date(2024, 6, 30), 70, 'desempeno', 'desc'), [])
+
+
+class LiderNegociadoresApiTests(TestCase):
+    """Detalle paginado de negociadores de un líder: límites de página y criterios de orden."""
+
+    def setUp(self):
+        cache.clear()
+        self.lider = User.objects.create(cedula='123456', email='lider@test.local', role='lider')
+        negociadores = Negotiator.objects.bulk_create([
+            Negotiator(leader=self.lider, name=nombre, cedula=f'30000{i}')
+            for i, nombre in enumerate(['Carla', 'Andrés', 'Beto', 'Elena', 'Diana', 'Fabio', 'Gina'])
+        ])
+        # Los dos últimos no tienen indicadores en el rango
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(
+                negotiator=negociador, date=date(2025, 2, 1) + timedelta(days=dia),
+                conversion_de_ventas=(7 * i) % 5 + dia, recaudacion_mensual=1000 - 90 * i, tiempo_hablando=i % 3,
+                porcentajes_cumplimiento_recaudo=50 + 9 * i, porcentaje_cumplimiento_conversion=80 - 11 * i,
+                porcentaje_caidas_acuerdos=(3 * i) % 4,
+            )
+            for i, negociador in enumerate(negociadores[:5]) for dia in range(3)
+        ])
+        admin = User.objects.create(cedula='999999', email='admin@test.local', role='administrativo')
+        self.client.force_login(admin)
+        self.url = reverse('lider_negociadores_api', args=[self.lider.cedula])
+
+    def _get(self, **params):
+        return self.client.get(self.url, {'desde': '2025-01-01', 'hasta': '2025-03-31', **params}).json()
+
+    def test_limites_de_pagina(self):
+        datos = self._get(page_size=3)
+        self.assertEqual((datos['page'], datos['num_pages'], datos['total'], len(datos['results'])), (1, 3, 7, 3))
+        self.assertEqual(len(self._get(page_size=3, page=3)['results']), 1)
+        # Paginator.get_page: no numérico -> primera página; fuera de rango -> última
+        for page, esperado in (('abc', 1), ('0', 3), ('-1', 3), ('99', 3)):
+            self.assertEqual(self._get(page_size=3, page=page)['page'], esperado)
+        for page_size, esperado in (('0', 1), ('-5', 1), ('10000', 7), ('x', 7)):
+            self.assertEqual(len(self._get(page_size=page_size)['results']), esperado)
+
+    def test_cada_criterio_de_orden(self):
+        for ordenar_por in ORDENAR_NEGOCIADORES_OPCIONES:
+            for direccion in ('asc', 'desc'):
+                with self.subTest(ordenar_por=ordenar_por, direccion=direccion):
+                    valores = [fila[ordenar_por] for fila in self._get(ordenar_por=ordenar_por, direccion=direccion)['results']]
+                    self.assertEqual(len(valores), 7)
+                    self.assertEqual(valores, sorted(valores, reverse=direccion == 'desc'))
+
+    def test_criterio_invalido_conserva_el_orden_de_registro(self):
+        esperado = [f'30000{i}' for i in range(7)]
+        for ordenar_por in ('', 'evaluated_in_range', '__class__', 'nombre; DROP'):
+            with self.subTest(ordenar_por=ordenar_por):
+                self.assertEqual([fila['cedula'] for fila in self._get(ordenar_por=ordenar_por)['results']], esperado)
+
+    def test_solo_administrativos(self):
+        self.client.force_login(self.lider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class SemestreCerradoTests(TestCase):
+    """Un semestre cerrado se sirve de su snapshot, que coincide con el cálculo en vivo al cerrarlo."""
+
+    def setUp(self):
+        cache.clear()
+        self.lider, self.negociador = _crear_datos()
+        self.otro = Negotiator.objects.create(leader=self.lider, name='Otro', cedula='777777')
+        NegotiatorIndicator.objects.bulk_create([
+            NegotiatorIndicator(
+                negotiator=negociador, date=date(2024, 8, 1) + timedelta(days=dia),
+                conversion_de_ventas=30 + dia * i, porcentajes_cumplimiento_recaudo=70 - dia, porcentaje_caidas_acuerdos=i,
+            )
+            for i, negociador in enumerate((self.negociador, self.otro), start=1) for dia in range(5)
+        ])
+        Evaluation.objects.create(negotiator=self.negociador, evaluator=self.lider, overall_score=70)
+        Evaluation.objects.update(date=datetime(2024, 9, 1, tzinfo=dt_timezone.utc))
+        self.admin = User.objects.create(cedula='999999', email='admin@test.local', role='administrativo')
+        self.client.force_login(self.admin)
+        self.rango = (date(2024, 7, 1), date(2024, 12, 31))
+
+    def _cerrar(self):
+        call_command('cerrar_semestre', anio=2024, semestre='2', stdout=io.StringIO())
+        return SemesterSnapshot.objects.get(anio=2024, semestre='2')
+
+    def _dashboard(self):
+        return self.client.get(reverse('administrativo_dashboard'), {'anio': '2024', 'semestre': '2'}).context['leaders_data']
+
+    def test_snapshot_igual_al_calculo_en_vivo(self):
+        en_vivo = construir_leaders_data(*self.rango, 70)
+        negociadores = negociadores_por_lider(*self.rango)
+        snapshot = self._cerrar()
+        self.assertEqual(snapshot.leaders_data, en_vivo)
+        self.assertEqual(snapshot.negociadores, {self.lider.cedula: negociadores[self.lider.cedula]})
+        self.assertEqual(self._dashboard(), en_vivo)
+
+    def test_semestre_cerrado_se_sirve_del_snapshot(self):
+        snapshot = self._cerrar()
+        NegotiatorIndicator.objects.create(negotiator=self.otro, date=date(2024, 10, 1), conversion_de_ventas=100)
+        self.assertNotEqual(construir_leaders_data(*self.rango, 70), snapshot.leaders_data)
+        self.assertEqual(self._dashboard(), snapshot.leaders_data)
+        detalle = self.client.get(
+            reverse('lider_negociadores_api', args=[self.lider.cedula]), {'anio': '2024', 'semestre': '2'}
+        ).json()['results']
+        self.assertEqual(detalle, snapshot.negociadores[self.lider.cedula])
+
+        # Al reabrirlo vuelve a calcularse en vivo
+        call_command('cerrar_semestre', anio=2024, semestre='2', reabrir=True, stdout=io.StringIO())
+        self.assertEqual(self._dashboard(), construir_leaders_data(*self.rango, 70))
+
+    def test_snapshot_inmutable(self):
+        snapshot = self._cerrar()
+        snapshot.semester_target = 90
+        with self.assertRaises(ValueError):
+            snapshot.save()
+        with self.assertRaises(CommandError):
+            self._cerrar()
+        self.assertEqual(SemesterSnapshot.objects.get(pk=snapshot.pk).semester_target, 70)
+
+
+class DashboardCacheTests(TestCase):
+    """El dashboard se sirve de la caché hasta que una escritura cambia la versión de datos."""
+
+    def setUp(self):
+        cache.clear()
+        self.lider, self.negociador = _crear_datos()
+        self.dia = date(2025, 2, 10)
+        NegotiatorIndicator.objects.create(negotiator=self.negociador, date=self.dia, conversion_de_ventas=40)
+        self.admin = User.objects.create(cedula='999999', email='admin@test.local', role='administrativo')
+        self.client.force_login(self.admin)
+
+    def _dashboard(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('administrativo_dashboard'), {'desde': '2025-01-01', 'hasta': '2025-03-31'})
+        return len(ctx.captured_queries), response.context['leaders_data']
+
+    def test_hit_miss_e_invalidacion(self):
+        consultas_miss, datos = self._dashboard()
+        consultas_hit, datos_cache = self._dashboard()
+        self.assertLess(consultas_hit, consultas_miss)
+        self.assertEqual(datos_cache, datos)
+        self.assertEqual(datos[0]['avg_conversion'], 40)
+
+        version = version_datos()
+        NegotiatorIndicator.objects.create(negotiator=self.negociador, date=self.dia + timedelta(days=1), conversion_de_ventas=60)
+        self.assertGreater(version_datos(), version)
+        consultas, datos = self._dashboard()
+        self.assertEqual(consultas, consultas_miss)
+        self.assertEqual(datos[0]['avg_conversion'], 50)
+
+    def test_invalidacion_desde_otro_proceso(self):
+        consultas_miss, _ = self._dashboard()
+        # Lo que hace invalidar_dashboard en otro proceso: solo toca la base de datos, no esta caché
+        DashboardDataVersion.objects.update_or_create(pk=1, defaults={'version': version_datos() + 1})
+        consultas, _ = self._dashboard()
+        self.assertEqual(consultas, consultas_miss)
+
+    def test_escrituras_de_evaluaciones_en_lote_invalidan(self):
+        Evaluation.objects.create(negotiator=self.negociador, evaluator=self.lider, overall_score=70)
+        for escribir in (
+            lambda: Evaluation.objects.filter(negotiator=self.negociador).update(feedback='Revisada'),
+            lambda: SerEvaluation.objects.bulk_create([SerEvaluation(negotiator=self.negociador, evaluator=self.lider, actitud=4, trabajo_en_equipo=4, sentido_pertenencia=4, relacionamiento=4, compromiso=4)]),
+            lambda: Evaluation.objects.filter(negotiator=self.negociador).delete(),
+        ):
+            version = version_datos()
+            with self.captureOnCommitCallbacks(execute=True):
+                escribir()
+            self.assertGreater(version_datos(), version)
+
+    def test_cambio_de_kpis_invalida_su_cache(self):
+        self.assertEqual(kpis_evaluacion(), [])
+        version = version_datos()
+        with self.captureOnCommitCallbacks(execute=True):
+            kpi = KPI.objects.create(name='Conversión de Ventas', kpi_type='percentage')
+        self.assertEqual(kpis_evaluacion(), [(kpi.pk, 'conversion_de_ventas')])
+        # El mapa de KPIs no comparte versión con los datos del dashboard
+        self.assertEqual(version_datos(), version)
+
+
+class PendientesEvaluacionTests(TestCase):
+    """Los pendientes en una consulta coinciden con el recorrido anterior por negociador."""
+
+    def setUp(self):
+        self.ahora = datetime(2025, 6, 30, 12, 0, tzinfo=dt_timezone.utc)
+        self.lider, _ = _crear_datos()
+        self.otro_lider = User.objects.create(cedula='555555', email='otro@test.local', first_name='Otro', role='lider')
+        # Días atrás de cada evaluación; None = nunca evaluado. Incluye los bordes del plazo de 180 días
+        atrasos = [
+            None, [timedelta(days=180)], [timedelta(days=181)], [timedelta(days=181) - timedelta(microseconds=1)],
+            [timedelta(days=180, hours=23)], [timedelta(days=400), timedelta(days=3)], [timedelta(days=200), timedelta(days=190)],
+            None, [timedelta(days=10)],
+        ]
+        for i, evaluaciones in enumerate(atrasos):
+            negociador = Negotiator.objects.create(
+                leader=self.lider if i % 2 else self.otro_lider, name=f'N{i}', cedula=f'40000{i}'
+            )
+            for atraso in evaluaciones or []:
+                evaluacion = Evaluation.objects.create(negotiator=negociador, evaluator=self.lider)
+                Evaluation.objects.filter(pk=evaluacion.pk).update(date=self.ahora - atraso)
+
+    def _anterior(self, negotiators):
+        # Lógica previa de User.get_negotiators_with_pending_evaluations, con un ``ahora`` fijo
+        pendientes = []
+        for negotiator in negotiators.order_by('pk'):
+            last_evaluation = negotiator.evaluations.order_by('-date').first()
+            days_since_last = None
+            pending_count = 0
+            if not last_evaluation:
+                pending_count = 1
+            else:
+                days_since_last = (self.ahora - last_evaluation.date).days
+                if days_since_last > 180:
+                    pending_count = 1
+            if pending_count > 0:
+                pendientes.append({
+                    'negotiator': negotiator,
+                    'last_evaluation_date': last_evaluation.date if last_evaluation else None,
+                    'days_since_last': days_since_last,
+                    'pending_count': pending_count,
+                })
+        return pendientes
+
+    def test_igual_al_recorrido_por_negociador(self):
+        for negotiators in (Negotiator.objects.all(), self.lider.negotiators.all(), self.otro_lider.negotiators.all()):
+            esperado = self._anterior(negotiators)
+            self.assertEqual(negotiators.resumen_pendientes(self.ahora), esperado)
+            self.assertEqual(
+                list(negotiators.pendientes_de_evaluacion(self.ahora).order_by('pk')),
+                [item['negotiator'] for item in esperado],
+            )
+        self.assertEqual(
+            [item['negotiator'].cedula for item in Negotiator.objects.resumen_pendientes(self.ahora)],
+            ['654321', '400000', '400002', '400006', '400007'],
+        )
+
+    def test_por_lider(self):
+        por_lider = Negotiator.objects.resumen_pendientes_por_lider(self.ahora)
+        self.assertEqual(set(por_lider), {self.lider.cedula, self.otro_lider.cedula})
+        for lider in (self.lider, self.otro_lider):
+            self.assertEqual(por_lider[lider.cedula], self._anterior(lider.negotiators.all()))
+
+    def test_comando_reporte_pendientes(self):
+        # El comando usa la hora actual: se compara con el resumen calculado también sin ``ahora``
+        salida = io.StringIO()
+        call_command('reporte_pendientes', json=True, stdout=salida)
+        reporte = {fila['cedula']: fila for fila in json.loads(salida.getvalue())}
+        esperado = Negotiator.objects.resumen_pendientes_por_lider()
+        for lider in (self.lider, self.otro_lider):
+            self.assertEqual(reporte[lider.cedula]['negociadores'], lider.negotiators.count())
+            self.assertEqual(reporte[lider.cedula]['pendientes'], len(esperado.get(lider.cedula, [])))
+            self.assertEqual(
+                [item['cedula'] for item in reporte[lider.cedula]['detalle']],
+                [item['negotiator'].cedula for item in esperado.get(lider.cedula, [])],
+            )
+
+        salida = io.StringIO()
+        call_command('reporte_pendientes', lider=self.lider.cedula, detalle=True, stdout=salida)
+        texto = salida.getvalue()
+        self.assertIn(f'({self.lider.cedula}):', texto)
+        self.assertNotIn(f'({self.otro_lider.cedula}):', texto)
+        self.assertIn('nunca evaluado', texto)
+        self.assertIn(f'Total pendientes: {len(esperado[self.lider.cedula])}', texto)
+
+
+class UltimaEvaluacionTests(TestCase):
+    """Los campos de última evaluación de Negotiator cuadran tras cada forma de escribir evaluaciones."""
+
+    def setUp(self):
+        self.lider, self.negociador = _crear_datos()
+        self.otro = Negotiator.objects.create(leader=self.lider, name='Otro', cedula='777777')
+        self.evaluador = User.objects.create(cedula='555555', email='evaluador@test.local', role='lider')
+
+    def _cuadran(self):
+        self.assertEqual(Negotiator.objects.verificar_ultimas_evaluaciones(), [])
+
+    def _ultima(self, negociador):
+        negociador.refresh_from_db()
+        return negociador.last_evaluation_id, negociador.evaluation_count
+
+    def test_escrituras_individuales(self):
+        primera = Evaluation.objects.create(negotiator=self.negociador, evaluator=self.lider, overall_score=60)
+        segunda = Evaluation.objects.create(negotiator=self.negociador, evaluator=self.evaluador, overall_score=80)
+        self.assertEqual(self._ultima(self.negociador), (segunda.pk, 2))
+
+        segunda.negotiator = self.otro
+        segunda.save()
+        self.assertEqual(self._ultima(self.negociador), (primera.pk, 1))
+        self.assertEqual(self._ultima(self.otro), (segunda.pk, 1))
+
+        primera.delete()
+        self.assertEqual(self._ultima(self.negociador), (None, 0))
+        ser = SerEvaluation.objects.create(
+            negotiator=self.otro, evaluator=self.lider,
+            actitud=4, trabajo_en_equipo=4, sentido_pertenencia=4, relacionamiento=4, compromiso=4,
+        )
+        self.otro.refresh_from_db()
+        self.assertEqual(self.otro.last_ser_evaluation_id, ser.pk)
+        self._cuadran()
+
+    def test_escrituras_en_lote(self):
+        evaluaciones = Evaluation.objects.bulk_create([
+            Evaluation(negotiator=negociador, evaluator=self.lider, overall_score=50)
+            for negociador in (self.negociador, self.negociador, self.otro)
+        ])
+        self.assertEqual(self._ultima(self.negociador)[1], 2)
+        self._cuadran()
+
+        # La más reciente del negociador pasa a ser la primera
+        Evaluation.objects.filter(pk=evaluaciones[1].pk).update(date=evaluaciones[0].date - timedelta(days=1))
+        self.assertEqual(self._ultima(self.negociador), (evaluaciones[0].pk, 2))
+        Evaluation.objects.filter(pk=evaluaciones[2].pk).update(negotiator=self.negociador)
+        self.assertEqual(self._ultima(self.otro), (None, 0))
+
+        evaluaciones[0].negotiator = self.otro
+        Evaluation.objects.bulk_update([evaluaciones[0]], ['negotiator'])
+        self.assertEqual(self._ultima(self.otro), (evaluaciones[0].pk, 1))
+        self._cuadran()
+
+        Evaluation.objects.filter(negotiator=self.negociador).delete()
+        self.assertEqual(self._ultima(self.negociador), (None, 0))
+        self._cuadran()
+
+    def test_borrado_en_cascada_del_evaluador(self):
+        propia = Evaluation.objects.create(negotiator=self.negociador, evaluator=self.lider, overall_score=60)
+        Evaluation.objects.create(negotiator=self.negociador, evaluator=self.evaluador, overall_score=80)
+        SerEvaluation.objects.create(
+            negotiator=self.negociador, evaluator=self.evaluador,
+            actitud=4, trabajo_en_equipo=4, sentido_pertenencia=4, relacionamiento=4, compromiso=4,
+        )
+        self.evaluador.delete()
+        self.assertEqual(self._ultima(self.negociador), (propia.pk, 1))
+        self.assertIsNone(self.negociador.last_ser_evaluation_id)
+        self._cuadran()
+
+
+class LiderDashboardTests(TestCase):
+    """El dashboard del líder debe renderizarse con un número fijo de consultas."""
+
+    def _consultas_dashboard(self, lider):
+        self.client.force_login(lider)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('lider_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_consultas_no_crecen_con_el_equipo(self):
+        pequeno = User.objects.create(cedula='111111', email='pequeno@test.local', role='lider')
+        grande = User.objects.create(cedula='222222', email='grande@test.local', role='lider')
+        Negotiator.objects.bulk_create(
+            [Negotiator(leader=pequeno, name=f'P{i}', cedula=f'31{i:04d}') for i in range(2)]
+            + [Negotiator(leader=grande, name=f'G{i}', cedula=f'32{i:04d}') for i in range(200)]
+        )
+        evaluado = grande.negotiators.order_by('pk').first()
+        Evaluation.objects.create(negotiator=evaluado, evaluator=grande)
+
+        consultas_pequeno, _ = self._consultas_dashboard(pequeno)
+        consultas_grande, response = self._consultas_dashboard(grande)
+        self.assertEqual(consultas_grande, consultas_pequeno)
+        self.assertEqual(response.context['total_pending'], 199)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Los planes se verifican con EXPLAIN QUERY PLAN de SQLite')
+class PlanesConsultaTests(TestCase):
+    """Las consultas calientes deben resolverse con los índices compuestos (EXPLAIN)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lider, cls.negociador = _crear_datos()
+        Evaluation.objects.create(negotiator=cls.negociador, evaluator=cls.lider)
+        SerEvaluation.objects.create(
+            negotiator=cls.negociador, evaluator=cls.lider,
+            actitud=3, trabajo_en_equipo=3, sentido_pertenencia=3, relacionamiento=3, compromiso=3,
+        )
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {indice}', plan, plan)
+        return plan
+
+    def test_ultima_evaluacion_por_negociador(self):
+        plan = self.assertUsaIndice(
+            Evaluation.objects.filter(negotiator=self.negociador).order_by('-date')[:1],
+            'evaluation_negotiator_date',
+        )
+        self.assertNotIn('TEMP B-TREE', plan, plan)
+
+    def test_ultima_evaluacion_ser_por_negociador(self):
+        plan = self.assertUsaIndice(
+            SerEvaluation.objects.filter(negotiator=self.negociador).order_by('-date')[:1],
+            'serevaluation_negotiator_date',
+        )
+        self.assertNotIn('TEMP B-TREE', plan, plan)
+
+    def test_rango_de_fechas_de_evaluaciones(self):
+        rango = rango_datetime(date(2025, 1, 1), date(2025, 6, 30))
+        self.assertUsaIndice(Evaluation.objects.filter(**rango), 'evaluation_date')
+        self.assertUsaIndice(SerEvaluation.objects.filter(**rango), 'serevaluation_date')
+
+    def test_filtro_date_date_no_usa_indice(self):
+        # Documenta el motivo del cambio: la función sobre la columna obliga a recorrer la tabla
+        plan = Evaluation.objects.filter(date__date__gte=date(2025, 1, 1)).explain()
+        self.assertNotIn('evaluation_date', plan, plan)
+
+    def test_cambios_de_indicadores_desde_cursor(self):
+        ahora = timezone.now()
+        self.assertUsaIndice(
+            self.negociador.indicators.filter(updated_at__gte=ahora),
+            'indicator_negotiator_updated',
+        )
+
+    def test_rango_de_fechas_de_indicadores(self):
+        self.assertUsaIndice(
+            NegotiatorIndicator.objects.filter(date__gte=date(2025, 1, 1), date__lte=date(2025, 6, 30)),
+            'indicator_date_negotiator',
+        )
+
+
+class SeedDemoDataTests(TestCase):
+    """El sembrado a escala pequeña es reproducible con ``--seed`` y se puede re-ejecutar."""
+
+    def _sembrar(self, directorio):
+        call_command(
+            'seed_demo_data', lideres=2, negociadores_por_lider=2, meses=2, seed=7, batch_size=3,
+            credenciales=os.path.join(directorio, 'credenciales.txt'), stdout=io.StringIO(),
+        )
+        return (
+            list(NegotiatorIndicator.objects.order_by('negotiator__cedula', 'date').values_list(
+                'negotiator__cedula', 'date', *rollups.KPI_FIELDS,
+            )),
+            list(SerEvaluation.objects.order_by('negotiator__cedula', 'pk').values_list(
+                'negotiator__cedula', *SerEvaluation.CAMPOS_SER,
+            )),
+        )
+
+    def test_semilla_fija_reproduce_los_datos_y_la_re_ejecucion_no_falla(self):
+        # Cuenta de líder ya existente con otra cédula: el upsert va por email
+        User.objects.create(cedula='777777', email='lider1@vg360.local', role='lider')
+        with tempfile.TemporaryDirectory() as directorio:
+            indicadores, ser = self._sembrar(directorio)
+            indicadores_otra_vez, ser_otra_vez = self._sembrar(directorio)
+
+        self.assertEqual(len(indicadores), 4 * 2)
+        self.assertEqual(indicadores_otra_vez, indicadores)
+        # La re-ejecución agrega otra evaluación del Ser por negociador con los mismos criterios
+        self.assertEqual(ser_otra_vez[1::2], ser)
+        self.assertEqual(Negotiator.objects.filter(leader__email='lider1@vg360.local').count(), 2)
+        self.assertEqual(rollups.verificar_rollups(), [])
+
+
+@unittest.skipUnless(connection.features.supports_update_conflicts_with_target, 'Ruta de INSERT ... ON CONFLICT')
+class InsertarIndicadoresTests(TestCase):
+    """El upsert por ``executemany`` de ``datagen.insertar_indicadores`` pisa los pares repetidos."""
+
+    def _esperados(self, semilla, negotiator_ids, fechas):
+        rng = random.Random(semilla)
+        return {(n, fecha): datagen._valores(rng) for n in negotiator_ids for fecha in fechas}
+
+    def test_upsert_actualiza_pares_existentes_y_los_rollups_cuadran(self):
+        lider, negociador = _crear_datos()
+        otro = Negotiator.objects.create(leader=lider, name='Otro', cedula='654322')
+        ids = [negociador.pk, otro.pk]
+        primeras = [date(2025, 5, 1), date(2025, 5, 2)]
+        segundas = [date(2025, 5, 2), date(2025, 6, 1)]
+
+        total, _ = datagen.insertar_indicadores(random.Random(1), ids, primeras, batch_size=3)
+        self.assertEqual(total, 4)
+        total, ultimos = datagen.insertar_indicadores(random.Random(2), ids, segundas, batch_size=3, upsert=True)
+        self.assertEqual(total, 4)
+
+        esperados = {**self._esperados(1, ids, primeras), **self._esperados(2, ids, segundas)}
+        guardados = {
+            (n, fecha): tuple(valores)
+            for n, fecha, *valores in NegotiatorIndicator.objects.values_list('negotiator_id', 'date', *rollups.KPI_FIELDS)
+        }
+        self.assertEqual(guardados, esperados)
+        self.assertEqual(
+            ultimos[otro.pk].conversion_de_ventas, esperados[(otro.pk, date(2025, 6, 1))][0],
+        )
+
+        # El SQL directo no mantiene los rollups: reconstruidos reflejan los valores actualizados
+        rollups.reconstruir_rollups()
+        self.assertEqual(rollups.verificar_rollups(), [])
+        mayo = NegotiatorIndicatorRollup.objects.get(negotiator=negociador, month=date(2025, 5, 1))
+        self.assertEqual(mayo.count, 2)
+        self.assertAlmostEqual(
+            mayo.sum_conversion_de_ventas,
+            esperados[(negociador.pk, date(2025, 5, 1))][0] + esperados[(negociador.pk, date(2025, 5, 2))][0],
+        )
 
-# Create your tests here.
@@ -0,0 +1,184 @@
+"""
+Series de tiempo de indicadores para los gráficos.
+
+``lttb`` reduce una serie a un número acotado de puntos con el algoritmo
+Largest-Triangle-Three-Buckets: conserva el primer y el último punto y, de cada
+cubeta intermedia, el punto que forma el triángulo de mayor área con el punto
+elegido antes y el promedio de la cubeta siguiente. A diferencia de promediar,
+mantiene los picos y valles visibles en el gráfico.
+
+``serie_columnar`` arma la respuesta compacta de la API: por cada KPI, los
+desplazamientos en días desde ``desde`` y los valores, ya submuestreados.
+
+El cursor ``since`` es una marca de agua: el momento de la respuesta menos
+``CURSOR_MARGEN``, codificado como ``<microsegundos epoch>-<id>`` (el id ya no
+se usa y va en 0). ``updated_at`` se fija al escribir y no al confirmar, así que
+una fila puede confirmarse con un updated_at anterior a la respuesta que ya se
+entregó; al retroceder el margen, el siguiente pedido la incluye. Las filas del
+margen llegan repetidas en dos sondeos seguidos y el gráfico las reemplaza por
+fecha.
+
+``serie_equipo`` agrega los indicadores de todos los negociadores de un líder
+por día, semana o mes en una consulta agrupada por (periodo, negociador).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Avg, Count, F
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Las escrituras que tarden más que esto en confirmarse pueden no verse en modo incremental
+CURSOR_MARGEN = timedelta(seconds=60)
+
+# Granularidad automática de la serie de equipo según la longitud del rango (días)
+GRANULARIDADES = (
+    (92, 'day', F('date')),
+    (731, 'week', TruncWeek('date')),
+    (None, 'month', TruncMonth('date')),
+)
+PERCENTILES_EQUIPO = (25, 50, 75)
+
+# Límites del parámetro max_points de la API de indicadores
+MAX_POINTS_DEFECTO = 365
+MAX_POINTS_MINIMO = 3
+MAX_POINTS_MAXIMO = 5000
+
+
+def lttb(xs, ys, umbral):
+    """
+    Índices de los puntos que conserva LTTB para reducir (xs, ys) a ``umbral``
+    puntos. ``xs`` debe ser creciente. Si la serie ya cabe, retorna todos.
+    """
+    n = len(xs)
+    if umbral >= n or umbral < MAX_POINTS_MINIMO:
+        return list(range(n))
+
+    seleccion = [0]
+    # Los puntos interiores (1..n-2) se reparten en umbral-2 cubetas
+    ancho = (n - 2) / (umbral - 2)
+    a = 0
+    for i in range(umbral - 2):
+        # Promedio de la cubeta siguiente (o el último punto en la última cubeta)
+        inicio_sig = int((i + 1) * ancho) + 1
+        fin_sig = min(int((i + 2) * ancho) + 1, n)
+        if inicio_sig >= fin_sig:
+            inicio_sig, fin_sig = n - 1, n
+        cantidad = fin_sig - inicio_sig
+        x_prom = sum(xs[inicio_sig:fin_sig]) / cantidad
+        y_prom = sum(ys[inicio_sig:fin_sig]) / cantidad
+
+        ax, ay = xs[a], ys[a]
+        mejor_area = -1.0
+        elegido = inicio = int(i * ancho) + 1
+        for j in range(inicio, int((i + 1) * ancho) + 1):
+            area = abs((ax - x_prom) * (ys[j] - ay) - (ax - xs[j]) * (y_prom - ay))
+            if area > mejor_area:
+                mejor_area = area
+                elegido = j
+        seleccion.append(elegido)
+        a = elegido
+    seleccion.append(n - 1)
+    return seleccion
+
+
+def serie_columnar(filas, campos, desde, max_points):
+    """
+    ``filas`` son tuplas (fecha, *valores de ``campos``) ordenadas por fecha.
+    Retorna ``{campo: {'t': [días desde desde], 'v': [valores]}}`` con cada
+    serie reducida por separado a lo sumo a ``max_points`` puntos.
+    """
+    dias = [(fila[0] - desde).days for fila in filas]
+    series = {}
+    for posicion, campo in enumerate(campos, start=1):
+        valores = [fila[posicion] for fila in filas]
+        indices = lttb(dias, valores, max_points)
+        series[campo] = {
+            't': [dias[i] for i in indices],
+            'v': [valores[i] for i in indices],
+        }
+    return series
+
+
+def codificar_cursor(updated_at, pk):
+    delta = updated_at - EPOCH
+    microsegundos = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f'{microsegundos}-{pk}'
+
+
+def leer_cursor(texto):
+    """(updated_at, id) del cursor, o None si falta o no es válido."""
+    try:
+        microsegundos, pk = (int(parte) for parte in texto.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    if microsegundos < 0 or pk < 0:
+        return None
+    return EPOCH + timedelta(microseconds=microsegundos), pk
+
+
+def cursor_actual(ahora=None):
+    """Cursor para el siguiente pedido incremental: ``ahora`` menos ``CURSOR_MARGEN``."""
+    return codificar_cursor((ahora or timezone.now()) - CURSOR_MARGEN, 0)
+
+
+def percentil(ordenados, p):
+    """Percentil ``p`` (0-100) con interpolación lineal sobre una lista ordenada no vacía."""
+    posicion = (len(ordenados) - 1) * p / 100
+    i = int(posicion)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (posicion - i)
+
+
+def granularidad_para(desde, hasta):
+    """Nombre y expresión de agrupación: diaria hasta ~3 meses, semanal hasta ~2 años, si no mensual."""
+    dias = (hasta - desde).days + 1
+    for limite, nombre, expresion in GRANULARIDADES:
+        if limite is None or dias <= limite:
+            return nombre, expresion
+
+
+def serie_equipo(negotiators, desde, hasta, campos):
+    """
+    Serie agregada del equipo ``negotiators`` (queryset) entre ``desde`` y ``hasta``.
+
+    Una consulta trae el promedio y el conteo de cada KPI por (periodo, negociador).
+    Por periodo, ``avg`` es el promedio de todas las filas del equipo (suma/conteo)
+    y ``min``, ``p25``, ``p50``, ``p75`` y ``max`` describen la distribución de
+    los promedios de los negociadores. Formato columnar: listas alineadas con
+    ``periodos``.
+    """
+    from .models import NegotiatorIndicator
+
+    granularidad, expresion = granularidad_para(desde, hasta)
+    filas = (
+        NegotiatorIndicator.objects
+        .filter(negotiator__in=negotiators, date__gte=desde, date__lte=hasta)
+        .annotate(periodo=expresion)
+        .values('periodo', 'negotiator_id')
+        .annotate(filas=Count('pk'), **{campo: Avg(campo) for campo in campos})
+        .order_by('periodo')
+    )
+    por_periodo = {}
+    for fila in filas:
+        por_periodo.setdefault(fila['periodo'], []).append(fila)
+
+    estadisticas = ['avg', 'min', *(f'p{p}' for p in PERCENTILES_EQUIPO), 'max']
+    series = {campo: {nombre: [] for nombre in estadisticas} for campo in campos}
+    for grupo in por_periodo.values():
+        total_filas = sum(fila['filas'] for fila in grupo)
+        for campo in campos:
+            promedios = sorted(fila[campo] for fila in grupo)
+            serie = series[campo]
+            serie['avg'].append(round(sum(fila[campo] * fila['filas'] for fila in grupo) / total_filas, 2))
+            serie['min'].append(round(promedios[0], 2))
+            for p in PERCENTILES_EQUIPO:
+                serie[f'p{p}'].append(round(percentil(promedios, p), 2))
+            serie['max'].append(round(promedios[-1], 2))
+    return {
+        'granularidad': granularidad,
+        'periodos': [periodo.isoformat() for periodo in por_periodo],
+        'negociadores': [len(grupo) for grupo in por_periodo.values()],
+        'series': series,
+    }
@@ -6,11 +6,18 @@ urlpatterns = [
     path('profile/', views.profile_view, name='profile'),
     path('lider/', views.lider_dashboard_view, name='lider_dashboard'),
     path('lider/pending-evaluations/', views.pending_evaluations_view, name='pending_evaluations'),
+    path('lider/evaluacion-equipo/', views.evaluacion_equipo_view, name='evaluacion_equipo'),
+    path('lider/equipo/indicadores/api/', views.lider_equipo_indicadores_api, name='lider_equipo_indicadores_api'),
     path('administrativo/', views.administrativo_dashboard_view, name='administrativo_dashboard'),
+    path('administrativo/lider/<str:cedula>/negociadores/', views.lider_negociadores_api, name='lider_negociadores_api'),
     path('administrativo/exportar-excel/', views.exportar_resultados_excel, name='exportar_resultados_excel'),
     path('administrativo/historico/', views.historico_evaluaciones_view, name='historico_evaluaciones'),
     path('administrativo/historico/exportar-excel/', views.exportar_historico_excel, name='exportar_historico_excel'),
     path('administrativo/historico/exportar-pdf/', views.exportar_historico_pdf, name='exportar_historico_pdf'),
+    path('administrativo/indicadores/exportar/', views.exportar_indicadores, name='exportar_indicadores'),
+    path('administrativo/exportaciones/', views.exportaciones_view, name='exportaciones'),
+    path('administrativo/exportaciones/<int:pk>/', views.exportacion_estado, name='exportacion_estado'),
+    path('administrativo/exportaciones/<int:pk>/descargar/', views.exportacion_descargar, name='exportacion_descargar'),
     path('administrativo/evaluation/<int:pk>/', views.admin_evaluation_detail, name='admin_evaluation_detail'),
     path('administrativo/ser-evaluation/<int:pk>/', views.admin_ser_evaluation_detail, name='admin_ser_evaluation_detail'),
     path('negotiator/<str:cedula>/', views.negotiator_detail_view, name='negotiator_detail'),
@@ -20,5 +27,7 @@ urlpatterns = [
     path('negotiator/<str:cedula>/indicators/api/', views.negotiator_indicators_api, name='negotiator_indicators_api'),
     path('negotiator/<str:cedula>/start-ser-evaluation/', views.start_ser_evaluation_view, name='start_ser_evaluation'),
     path('negotiator/<str:cedula>/exportar-evaluacion-pdf/', views.exportar_evaluacion_pdf, name='exportar_evaluacion_pdf'),
+    path('lider/equipo/exportar-evaluaciones-pdf/', views.exportar_evaluaciones_equipo_pdf, name='exportar_evaluaciones_equipo_pdf'),
+    path('administrativo/exportar-evaluaciones-pdf/', views.exportar_evaluaciones_pdf, name='exportar_evaluaciones_pdf'),
     path('negotiator/<str:cedula>/generar-sugerencia/', views.generar_sugerencia_view, name='generar_sugerencia'),
 ]
@@ -36,15 +36,30 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse, StreamingHttpResponse
 from datetime import datetime, timedelta
-import json
 from django.conf import settings
-from .models import Negotiator, Evaluation, KPI, EvaluationKPI, NegotiatorIndicator
-from .forms import EvaluationForm
-from django.db.models import Avg, Count
-from django.db.models.functions import Coalesce
+from .models import ExportJob, Negotiator, Evaluation, NegotiatorIndicator
+from .forms import EvaluacionEquipoForm, EvaluationForm
+from django.db.models import Count, Max, Q
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.text import compress_sequence
+from django.views.decorators.http import condition
+import hashlib
 from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.urls import reverse
+from .reportes_pdf import pdf_evaluacion
+from .services import crear_evaluacion, crear_evaluaciones
+from . import exports, jobs, rollups
+from .timeseries import (
+    MAX_POINTS_DEFECTO, MAX_POINTS_MAXIMO, MAX_POINTS_MINIMO, cursor_actual, leer_cursor, serie_columnar,
+    serie_equipo,
+)
+from .dashboard import (
+    ORDENAR_NEGOCIADORES_OPCIONES, ORDENAR_POR_OPCIONES, estadisticas_cache,
+    obtener_dashboard, obtener_negociadores_lider, rango_dashboard,
+)
 
 def home_view(request):
     return render(request, 'accounts/home.html')
@@ -58,9 +73,19 @@ def profile_view(request):
 
 @login_required
 def lider_dashboard_view(request):
-    negotiators = Negotiator.objects.filter(leader=request.user)
-    pending_negotiators = request.user.get_negotiators_with_pending_evaluations()
-    
+    # Estado y pendientes de cada negociador calculados en una sola consulta:
+    # la plantilla solo lee atributos, sin consultas por tarjeta
+    negotiators = Negotiator.objects.filter(leader=request.user).con_estado_evaluacion()
+    pending_negotiators = [
+        {
+            'negotiator': negotiator,
+            'last_evaluation_date': negotiator.fecha_ultima_evaluacion,
+            'days_since_last': negotiator.days_since_last,
+            'pending_count': negotiator.pending_count,
+        }
+        for negotiator in negotiators if negotiator.pending_count
+    ]
+
     context = {
         'negotiators': negotiators,
         'pending_negotiators': pending_negotiators,
@@ -92,7 +117,9 @@ def last_evaluation_view(request, cedula):
     if request.user.role != 'lider':
         return redirect('profile')
     
-    negotiator = get_object_or_404(Negotiator, cedula=cedula, leader=request.user)
+    negotiator = get_object_or_404(
+        Negotiator.objects.select_related('last_evaluation'), cedula=cedula, leader=request.user
+    )
     last_evaluation = negotiator.get_last_evaluation()
     
     evaluation_kpis = last_evaluation.kpis.all() if last_evaluation else []
@@ -119,39 +146,8 @@ def start_evaluation_view(request, cedula):
     if request.method == 'POST':
         form = EvaluationForm(request.POST)
         if form.is_valid():
-            # Crear la evaluación
-            # Crear la evaluación
-            # Calcular la puntuación general automáticamente
-            overall_score = negotiator.calcular_puntuacion_hacer()
-            evaluation = Evaluation.objects.create(
-                negotiator=negotiator,
-                evaluator=request.user,
-                overall_score=overall_score if overall_score is not None else 0.0,
-                feedback=form.cleaned_data['feedback']
-            )
-
-            # Crear EvaluationKPI para cada KPI de tipo porcentaje usando el indicador histórico más reciente
-            latest_indicator = negotiator.indicators.order_by('-date').first()
-            if latest_indicator:
-                kpis = KPI.objects.filter(kpi_type='percentage')
-                for kpi in kpis:
-                    # Mapear el nombre del KPI al campo del indicador
-                    kpi_field_map = {
-                        'Conversión de Ventas': 'conversion_de_ventas',
-                        'Porcentajes de Cumplimiento de Recaudo': 'porcentajes_cumplimiento_recaudo',
-                        'Porcentaje de Cumplimiento de Conversión': 'porcentaje_cumplimiento_conversion',
-                        'Porcentaje de Caídas de Acuerdos': 'porcentaje_caidas_acuerdos',
-                    }
-                    field_name = kpi_field_map.get(kpi.name)
-                    if field_name and hasattr(latest_indicator, field_name):
-                        value = getattr(latest_indicator, field_name)
-                        EvaluationKPI.objects.create(
-                            evaluation=evaluation,
-                            kpi=kpi,
-                            score=value
-                        )
-            
-            
+            # Puntuación del Hacer, KPIs del último indicador e inserción en una transacción
+            crear_evaluacion(negotiator, request.user, form.cleaned_data['feedback'])
             messages.success(request, f'Evaluación creada exitosamente para {negotiator.name}.')
             return redirect('negotiator_detail', cedula=cedula)
     else:
@@ -163,6 +159,34 @@ def start_evaluation_view(request, cedula):
     }
     return render(request, 'accounts/start_evaluation.html', context)
 
+@login_required
+def evaluacion_equipo_view(request):
+    """
+    Evaluación del Hacer de todos los negociadores pendientes del líder en un
+    solo envío. Los pendientes se recalculan al enviar: un negociador evaluado
+    mientras tanto ya no se incluye.
+    """
+    if request.user.role != 'lider':
+        return redirect('profile')
+
+    pendientes = [
+        item['negotiator']
+        for item in request.user.negotiators.with_scores().resumen_pendientes()
+    ]
+    if request.method == 'POST':
+        form = EvaluacionEquipoForm(request.POST, negociadores=pendientes)
+        if form.is_valid():
+            evaluaciones = crear_evaluaciones(request.user, form.seleccionados())
+            messages.success(request, f'{len(evaluaciones)} evaluaciones creadas exitosamente.')
+            return redirect('pending_evaluations')
+    else:
+        form = EvaluacionEquipoForm(negociadores=pendientes)
+
+    return render(request, 'accounts/evaluacion_equipo.html', {
+        'form': form,
+        'total_pending': len(pendientes),
+    })
+
 @login_required
 def negotiator_indicators_view(request, cedula):
     """
@@ -193,46 +217,117 @@ def negotiator_indicators_view(request, cedula):
     }
     return render(request, 'accounts/negotiator_indicators.html', context)
 
+def _parametros_serie(request):
+    """
+    Parámetros ``from``/``to`` (YYYY-MM-DD) y ``max_points`` de la API de
+    indicadores. Valores ausentes o inválidos usan los de siempre: los últimos
+    180 días hasta hoy y ``MAX_POINTS_DEFECTO`` puntos por serie.
+    """
+    def fecha(valor):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+        except ValueError:
+            return None
+
+    hasta = fecha(request.GET.get('to')) or timezone.now().date()
+    desde = fecha(request.GET.get('from')) or hasta - timedelta(days=180)
+    if hasta < desde:
+        desde, hasta = hasta, desde
+    try:
+        max_points = int(request.GET.get('max_points') or MAX_POINTS_DEFECTO)
+    except ValueError:
+        max_points = MAX_POINTS_DEFECTO
+    max_points = min(max(max_points, MAX_POINTS_MINIMO), MAX_POINTS_MAXIMO)
+    return desde, hasta, max_points
+
+
+def _etag_indicadores(request, cedula):
+    """
+    ETag de la serie: cambia si cambian los parámetros o si se agrega, borra o
+    actualiza un indicador del rango (conteo + último updated_at, una consulta).
+    Las escrituras de la app (save, bulk_create, upserts de datagen) fijan
+    updated_at; un ``QuerySet.update`` que no lo incluya no cambia el ETag.
+    """
+    if not request.user.is_authenticated or request.user.role != 'lider' or 'since' in request.GET:
+        return None
+    desde, hasta, max_points = _parametros_serie(request)
+    en_rango = Q(indicators__date__gte=desde, indicators__date__lte=hasta)
+    estado = (
+        Negotiator.objects.filter(cedula=cedula, leader=request.user)
+        .annotate(total=Count('indicators', filter=en_rango), ultimo=Max('indicators__updated_at', filter=en_rango))
+        .values('total', 'ultimo')
+        .first()
+    )
+    if estado is None:
+        return None
+    clave = f"v1:{cedula}:{desde}:{hasta}:{max_points}:{estado['total']}:{estado['ultimo']}"
+    return hashlib.md5(clave.encode()).hexdigest()
+
+
 @login_required
+@condition(etag_func=_etag_indicadores)
 def negotiator_indicators_api(request, cedula):
     """
-    API endpoint para obtener datos de indicadores en formato JSON para los gráficos
+    API endpoint para obtener datos de indicadores en formato JSON para los gráficos.
+
+    Acepta ``from``, ``to`` y ``max_points``; cada serie se reduce con LTTB a lo
+    sumo a ``max_points`` puntos. Formato columnar: ``series[kpi]`` tiene ``t``
+    (días desde ``desde``) y ``v`` (valores). Responde 304 si el ETag no cambió.
+
+    Cada respuesta trae ``cursor``. Con ``since=<cursor>`` solo se retornan, sin
+    submuestrear, las filas del rango con updated_at desde el cursor (índice
+    negotiator+updated_at), para que el gráfico las fusione. El cursor va
+    ``CURSOR_MARGEN`` atrás del momento de la respuesta para no perder filas
+    que se confirman tarde; esas pueden llegar dos veces. Los borrados no se
+    reportan en modo incremental.
     """
     if request.user.role != 'lider':
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     negotiator = get_object_or_404(Negotiator, cedula=cedula, leader=request.user)
-    
-    # Obtener indicadores de los últimos 6 meses
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=180)
-    
-    indicators = negotiator.indicators.filter(
-        date__gte=start_date,
-        date__lte=end_date
-    ).order_by('date')
-    
-    # Preparar datos para los gráficos con los nuevos KPIs
-    data = {
-        'labels': [],
-        'conversion_de_ventas': [],
-        'recaudacion_mensual': [],
-        'tiempo_hablando': [],
-        'porcentajes_cumplimiento_recaudo': [],
-        'porcentaje_cumplimiento_conversion': [],
-        'porcentaje_caidas_acuerdos': []
-    }
+    desde, hasta, max_points = _parametros_serie(request)
+    since = request.GET.get('since')
+    cursor = leer_cursor(since)
+
+    # Antes de consultar: lo que se confirme durante la consulta entra en el siguiente pedido
+    siguiente = cursor_actual()
+    columnas = ('date', *rollups.KPI_FIELDS)
+    if cursor:
+        # Solo (negotiator, updated_at) en SQL para que el plan use ese índice y lea
+        # únicamente las filas cambiadas
+        leidas = negotiator.indicators.filter(updated_at__gte=cursor[0]).order_by('date').values_list(*columnas)
+        filas = [fila for fila in leidas if desde <= fila[0] <= hasta]
+    else:
+        filas = list(
+            negotiator.indicators.filter(date__gte=desde, date__lte=hasta).order_by('date').values_list(*columnas)
+        )
+    response = JsonResponse({
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'total': len(filas),
+        'max_points': max_points,
+        'incremental': cursor is not None,
+        'cursor': siguiente,
+        'series': serie_columnar(filas, rollups.KPI_FIELDS, desde, len(filas) if cursor else max_points),
+    })
+    # El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-    for indicator in indicators:
-        data['labels'].append(indicator.date.strftime('%Y-%m-%d'))
-        data['conversion_de_ventas'].append(indicator.conversion_de_ventas)
-        data['recaudacion_mensual'].append(indicator.recaudacion_mensual)
-        data['tiempo_hablando'].append(indicator.tiempo_hablando)
-        data['porcentajes_cumplimiento_recaudo'].append(indicator.porcentajes_cumplimiento_recaudo)
-        data['porcentaje_cumplimiento_conversion'].append(indicator.porcentaje_cumplimiento_conversion)
-        data['porcentaje_caidas_acuerdos'].append(indicator.porcentaje_caidas_acuerdos)
-    
-    return JsonResponse(data)
+@login_required
+def lider_equipo_indicadores_api(request):
+    """
+    Serie agregada de los indicadores del equipo del líder (``from``/``to`` como
+    en la API por negociador). La granularidad (día, semana o mes) se elige según
+    la longitud del rango; por periodo retorna el promedio del equipo y la
+    distribución (min, p25, p50, p75, max) de los promedios de sus negociadores.
+    """
+    if request.user.role != 'lider':
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    desde, hasta, _ = _parametros_serie(request)
+    serie = serie_equipo(request.user.negotiators.all(), desde, hasta, rollups.KPI_FIELDS)
+    return JsonResponse({'desde': desde.isoformat(), 'hasta': hasta.isoformat(), **serie})
 
 @login_required
 def administrativo_dashboard_view(request):
@@ -241,74 +336,7 @@ def administrativo_dashboard_view(request):
         return redirect('profile')
 
     # Parámetros de filtro: rango personalizado (desde/hasta) o año/semestre
-    desde_str = request.GET.get('desde')
-    hasta_str = request.GET.get('hasta')
-    year = None
-    semestre = None
-    start_date = None
-    end_date = None
-
-    # Si vienen fechas explícitas, tienen prioridad
-    if desde_str or hasta_str:
-        try:
-            if desde_str:
-                start_date = datetime.strptime(desde_str, '%Y-%m-%d').date()
-            if hasta_str:
-                end_date = datetime.strptime(hasta_str, '%Y-%m-%d').date()
-        except ValueError:
-            start_date = None
-            end_date = None
-
-        # Defaults si falta alguno
-        if start_date is None:
-            start_date = timezone.now().date() - timedelta(days=180)
-        if end_date is None:
-            end_date = timezone.now().date()
-
-        # Asegurar orden correcto
-        if end_date < start_date:
-            start_date, end_date = end_date, start_date
-
-        # Set valores mostrados en formulario auxiliar
-        year = start_date.year
-        semestre = '1' if start_date.month <= 6 else '2'
-    else:
-        # Filtro por año/semestre (por defecto)
-        try:
-            year = int(request.GET.get('anio') or timezone.now().year)
-        except ValueError:
-            year = timezone.now().year
-        semestre = request.GET.get('semestre') or '1'
-        if semestre not in ['1', '2']:
-            semestre = '1'
-
-        if semestre == '1':
-            start_date = datetime(year, 1, 1).date()
-            end_date = datetime(year, 6, 30).date()
-        else:
-            start_date = datetime(year, 7, 1).date()
-            end_date = datetime(year, 12, 31).date()
-
-    # Consolidar KPIs por líder en el rango
-    qs = (
-        NegotiatorIndicator.objects
-        .filter(date__gte=start_date, date__lte=end_date)
-        .values(
-            'negotiator__leader__cedula',
-            'negotiator__leader__first_name',
-            'negotiator__leader__last_name',
-            'negotiator__leader__email'
-        )
-        .annotate(
-            equipos=Count('negotiator', distinct=True),
-            avg_conversion=Avg('conversion_de_ventas'),
-            avg_recaudo=Avg('recaudacion_mensual'),
-            avg_tiempo=Avg('tiempo_hablando'),
-            avg_cump_recaudo=Avg('porcentajes_cumplimiento_recaudo'),
-            avg_cump_conv=Avg('porcentaje_cumplimiento_conversion'),
-            avg_caidas=Avg('porcentaje_caidas_acuerdos'),
-        )
-    )
+    start_date, end_date, year, semestre = rango_dashboard(request.GET)
 
     # Umbral configurable desde settings (se usa también para alertas por líder)
     semester_target = getattr(settings, 'SEMESTER_TARGET', 70)
@@ -316,137 +344,14 @@ def administrativo_dashboard_view(request):
     # Threshold to show a warning color (e.g., 80% of the target)
     warning_threshold = round(semester_target * 0.8, 2)
 
-    leaders_data = []
-    for row in qs:
-        desempeno_componentes = []
-        if row['avg_conversion'] is not None:
-            desempeno_componentes.append(row['avg_conversion'])
-        if row['avg_cump_recaudo'] is not None:
-            desempeno_componentes.append(row['avg_cump_recaudo'])
-        if row['avg_cump_conv'] is not None:
-            desempeno_componentes.append(row['avg_cump_conv'])
-        if row['avg_caidas'] is not None:
-            desempeno_componentes.append(max(0.0, 100.0 - row['avg_caidas']))
-        desempeno = round(sum(desempeno_componentes) / len(desempeno_componentes), 2) if desempeno_componentes else None
-        leaders_data.append({
-            'cedula': row['negotiator__leader__cedula'],
-            'nombre': f"{row['negotiator__leader__first_name']} {row['negotiator__leader__last_name']}",
-            'email': row['negotiator__leader__email'],
-            'equipos': row['equipos'],
-            'avg_conversion': row['avg_conversion'],
-            'avg_recaudo': row['avg_recaudo'],
-            'avg_tiempo': row['avg_tiempo'],
-            'avg_cump_recaudo': row['avg_cump_recaudo'],
-            'avg_cump_conv': row['avg_cump_conv'],
-            'avg_caidas': row['avg_caidas'],
-            'desempeno': desempeno,
-            # Placeholder for negociadores; will be filled below
-            'negociadores': []
-        })
-
     # Ordenamiento
     ordenar_por = request.GET.get('ordenar_por') or 'desempeno'
-    direccion = request.GET.get('direccion') or 'desc'
-    reverse = True if direccion == 'desc' else False
-    leaders_data.sort(key=lambda x: (x[ordenar_por] is None, x[ordenar_por]), reverse=reverse)
+    if ordenar_por not in ORDENAR_POR_OPCIONES:
+        ordenar_por = 'desempeno'
+    direccion = 'asc' if request.GET.get('direccion') == 'asc' else 'desc'
 
-    # Enriquecer cada líder con su lista de negociadores y métricas agregadas en el rango
-    for leader in leaders_data:
-        try:
-            negotiators_qs = Negotiator.objects.filter(leader__cedula=leader['cedula'])
-        except Exception:
-            negotiators_qs = Negotiator.objects.filter(leader__cedula=leader.get('cedula'))
-
-        negociadores_list = []
-        for n in negotiators_qs:
-            # Agregar promedios desde NegotiatorIndicator en el mismo rango de fechas
-            ind_qs = n.indicators.filter(date__gte=start_date, date__lte=end_date)
-            agg = ind_qs.aggregate(
-                avg_conversion=Coalesce(Avg('conversion_de_ventas'), 0.0),
-                avg_recaudo=Coalesce(Avg('recaudacion_mensual'), 0.0),
-                avg_tiempo=Coalesce(Avg('tiempo_hablando'), 0.0),
-                avg_cump_recaudo=Coalesce(Avg('porcentajes_cumplimiento_recaudo'), 0.0),
-                avg_cump_conv=Coalesce(Avg('porcentaje_cumplimiento_conversion'), 0.0),
-                avg_caidas=Coalesce(Avg('porcentaje_caidas_acuerdos'), 0.0),
-            )
-            # Calcular desempeño similar al líder
-            componentes = []
-            if agg['avg_conversion'] is not None:
-                componentes.append(agg['avg_conversion'])
-            if agg['avg_cump_recaudo'] is not None:
-                componentes.append(agg['avg_cump_recaudo'])
-            if agg['avg_cump_conv'] is not None:
-                componentes.append(agg['avg_cump_conv'])
-            if agg['avg_caidas'] is not None:
-                componentes.append(max(0.0, 100.0 - agg['avg_caidas']))
-            n_desempeno = round(sum(componentes) / len(componentes), 2) if componentes else None
-
-            negociadores_list.append({
-                'cedula': n.cedula,
-                'nombre': n.name,
-                'avg_conversion': agg.get('avg_conversion'),
-                'avg_recaudo': agg.get('avg_recaudo'),
-                'avg_tiempo': agg.get('avg_tiempo'),
-                'avg_cump_recaudo': agg.get('avg_cump_recaudo'),
-                'avg_cump_conv': agg.get('avg_cump_conv'),
-                'avg_caidas': agg.get('avg_caidas'),
-                'desempeno': n_desempeno,
-                # Indica si este negociador tuvo al menos una evaluación en el rango seleccionado
-                'evaluated_in_range': n.evaluations.filter(date__date__gte=start_date, date__date__lte=end_date).exists(),
-            })
-
-        leader['negociadores'] = negociadores_list
-
-        # --- Métricas de diligenciamiento por líder (HU20) ---
-        # Total negociadores del líder (fuente primaria)
-        total_negotiators = Negotiator.objects.filter(leader__cedula=leader['cedula']).count()
-
-        # Número de negociadores que tuvieron al menos una evaluación en el rango
-        evaluated_negotiators = Negotiator.objects.filter(
-            leader__cedula=leader['cedula'],
-            evaluations__date__date__gte=start_date,
-            evaluations__date__date__lte=end_date
-        ).distinct().count()
-
-        # Número total de evaluaciones registradas para el líder en el rango
-        evaluations_done = Evaluation.objects.filter(
-            negotiator__leader__cedula=leader['cedula'],
-            date__date__gte=start_date,
-            date__date__lte=end_date
-        ).count()
-
-        pending = total_negotiators - evaluated_negotiators
-        pct = round((evaluated_negotiators / total_negotiators) * 100, 2) if total_negotiators > 0 else 0
-
-        leader['total_negotiators'] = total_negotiators
-        leader['evaluated_negotiators'] = evaluated_negotiators
-        leader['evaluations_done'] = evaluations_done
-        leader['pending_negotiators'] = pending
-        leader['pct_cumplimiento'] = pct
-        # Flag para alerta visual (por debajo del objetivo semestral)
-        leader['alert'] = pct < semester_target if total_negotiators > 0 else False
-
-    # Preparar datos para los gráficos (JSON serializable)
-    labels = [l['nombre'] for l in leaders_data]
-    counts = [int(l.get('equipos') or 0) for l in leaders_data]
-    total_counts = sum(counts)
-    shares = [round((c / total_counts) * 100, 2) if total_counts > 0 else 0 for c in counts]
-    avg_desempeno = [round(l['desempeno'], 2) if l.get('desempeno') is not None else 0 for l in leaders_data]
-
-    # KPI arrays (aligned with labels)
-    chart_avg_recaudo = [round(l.get('avg_recaudo') or 0, 2) for l in leaders_data]
-    chart_avg_tiempo = [round(l.get('avg_tiempo') or 0, 2) for l in leaders_data]
-    chart_avg_conversion = [round(l.get('avg_conversion') or 0, 2) for l in leaders_data]
-    chart_avg_cump_recaudo = [round(l.get('avg_cump_recaudo') or 0, 2) for l in leaders_data]
-    chart_avg_cump_conv = [round(l.get('avg_cump_conv') or 0, 2) for l in leaders_data]
-    chart_avg_caidas = [round(l.get('avg_caidas') or 0, 2) for l in leaders_data]
-
-    # Calcular desempeño global (promedio de líderes con valor definido)
-    non_null_desempenos = [l['desempeno'] for l in leaders_data if l.get('desempeno') is not None]
-    overall_desempeno = round(sum(non_null_desempenos) / len(non_null_desempenos), 2) if non_null_desempenos else None
-
-    # Umbral configurable desde settings
-    semester_target = getattr(settings, 'SEMESTER_TARGET', 70)
+    # Consolidar líderes y gráficos (cacheados por rango, orden y versión de datos)
+    leaders_data, graficos = obtener_dashboard(start_date, end_date, ordenar_por, direccion, semester_target)
 
     context = {
         'leaders_data': leaders_data,
@@ -460,24 +365,48 @@ def administrativo_dashboard_view(request):
         'hasta': end_date.strftime('%Y-%m-%d') if end_date else None,
 
         # Gráficos (pasados como JSON seguro)
-        'chart_labels': json.dumps(labels),
-        'chart_counts': json.dumps(counts),
-        'chart_shares': json.dumps(shares),
-        'chart_avg_desempeno': json.dumps(avg_desempeno),
-
-        'chart_avg_recaudo': json.dumps(chart_avg_recaudo),
-        'chart_avg_tiempo': json.dumps(chart_avg_tiempo),
-        'chart_avg_conversion': json.dumps(chart_avg_conversion),
-        'chart_avg_cump_recaudo': json.dumps(chart_avg_cump_recaudo),
-        'chart_avg_cump_conv': json.dumps(chart_avg_cump_conv),
-        'chart_avg_caidas': json.dumps(chart_avg_caidas),
-        'overall_desempeno': overall_desempeno,
+        **graficos,
         'semester_target': semester_target,
         'warning_threshold': warning_threshold,
+        'cache_stats': estadisticas_cache() if request.user.is_superuser else None,
     }
     return render(request, 'accounts/administrativo_dashboard.html', context)
 
 
+@login_required
+def lider_negociadores_api(request, cedula):
+    """
+    Detalle paginado de los negociadores de un líder en el rango del dashboard
+    (JSON). El dashboard lo consulta solo cuando se expande la fila del líder.
+    """
+    if request.user.role != 'administrativo' and not request.user.is_superuser:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    start_date, end_date, _, _ = rango_dashboard(request.GET)
+    negociadores = list(obtener_negociadores_lider(cedula, start_date, end_date))
+
+    # Ordenamiento opcional (por defecto, el orden de registro)
+    ordenar_por = request.GET.get('ordenar_por')
+    if ordenar_por in ORDENAR_NEGOCIADORES_OPCIONES:
+        descendente = request.GET.get('direccion') == 'desc'
+        negociadores.sort(key=lambda x: (x[ordenar_por] is None, x[ordenar_por]), reverse=descendente)
+
+    try:
+        page_size = min(max(int(request.GET.get('page_size') or 50), 1), 500)
+    except ValueError:
+        page_size = 50
+    page = Paginator(negociadores, page_size).get_page(request.GET.get('page'))
+
+    return JsonResponse({
+        'lider': cedula,
+        'desde': start_date.strftime('%Y-%m-%d'),
+        'hasta': end_date.strftime('%Y-%m-%d'),
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'total': page.paginator.count,
+        'results': list(page.object_list),
+    })
+
 @login_required
 def admin_evaluation_detail(request, pk):
     """Vista de solo lectura para una evaluación (Hacer) accesible solo por administradores."""
@@ -543,126 +472,14 @@ def exportar_resultados_excel(request):
     if request.user.role != 'administrativo' and not request.user.is_superuser:
         return redirect('profile')
 
-    # Soporta exportación por fechas (desde/hasta) o por año/semestre (backward compatible)
-    desde_str = request.GET.get('desde')
-    hasta_str = request.GET.get('hasta')
-    start_date = None
-    end_date = None
-    if desde_str or hasta_str:
-        try:
-            if desde_str:
-                start_date = datetime.strptime(desde_str, '%Y-%m-%d').date()
-            if hasta_str:
-                end_date = datetime.strptime(hasta_str, '%Y-%m-%d').date()
-        except ValueError:
-            start_date = None
-            end_date = None
-        if start_date is None:
-            start_date = timezone.now().date() - timedelta(days=180)
-        if end_date is None:
-            end_date = timezone.now().date()
-        if end_date < start_date:
-            start_date, end_date = end_date, start_date
-    else:
-        try:
-            year = int(request.GET.get('anio') or timezone.now().year)
-        except ValueError:
-            year = timezone.now().year
-        semestre = request.GET.get('semestre') or '1'
-        if semestre not in ['1', '2']:
-            semestre = '1'
-        if semestre == '1':
-            start_date = datetime(year, 1, 1).date()
-            end_date = datetime(year, 6, 30).date()
-        else:
-            start_date = datetime(year, 7, 1).date()
-            end_date = datetime(year, 12, 31).date()
-
-    # Datos consolidados
-    qs = (
-        NegotiatorIndicator.objects
-        .filter(date__gte=start_date, date__lte=end_date)
-        .values(
-            'negotiator__leader__cedula',
-            'negotiator__leader__first_name',
-            'negotiator__leader__last_name',
-            'negotiator__leader__email'
-        )
-        .annotate(
-            equipos=Count('negotiator', distinct=True),
-            avg_conversion=Avg('conversion_de_ventas'),
-            avg_recaudo=Avg('recaudacion_mensual'),
-            avg_tiempo=Avg('tiempo_hablando'),
-            avg_cump_recaudo=Avg('porcentajes_cumplimiento_recaudo'),
-            avg_cump_conv=Avg('porcentaje_cumplimiento_conversion'),
-            avg_caidas=Avg('porcentaje_caidas_acuerdos'),
-        )
-    )
-
-    # Generar Excel con openpyxl
     try:
-        import openpyxl
-        from openpyxl.utils import get_column_letter
+        import openpyxl  # noqa: F401
     except Exception:
         return HttpResponse('Falta dependencia openpyxl. Instálala e inténtalo de nuevo.', status=500)
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f'Semestre {semestre} {year}'
-    headers = [
-        'Cédula Líder', 'Nombre Líder', 'Email', 'Negociadores',
-        'Conv. Ventas (%)', 'Recaudo ($)', 'Tiempo Hablando (h)',
-        'Cumpl. Recaudo (%)', 'Cumpl. Conversión (%)', 'Caídas Acuerdos (%)', 'Desempeño'
-    ]
-    ws.append(headers)
-
-    for row in qs:
-        desempeno_componentes = []
-        if row['avg_conversion'] is not None:
-            desempeno_componentes.append(row['avg_conversion'])
-        if row['avg_cump_recaudo'] is not None:
-            desempeno_componentes.append(row['avg_cump_recaudo'])
-        if row['avg_cump_conv'] is not None:
-            desempeno_componentes.append(row['avg_cump_conv'])
-        if row['avg_caidas'] is not None:
-            desempeno_componentes.append(max(0.0, 100.0 - row['avg_caidas']))
-        desempeno = round(sum(desempeno_componentes) / len(desempeno_componentes), 2) if desempeno_componentes else None
-
-        nombre = f"{row['negotiator__leader__first_name']} {row['negotiator__leader__last_name']}"
-        ws.append([
-            row['negotiator__leader__cedula'],
-            nombre,
-            row['negotiator__leader__email'],
-            row['equipos'],
-            _round(row['avg_conversion']),
-            _round(row['avg_recaudo']),
-            _round(row['avg_tiempo']),
-            _round(row['avg_cump_recaudo']),
-            _round(row['avg_cump_conv']),
-            _round(row['avg_caidas']),
-            _round(desempeno),
-        ])
-
-    # Ajuste simple de ancho
-    for idx, _ in enumerate(headers, start=1):
-        ws.column_dimensions[get_column_letter(idx)].width = 20
-
-    # Respuesta HTTP
-    from io import BytesIO
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    # Nombre de archivo sensible al filtro utilizado
-    if desde_str or hasta_str:
-        filename = f'resultados_{start_date}_{end_date}.xlsx'
-    else:
-        filename = f'resultados_semestre_{semestre}_{year}.xlsx'
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    archivo = exports.archivo_temporal()
+    filename = exports.exportar_resultados_excel(request.GET, archivo)
+    return exports.respuesta_archivo(archivo, filename, exports.XLSX_CONTENT_TYPE)
 
 def _round(val):
     if val is None:
@@ -678,94 +495,74 @@ def exportar_evaluacion_pdf(request, cedula):
     if request.user.role != 'lider':
         return redirect('profile')
 
-    negotiator = get_object_or_404(Negotiator, cedula=cedula, leader=request.user)
-    last_eval = negotiator.evaluations.order_by('-date').first()
-    last_ser = negotiator.ser_evaluations.order_by('-date').first()
-
-    if not last_eval:
+    negotiator = get_object_or_404(
+        exports.negociadores_para_pdf(Negotiator.objects.all()), cedula=cedula, leader=request.user,
+    )
+    if not negotiator.last_evaluation:
         messages.warning(request, 'No hay evaluación para exportar.')
         return redirect('negotiator_detail', cedula=cedula)
 
-    # Datos KPI de la evaluación
-    kpis = list(last_eval.kpis.select_related('kpi').all())
-
-    # Construir PDF con reportlab
     try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.units import cm
-        from reportlab.lib import colors
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet
+        import reportlab  # noqa: F401
     except Exception:
         return HttpResponse('Falta dependencia reportlab. Instálala e inténtalo de nuevo.', status=500)
 
-    from io import BytesIO
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=2*cm, rightMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-    styles = getSampleStyleSheet()
-
-    story = []
-    story.append(Paragraph('Evaluación Final con Retroalimentación', styles['Title']))
-    story.append(Spacer(1, 12))
-    story.append(Paragraph(f'Negociador: <b>{negotiator.name}</b> (Cédula: {negotiator.cedula})', styles['Normal']))
-    story.append(Paragraph(f'Líder: <b>{request.user.first_name} {request.user.last_name}</b> ({request.user.email})', styles['Normal']))
-    story.append(Paragraph(f'Fecha: {last_eval.date.strftime("%d/%m/%Y %H:%M")}', styles['Normal']))
-    story.append(Spacer(1, 12))
-
-    # Tabla KPIs
-    data = [['Indicador', 'Valor (%)']]
-    for ek in kpis:
-        data.append([ek.kpi.name, f"{_round(ek.score)}"])
-    t = Table(data, hAlign='LEFT')
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('ALIGN', (1,1), (-1,-1), 'RIGHT'),
-    ]))
-    story.append(t)
-    story.append(Spacer(1, 12))
-
-    # Porcentajes generales
-    hacer_pct = _round(last_eval.overall_score)
-    ser_pct = _round((last_ser.promedio * 20) if last_ser else None)
-    total_pct = None
-    if hacer_pct is not None and ser_pct is not None:
-        total_pct = _round(hacer_pct * 0.7 + ser_pct * 0.3)
-
-    resumen = [['Hacer (0-100)', hacer_pct], ['Ser (x20 → 0-100)', ser_pct], ['Total (70/30)', total_pct]]
-    t2 = Table(resumen, hAlign='LEFT')
-    t2.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-        ('BACKGROUND', (0,0), (-1,0), colors.whitesmoke),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
-    ]))
-    story.append(t2)
-    story.append(Spacer(1, 12))
-
-    # Retroalimentación
-    if last_eval.feedback:
-        story.append(Paragraph('Retroalimentación', styles['Heading3']))
-        story.append(Paragraph(last_eval.feedback, styles['BodyText']))
-
-    doc.build(story)
-    pdf = buffer.getvalue()
-    buffer.close()
-
+    pdf = pdf_evaluacion(exports.datos_evaluacion_pdf(negotiator))
     response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="evaluacion_{negotiator.cedula}.pdf"'
     return response
 
+
+def _evaluaciones_pdf_zip(negotiators, filename, carpeta_por_lider=False):
+    try:
+        import reportlab  # noqa: F401
+    except Exception:
+        return HttpResponse('Falta dependencia reportlab. Instálala e inténtalo de nuevo.', status=500)
+    response = StreamingHttpResponse(
+        exports.evaluaciones_pdf_zip(negotiators, carpeta_por_lider=carpeta_por_lider),
+        content_type=exports.ZIP_CONTENT_TYPE,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def exportar_evaluaciones_equipo_pdf(request):
+    """ZIP con el PDF de la última evaluación de cada negociador del líder."""
+    if request.user.role != 'lider':
+        return redirect('profile')
+    return _evaluaciones_pdf_zip(
+        Negotiator.objects.filter(leader=request.user), f'evaluaciones_{request.user.cedula}.zip'
+    )
+
+
+@login_required
+def exportar_evaluaciones_pdf(request):
+    """
+    ZIP con el PDF de la última evaluación de cada negociador de la
+    organización (una carpeta por líder), o solo del líder ``?lider=<cédula>``.
+    """
+    if request.user.role != 'administrativo' and not request.user.is_superuser:
+        return redirect('profile')
+    negotiators = Negotiator.objects.all()
+    lider_cedula = request.GET.get('lider')
+    if lider_cedula:
+        negotiators = negotiators.filter(leader_id=lider_cedula)
+    filename = f'evaluaciones_{lider_cedula}.zip' if lider_cedula else 'evaluaciones.zip'
+    return _evaluaciones_pdf_zip(negotiators, filename, carpeta_por_lider=True)
+
 @login_required
 def negotiator_detail_view(request, cedula):
-    negotiator = get_object_or_404(Negotiator, cedula=cedula, leader=request.user)
-    last_evaluation = Evaluation.objects.filter(negotiator=negotiator).order_by('-date').first()
+    negotiator = get_object_or_404(
+        Negotiator.objects.select_related('last_evaluation', 'last_ser_evaluation'),
+        cedula=cedula, leader=request.user,
+    )
+    last_evaluation = negotiator.last_evaluation
     context = {
         'negotiator': negotiator,
-        'last_evaluation': last_evaluation
+        'last_evaluation': last_evaluation,
+        # Hacer/Ser/total calculados una sola vez para toda la plantilla
+        'puntajes': negotiator.puntajes,
     }
     return render(request, 'accounts/negotiator_detail.html', context)
 
@@ -781,10 +578,12 @@ def generar_sugerencia_view(request, cedula):
     if request.user.role != 'lider':
         return redirect('profile')
 
-    negotiator = get_object_or_404(Negotiator, cedula=cedula, leader=request.user)
+    negotiator = get_object_or_404(
+        Negotiator.objects.select_related('last_ser_evaluation'), cedula=cedula, leader=request.user
+    )
 
     # Calcular el puntaje total (0-100)
-    total_score = negotiator.calcular_puntaje_total()
+    total_score = negotiator.puntajes.total
     if total_score is None:
         messages.warning(request, 'No hay información suficiente para generar la sugerencia.')
         return redirect('negotiator_detail', cedula=cedula)
@@ -876,38 +675,9 @@ def historico_evaluaciones_view(request):
     if request.user.role != 'administrativo' and not request.user.is_superuser:
         return redirect('profile')
 
-    # Filtros
-    desde_str = request.GET.get('desde')
-    hasta_str = request.GET.get('hasta')
-    lider_cedula = request.GET.get('lider')
-    negociador_cedula = request.GET.get('negociador')
-
-    try:
-        desde = datetime.strptime(desde_str, '%Y-%m-%d').date() if desde_str else None
-    except ValueError:
-        desde = None
-    try:
-        hasta = datetime.strptime(hasta_str, '%Y-%m-%d').date() if hasta_str else None
-    except ValueError:
-        hasta = None
-    if desde and hasta and hasta < desde:
-        desde, hasta = hasta, desde
-
-    evals = Evaluation.objects.select_related('negotiator', 'evaluator').all()
-    ser_evals = SerEvaluation.objects.select_related('negotiator', 'evaluator').all()
-
-    if desde:
-        evals = evals.filter(date__date__gte=desde)
-        ser_evals = ser_evals.filter(date__date__gte=desde)
-    if hasta:
-        evals = evals.filter(date__date__lte=hasta)
-        ser_evals = ser_evals.filter(date__date__lte=hasta)
-    if lider_cedula:
-        evals = evals.filter(evaluator__cedula=lider_cedula)
-        ser_evals = ser_evals.filter(evaluator__cedula=lider_cedula)
-    if negociador_cedula:
-        evals = evals.filter(negotiator__cedula=negociador_cedula)
-        ser_evals = ser_evals.filter(negotiator__cedula=negociador_cedula)
+    evals, ser_evals, filtros = exports.filtros_historico(request.GET)
+    desde, hasta = filtros['desde'], filtros['hasta']
+    lider_cedula, negociador_cedula = filtros['lider'], filtros['negociador']
 
     # Listas auxiliares para selects
     User = get_user_model()
@@ -943,88 +713,14 @@ def exportar_historico_excel(request):
     if request.user.role != 'administrativo' and not request.user.is_superuser:
         return redirect('profile')
 
-    desde_str = request.GET.get('desde')
-    hasta_str = request.GET.get('hasta')
-    lider_cedula = request.GET.get('lider')
-    negociador_cedula = request.GET.get('negociador')
-
-    try:
-        desde = datetime.strptime(desde_str, '%Y-%m-%d').date() if desde_str else None
-    except ValueError:
-        desde = None
-    try:
-        hasta = datetime.strptime(hasta_str, '%Y-%m-%d').date() if hasta_str else None
-    except ValueError:
-        hasta = None
-    if desde and hasta and hasta < desde:
-        desde, hasta = hasta, desde
-
-    evals = Evaluation.objects.select_related('negotiator', 'evaluator').all()
-    ser_evals = SerEvaluation.objects.select_related('negotiator', 'evaluator').all()
-
-    if desde:
-        evals = evals.filter(date__date__gte=desde)
-        ser_evals = ser_evals.filter(date__date__gte=desde)
-    if hasta:
-        evals = evals.filter(date__date__lte=hasta)
-        ser_evals = ser_evals.filter(date__date__lte=hasta)
-    if lider_cedula:
-        evals = evals.filter(evaluator__cedula=lider_cedula)
-        ser_evals = ser_evals.filter(evaluator__cedula=lider_cedula)
-    if negociador_cedula:
-        evals = evals.filter(negotiator__cedula=negociador_cedula)
-        ser_evals = ser_evals.filter(negotiator__cedula=negociador_cedula)
-
     try:
-        import openpyxl
+        import openpyxl  # noqa: F401
     except Exception:
         return HttpResponse('Falta dependencia openpyxl. Instálala e inténtalo de nuevo.', status=500)
 
-    wb = openpyxl.Workbook()
-    # Hoja Hacer
-    ws1 = wb.active
-    ws1.title = 'Evaluaciones Hacer'
-    ws1.append(['Fecha', 'Líder', 'Correo Líder', 'Negociador', 'Cédula Negociador', 'Puntaje Hacer (0-100)', 'Feedback'])
-    for e in evals.order_by('-date'):
-        ws1.append([
-            e.date.strftime('%Y-%m-%d %H:%M'),
-            f'{e.evaluator.first_name} {e.evaluator.last_name}',
-            e.evaluator.email,
-            e.negotiator.name,
-            e.negotiator.cedula,
-            _round(e.overall_score),
-            e.feedback or ''
-        ])
-
-    # Hoja Ser
-    ws2 = wb.create_sheet('Evaluaciones Ser')
-    ws2.append(['Fecha', 'Líder', 'Correo Líder', 'Negociador', 'Cédula Negociador', 'Actitud', 'Trabajo en Equipo', 'Sentido de Pertenencia', 'Relacionamiento', 'Compromiso', 'Promedio (1-5)'])
-    for s in ser_evals.order_by('-date'):
-        ws2.append([
-            s.date.strftime('%Y-%m-%d %H:%M'),
-            f'{s.evaluator.first_name} {s.evaluator.last_name}',
-            s.evaluator.email,
-            s.negotiator.name,
-            s.negotiator.cedula,
-            s.actitud,
-            s.trabajo_en_equipo,
-            s.sentido_pertenencia,
-            s.relacionamiento,
-            s.compromiso,
-            s.promedio,
-        ])
-
-    from io import BytesIO
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    filename = 'historico_evaluaciones.xlsx'
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    archivo = exports.archivo_temporal()
+    filename = exports.exportar_historico_excel(request.GET, archivo)
+    return exports.respuesta_archivo(archivo, filename, exports.XLSX_CONTENT_TYPE)
 
 
 @login_required
@@ -1032,6 +728,21 @@ def exportar_historico_pdf(request):
     if request.user.role != 'administrativo' and not request.user.is_superuser:
         return redirect('profile')
 
+    try:
+        import reportlab  # noqa: F401
+    except Exception:
+        return HttpResponse('Falta dependencia reportlab. Instálala e inténtalo de nuevo.', status=500)
+
+    archivo = exports.archivo_temporal()
+    filename = exports.exportar_historico_pdf(request.GET, archivo)
+    return exports.respuesta_archivo(archivo, filename, exports.PDF_CONTENT_TYPE)
+
+
+def _filtros_indicadores(request):
+    """
+    Indicadores filtrados por desde, hasta (fechas inclusivas), lider (cédula
+    del líder del negociador) y negociador. Valores inválidos se ignoran.
+    """
     desde_str = request.GET.get('desde')
     hasta_str = request.GET.get('hasta')
     lider_cedula = request.GET.get('lider')
@@ -1048,90 +759,105 @@ def exportar_historico_pdf(request):
     if desde and hasta and hasta < desde:
         desde, hasta = hasta, desde
 
-    evals = Evaluation.objects.select_related('negotiator', 'evaluator').all()
-    ser_evals = SerEvaluation.objects.select_related('negotiator', 'evaluator').all()
-
+    indicadores = NegotiatorIndicator.objects.all()
     if desde:
-        evals = evals.filter(date__date__gte=desde)
-        ser_evals = ser_evals.filter(date__date__gte=desde)
+        indicadores = indicadores.filter(date__gte=desde)
     if hasta:
-        evals = evals.filter(date__date__lte=hasta)
-        ser_evals = ser_evals.filter(date__date__lte=hasta)
+        indicadores = indicadores.filter(date__lte=hasta)
     if lider_cedula:
-        evals = evals.filter(evaluator__cedula=lider_cedula)
-        ser_evals = ser_evals.filter(evaluator__cedula=lider_cedula)
+        indicadores = indicadores.filter(negotiator__leader_id=lider_cedula)
     if negociador_cedula:
-        evals = evals.filter(negotiator__cedula=negociador_cedula)
-        ser_evals = ser_evals.filter(negotiator__cedula=negociador_cedula)
+        indicadores = indicadores.filter(negotiator__cedula=negociador_cedula)
+    return indicadores
 
-    # PDF
-    try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.lib import colors
-        from reportlab.lib.units import cm
-    except Exception:
-        return HttpResponse('Falta dependencia reportlab. Instálala e inténtalo de nuevo.', status=500)
 
-    from io import BytesIO
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=1.5*cm, rightMargin=1.5*cm, topMargin=1.5*cm, bottomMargin=1.5*cm)
-    styles = getSampleStyleSheet()
-    story = []
+@login_required
+def exportar_indicadores(request):
+    """
+    Indicadores crudos en CSV (por defecto) o NDJSON (``formato=ndjson``) con
+    los filtros del histórico. La respuesta se genera por bloques mientras se
+    envía y va comprimida con gzip si el cliente lo acepta.
+    """
+    if request.user.role != 'administrativo' and not request.user.is_superuser:
+        return redirect('profile')
 
-    # Título
-    title = 'Histórico de Evaluaciones'
-    subt = []
-    if desde:
-        subt.append(f'Desde: {desde.strftime("%Y-%m-%d")}')
-    if hasta:
-        subt.append(f'Hasta: {hasta.strftime("%Y-%m-%d")}')
-    story.append(Paragraph(title, styles['Title']))
-    if subt:
-        story.append(Paragraph(' | '.join(subt), styles['Normal']))
-    story.append(Spacer(1, 12))
-
-    # Tabla Hacer
-    data_h = [['Fecha', 'Líder', 'Negociador', 'Hacer (0-100)']]
-    for e in evals.order_by('-date')[:500]:  # limitar filas para no crecer demasiado
-        data_h.append([
-            e.date.strftime('%Y-%m-%d %H:%M'),
-            f'{e.evaluator.first_name} {e.evaluator.last_name}',
-            e.negotiator.name,
-            _round(e.overall_score)
-        ])
-    t_h = Table(data_h, hAlign='LEFT')
-    t_h.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-    ]))
-    story.append(Paragraph('Evaluaciones Hacer', styles['Heading2']))
-    story.append(t_h)
-    story.append(Spacer(1, 12))
-
-    # Tabla Ser
-    data_s = [['Fecha', 'Líder', 'Negociador', 'Promedio SER (1-5)']]
-    for s in ser_evals.order_by('-date')[:500]:
-        data_s.append([
-            s.date.strftime('%Y-%m-%d %H:%M'),
-            f'{s.evaluator.first_name} {s.evaluator.last_name}',
-            s.negotiator.name,
-            s.promedio
-        ])
-    t_s = Table(data_s, hAlign='LEFT')
-    t_s.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-    ]))
-    story.append(Paragraph('Evaluaciones Ser', styles['Heading2']))
-    story.append(t_s)
-
-    doc.build(story)
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="historico_evaluaciones.pdf"'
+    bloques = exports.bloques_indicadores(_filtros_indicadores(request))
+    if request.GET.get('formato') == 'ndjson':
+        contenido, content_type, extension = exports.ndjson_de_bloques(bloques), exports.NDJSON_CONTENT_TYPE, 'ndjson'
+    else:
+        contenido, content_type, extension = exports.csv_de_bloques(bloques), exports.CSV_CONTENT_TYPE, 'csv'
+
+    gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    response = StreamingHttpResponse(compress_sequence(contenido) if gzip else contenido, content_type=content_type)
+    if gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response.headers['Content-Disposition'] = f'attachment; filename="indicadores.{extension}"'
     return response
+
+
+def _estado_exportacion(job):
+    return {
+        'id': job.pk,
+        'tipo': job.tipo,
+        'estado': job.estado,
+        'creado': job.created_at.isoformat(),
+        'terminado': job.finished_at.isoformat() if job.finished_at else None,
+        'expira': job.expires_at.isoformat() if job.expires_at else None,
+        'error': job.error or None,
+        'estado_url': reverse('exportacion_estado', args=[job.pk]),
+        'descarga_url': reverse('exportacion_descargar', args=[job.pk]) if job.estado == 'terminado' else None,
+    }
+
+
+@login_required
+def exportaciones_view(request):
+    """
+    GET: exportaciones en segundo plano recientes. POST: encola una (``tipo`` y
+    los filtros de la exportación directa) y redirige al listado, o responde
+    202 con el id si el cliente pide JSON.
+    """
+    if request.user.role != 'administrativo' and not request.user.is_superuser:
+        return redirect('profile')
+
+    if request.method == 'POST':
+        tipo = request.POST.get('tipo')
+        if tipo not in jobs.PARAMETROS:
+            return JsonResponse({'error': 'Tipo de exportación inválido'}, status=400)
+        job, creado = jobs.encolar(tipo, request.POST, request.user)
+        if 'application/json' in request.headers.get('Accept', ''):
+            return JsonResponse(_estado_exportacion(job), status=202)
+        if creado:
+            messages.success(request, f'Exportación #{job.pk} en cola. Descárgala aquí cuando termine.')
+        else:
+            messages.info(request, f'Ya había una exportación idéntica en curso (#{job.pk}).')
+        return redirect('exportaciones')
+
+    recientes = list(ExportJob.objects.select_related('solicitado_por').order_by('-created_at')[:50])
+    return render(request, 'accounts/exportaciones.html', {
+        'jobs': recientes,
+        'hay_activos': any(job.estado in ExportJob.ESTADOS_ACTIVOS for job in recientes),
+    })
+
+
+@login_required
+def exportacion_estado(request, pk):
+    if request.user.role != 'administrativo' and not request.user.is_superuser:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    job = get_object_or_404(ExportJob, pk=pk)
+    response = JsonResponse(_estado_exportacion(job))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+def exportacion_descargar(request, pk):
+    if request.user.role != 'administrativo' and not request.user.is_superuser:
+        return redirect('profile')
+    job = get_object_or_404(ExportJob, pk=pk, estado='terminado', expires_at__gt=timezone.now())
+    try:
+        archivo = open(jobs.ruta_archivo(job), 'rb')
+    except FileNotFoundError:
+        raise Http404('El archivo de la exportación ya no existe.')
+    _, content_type = exports.EXPORTACIONES[job.tipo]
+    return FileResponse(archivo, as_attachment=True, filename=job.nombre_archivo, content_type=content_type)